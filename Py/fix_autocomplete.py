@@ -1,68 +1,206 @@
 import os
 import re
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asef_html import iter_tags  # noqa: E402
+from asef_walk import walk_files  # noqa: E402
+from asef_profile import PROFILER  # noqa: E402
+from asef_output import OUTPUT  # noqa: E402
+import asef_output  # noqa: E402
 
 BASE_DIR = os.getcwd()
 
 # =========================
-# Patrones base de inputs
+# Contexto de formularios
 # =========================
-PASSWORD_PATTERN = re.compile(r'(<input[^>]*type=["\']password["\'][^>]*>)', re.IGNORECASE)
-EMAIL_PATTERN = re.compile(r'(<input[^>]*type=["\']email["\'][^>]*>)', re.IGNORECASE)
-NAME_PATTERN = re.compile(r'(<input[^>]*(name|id)=["\'](name|username)["\'][^>]*>)', re.IGNORECASE)
-
-
-def add_autocomplete(tag, field_type):
-    """Agrega el atributo autocomplete si no está presente"""
-    if 'autocomplete=' in tag.lower():
-        return tag  # ya tiene el atributo
-
-    if field_type == 'password':
-        # Detectar si es para registro o login
-        if re.search(r'(reg|new)', tag, re.IGNORECASE):
-            return tag.replace('>', ' autocomplete="new-password">')
+# Un formulario es de alta (registro, invitación, cambio de clave) si su id/action/name
+# lo sugiere; si no, con una sola contraseña es de ingreso.
+SIGNUP_HINT = re.compile(r'reg|sign|alta|invit|accept|create|crear|nuev|new|change|cambi|reset', re.IGNORECASE)
+# Pistas por campo (id/name) que mandan sobre el contexto del formulario
+NEW_PASSWORD_HINT = re.compile(r'new|nuev|confirm|repe|reg', re.IGNORECASE)
+CURRENT_PASSWORD_HINT = re.compile(r'current|actual|old|viej', re.IGNORECASE)
+EMAIL_HINT = re.compile(r'e-?mail|correo', re.IGNORECASE)
+NAME_FIELDS = {'name', 'fullname', 'full_name', 'full-name', 'nombre', 'displayname', 'inpname'}
+USERNAME_FIELDS = {'username', 'user', 'usuario', 'login', 'userid', 'user_id'}
+
+# Valores que este script administra: si el que hay no coincide con el contexto se corrige
+MANAGED = {'current-password', 'new-password', 'email', 'name', 'username'}
+
+
+class _Form:
+    __slots__ = ('id', 'action', 'name', 'inputs')
+
+    def __init__(self, tag=None):
+        self.id = (tag.get('id') or '') if tag else ''
+        self.action = (tag.get('action') or '') if tag else ''
+        self.name = (tag.get('name') or '') if tag else ''
+        self.inputs = []
+
+    def passwords(self) -> list:
+        return [t for t in self.inputs if (t.get('type') or '').strip().lower() == 'password']
+
+    def is_signup(self) -> bool:
+        return bool(SIGNUP_HINT.search(f'{self.id} {self.action} {self.name}'))
+
+    def has_password(self) -> bool:
+        return bool(self.passwords())
+
+
+def _field_key(tag) -> str:
+    return f"{tag.get('id') or ''} {tag.get('name') or ''}"
+
+
+def autocomplete_for(tag, form: _Form):
+    """Valor de autocomplete que corresponde a un <input> dentro de `form` (o None)."""
+    kind = (tag.get('type') or 'text').strip().lower()
+    key = _field_key(tag)
+    names = {(tag.get('id') or '').strip().lower(), (tag.get('name') or '').strip().lower()}
+
+    if kind == 'password':
+        if NEW_PASSWORD_HINT.search(key):
+            return 'new-password'
+        if CURRENT_PASSWORD_HINT.search(key):
+            return 'current-password'
+        passwords = form.passwords()
+        if form.is_signup():
+            return 'new-password'
+        if len(passwords) >= 3:
+            # cambio de clave: actual + nueva + confirmación
+            return 'current-password' if tag is passwords[0] else 'new-password'
+        if len(passwords) == 2:
+            # clave + confirmación
+            return 'new-password'
+        return 'current-password'
+
+    if kind not in ('text', 'email', ''):
+        return None
+    if names & USERNAME_FIELDS:
+        return 'username'
+    if kind == 'email' or EMAIL_HINT.search(key):
+        # En un formulario de ingreso el email es el usuario de la cuenta
+        if form.has_password() and not form.is_signup():
+            return 'username'
+        return 'email'
+    if names & NAME_FIELDS:
+        return 'name'
+    return None
+
+
+def _edits_for(html, tag, value) -> list:
+    """Ediciones (inicio, fin, texto) para dejar autocomplete="value" en la etiqueta."""
+    attr = tag.attr('autocomplete')
+    if attr is None:
+        # Antes del cierre ('/>' o '>'), sin dejar espacios dobles
+        pos = tag.end - 1 if tag.closed else tag.end
+        if html[pos - 1:pos] == '/':
+            pos -= 1
+        while pos > tag.start and html[pos - 1] in ' \t\r\n':
+            pos -= 1
+        return [(pos, pos, f' autocomplete="{value}"')]
+
+    edits = []
+    current = attr.value.strip().lower()
+    if current != value and (current in MANAGED or not current):
+        if attr.quote:
+            edits.append((attr.start, attr.end, value))
+        elif attr.start == attr.end:
+            edits.append((attr.start, attr.end, f'="{value}"'))
         else:
-            return tag.replace('>', ' autocomplete="current-password">')
-
-    elif field_type == 'email':
-        return tag.replace('>', ' autocomplete="email">')
-
-    elif field_type == 'name':
-        return tag.replace('>', ' autocomplete="name">')
-
-    return tag
+            edits.append((attr.start, attr.end, f'"{value}"'))
+
+    # Reparación del script anterior: 'required/ autocomplete="x">' -> 'required autocomplete="x"/>'
+    name_start = html.rfind('autocomplete', tag.start, attr.start)
+    before = html[tag.start:name_start].rstrip()
+    if before.endswith('/') and tag.closed and html[tag.end - 2] != '/':
+        slash = tag.start + len(before) - 1
+        edits.append((slash, slash + 1, ''))
+        edits.append((tag.end - 1, tag.end - 1, '/'))
+    return edits
+
+
+def fix_text(html):
+    """
+    Una sola pasada con el tokenizador de asef_html: se agrupan los <input> por
+    <form> (id, action, cantidad de contraseñas) y al cerrar cada formulario se
+    decide el autocomplete de cada campo. Las ediciones se aplican en el lugar,
+    armando la salida con un único join.
+    """
+    with PROFILER.rule('autocomplete.rewrite', html) as rule:
+        edits = []
+        page = _Form()
+        form = None
+
+        def _close(group):
+            for tag in group.inputs:
+                value = autocomplete_for(tag, group)
+                if value:
+                    rule.matches += 1
+                    edits.extend(_edits_for(html, tag, value))
+
+        for tag in iter_tags(html, names=('form', 'input'), closing=('form',)):
+            if tag.name == 'form':
+                if form is not None:
+                    _close(form)
+                form = _Form(tag)
+            elif tag.name == '/form':
+                if form is not None:
+                    _close(form)
+                    form = None
+            else:
+                (form or page).inputs.append(tag)
+
+        if form is not None:
+            _close(form)
+        _close(page)
+
+        if not edits:
+            return html
+        edits.sort(key=lambda e: e[0])
+        rule.replacements = len(edits)
+        out = []
+        last = 0
+        for start, end, text in edits:
+            out.append(html[last:start])
+            out.append(text)
+            last = end
+        out.append(html[last:])
+        return ''.join(out)
 
 
 def fix_file(path):
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            html = f.read()
+        html = OUTPUT.read_text(path)
 
         original = html
+        html = fix_text(html)
 
-        html = PASSWORD_PATTERN.sub(lambda m: add_autocomplete(m.group(1), 'password'), html)
-        html = EMAIL_PATTERN.sub(lambda m: add_autocomplete(m.group(1), 'email'), html)
-        html = NAME_PATTERN.sub(lambda m: add_autocomplete(m.group(1), 'name'), html)
-
-        if html != original:
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(html)
+        if OUTPUT.write_text(path, html, original):
             print(f"✅ Corregido: {path}")
+            return True
         else:
             print(f"✔ Sin cambios: {path}")
+            return False
 
     except Exception as e:
         print(f"⚠️ Error procesando {path}: {e}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Agrega autocomplete según el formulario en los HTML de ASEF.')
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_output.start(args, BASE_DIR)
+
     print("🔍 Buscando archivos .html en el proyecto ASEF...\n")
-    count = 0
-    for root, _, files in os.walk(BASE_DIR):
-        for file in files:
-            if file.endswith('.html'):
-                fix_file(os.path.join(root, file))
-                count += 1
+    count = changed = 0
+    for path in walk_files(BASE_DIR, ('.html',)):
+        if fix_file(path):
+            changed += 1
+        count += 1
     print(f"\n✨ Limpieza completada. {count} archivos procesados.\n")
+    asef_output.finish(args, changed)
 
 
 if __name__ == '__main__':
@@ -1,5 +1,17 @@
 import os
 import re
+import sys
+import mmap
+import codecs
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asef_manifest import Manifest, rules_hash  # noqa: E402
+from asef_walk import walk_files  # noqa: E402
+from asef_profile import PROFILER  # noqa: E402
+import asef_profile  # noqa: E402
+from asef_output import OUTPUT, TMP_SUFFIX  # noqa: E402
+import asef_output  # noqa: E402
 
 # Carpeta base del proyecto (puede cambiar según tu estructura)
 BASE_DIR = os.getcwd()
@@ -8,43 +20,196 @@ BASE_DIR = os.getcwd()
 PATTERN_OPTIONAL = re.compile(r"\?\s+\.", re.UNICODE)  # corrige "? ."
 INVISIBLES = r"[\u00A0\u200B\u200C\u200D\uFEFF]"  # espacios invisibles y BOM
 
-def clean_file(path):
+# =========================
+# Modo streaming (bytes)
+# =========================
+# Las mismas tres reglas sobre los bytes UTF-8, sin decodificar:
+#   - \s de Python (unicode) = ASCII [\t-\r\x1c-\x20] + U+0085, U+00A0, U+1680,
+#     U+2000..U+200A, U+2028, U+2029, U+202F, U+205F, U+3000
+#   - los invisibles son U+00A0, U+200B..U+200D y U+FEFF (incluye el BOM)
+B_WS = rb"(?:[\t-\r\x1c-\x20]|\xc2[\x85\xa0]|\xe1\x9a\x80|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)"
+B_OPTIONAL = re.compile(rb"\?" + B_WS + rb"+\.")
+B_INVISIBLES = re.compile(rb"\xc2\xa0|\xe2\x80[\x8b-\x8d]|\xef\xbb\xbf")
+B_TRAILING = re.compile(rb"[ \t]+(\r?\n)")
+
+# Un byte ASCII visible distinto de '?' nunca forma parte de una coincidencia
+# (salvo el '.' final, que cierra la coincidencia): cortar justo después de él
+# es seguro, y además deja cada tramo con secuencias UTF-8 completas.
+# Lo que queda detrás del último byte así se arrastra al tramo siguiente.
+_NOT_CUTTABLE = bytes(b for b in range(256) if not (0x21 <= b <= 0x7E and b != 0x3F))
+
+CHUNK_SIZE = 1024 * 1024
+# Desde este tamaño el archivo se recorre con mmap en lugar de read()
+MMAP_MIN = 8 * 1024 * 1024
+
+
+def _invalid_utf8(piece: bytes, offset: int) -> list:
+    """Offsets (absolutos) de las secuencias UTF-8 inválidas del tramo."""
+    found = []
+
+    def _handler(e):
+        found.append(offset + e.start)
+        return ("", e.end)
+
+    codecs.register_error("asef_sanitize_report", _handler)
+    piece.decode("utf-8", "asef_sanitize_report")
+    return found
+
+
+def _clean_piece(piece: bytes) -> bytes:
+    """Aplica las reglas (en el mismo orden que clean_text) a un tramo autocontenido."""
+    ascii_only = piece.isascii()
+    if b"?" in piece:
+        piece = B_OPTIONAL.sub(b"?.", piece)
+    if not ascii_only:
+        piece = B_INVISIBLES.sub(b"", piece)
+    # find() de C es mucho más barato que la regex: sólo se corre si hay candidatos
+    if b" \n" in piece or b"\t\n" in piece or (b"\r" in piece and (b" \r" in piece or b"\t\r" in piece)):
+        piece = B_TRAILING.sub(rb"\1", piece)
+    return piece
+
+
+def _iter_chunks(f, size: int):
+    if size >= MMAP_MIN:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, size, CHUNK_SIZE):
+                yield mm[start:start + CHUNK_SIZE]
+        return
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def sanitize_stream(path) -> dict:
+    """
+    Versión streaming de clean_file: trabaja sobre bytes en tramos de CHUNK_SIZE,
+    con memoria constante (salvo tramos enormes sin ningún byte ASCII visible).
+      - los tramos se cortan tras el último byte ASCII visible (ver _NOT_CUTTABLE),
+        así ninguna coincidencia ni secuencia UTF-8 queda partida entre dos tramos;
+      - tramos ASCII sin '?' ni espacios antes de un salto no se tocan (isascii/find);
+      - los bytes que no son UTF-8 válido se conservan y se reportan;
+      - sólo si algo cambia se escribe, a un temporal que reemplaza al original.
+    """
+    path = str(path)
+    size = os.path.getsize(path)
+    result = {"changed": False, "bytes": size, "invalid_utf8": 0, "first_invalid": None}
+    tmp_path = path + TMP_SUFFIX
+    out = None
+    offset = 0          # inicio (en el original) del tramo pendiente
+    carry = b""
+
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
+        with open(path, "rb") as f:
+            chunks = _iter_chunks(f, size)
+            while True:
+                chunk = next(chunks, None)
+                buf = carry + chunk if chunk is not None else carry
+                if chunk is not None:
+                    cut = len(buf.rstrip(_NOT_CUTTABLE))
+                    piece, carry = buf[:cut], buf[cut:]
+                else:
+                    piece, carry = buf, b""
+                if piece:
+                    if not piece.isascii():
+                        bad = _invalid_utf8(piece, offset)
+                        if bad:
+                            result["invalid_utf8"] += len(bad)
+                            if result["first_invalid"] is None:
+                                result["first_invalid"] = bad[0]
+                    cleaned = _clean_piece(piece)
+                    if out is None and cleaned != piece:
+                        # Primer cambio: lo anterior quedó igual, se copia tal cual
+                        out = open(tmp_path, "wb")
+                        with open(path, "rb") as src:
+                            remaining = offset
+                            while remaining:
+                                block = src.read(min(CHUNK_SIZE, remaining))
+                                out.write(block)
+                                remaining -= len(block)
+                    if out is not None:
+                        out.write(cleaned)
+                    offset += len(piece)
+                if chunk is None:
+                    break
+        if out is not None:
+            out.close()
+            out = None
+            result["changed"] = OUTPUT.replace(tmp_path, path)
+    finally:
+        if out is not None:
+            out.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return result
+
+
+def clean_text(content):
+    # 🔹 Corrige "? ." → "?."
+    content = PROFILER.sub("sanitize.optional_chain", PATTERN_OPTIONAL, "?.", content)
 
-        original = content
-        # 🔹 Corrige "? ." → "?."
-        content = PATTERN_OPTIONAL.sub("?.", content)
+    # 🔹 Elimina caracteres invisibles
+    content = PROFILER.sub("sanitize.invisibles", INVISIBLES, "", content)
 
-        # 🔹 Elimina caracteres invisibles
-        content = re.sub(INVISIBLES, "", content)
+    # 🔹 Limpia BOM, tabs sobrantes, y espacios antes de saltos
+    content = content.replace("\ufeff", "")
+    return PROFILER.sub("sanitize.trailing_ws", r"[ \t]+(\r?\n)", r"\1", content)
 
-        # 🔹 Limpia BOM, tabs sobrantes, y espacios antes de saltos
-        content = content.replace("\ufeff", "")
-        content = re.sub(r"[ \t]+(\r?\n)", r"\1", content)
 
-        if content != original:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+def clean_file(path):
+    try:
+        with PROFILER.rule("sanitize.stream") as r:
+            res = sanitize_stream(path)
+            r.bytes = res["bytes"]
+            r.replacements = int(res["changed"])
+
+        if res["invalid_utf8"]:
+            print(f"⚠️ UTF-8 inválido en {path}: {res['invalid_utf8']} secuencia(s), "
+                  f"la primera en el byte {res['first_invalid']} (se conservan tal cual)")
+        if res["changed"]:
             print(f"✅ Corregido: {path}")
+            return True
         else:
             print(f"✔ Sin cambios: {path}")
+            return False
 
     except Exception as e:
         print(f"⚠️ Error procesando {path}: {e}")
+        return None
+
+
+# Versión de las reglas para el manifiesto incremental
+TOOL = "sanitize_js"
+RULES = rules_hash(clean_file, sanitize_stream, _clean_piece, B_OPTIONAL, B_INVISIBLES, B_TRAILING, CHUNK_SIZE)
 
 
-def run_sanitizer():
+def run_sanitizer(use_cache=True):
     print("🔍 Escaneando proyecto para limpiar caracteres invisibles y '? .' incorrectos...\n")
-    count = 0
-    for root, _, files in os.walk(BASE_DIR):
-        for file in files:
-            if file.endswith(".js") or file.endswith(".html"):
-                count += 1
-                clean_file(os.path.join(root, file))
-    print(f"\n✨ Limpieza completa. {count} archivos verificados en {BASE_DIR}\n")
+    manifest = Manifest(BASE_DIR, enabled=use_cache)
+    count = changed = 0
+    for path in walk_files(BASE_DIR, (".js", ".html")):
+        count += 1
+        if manifest.lookup(path, TOOL, RULES) is not None:
+            continue
+        res = clean_file(path)
+        if res is False:
+            manifest.store(path, TOOL, RULES, False)
+        elif res:
+            changed += 1
+    manifest.save()
+    print(f"\n✨ Limpieza completa. {count} archivos verificados en {BASE_DIR} ({manifest.hits} sin cambios en caché)\n")
+    return changed
 
 
 if __name__ == "__main__":
-    run_sanitizer()
+    parser = argparse.ArgumentParser(description="Limpia caracteres invisibles y '? .' en JS/HTML.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora el manifiesto incremental y procesa todo.")
+    asef_profile.add_arguments(parser)
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_profile.start(args)
+    asef_output.start(args, BASE_DIR)
+    changed = run_sanitizer(use_cache=not args.no_cache)
+    asef_profile.finish(args)
+    asef_output.finish(args, changed)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+asef_bench.py — Corpus sintético + benchmark de cada regla de reparación.
+
+Genera páginas de tamaño configurable (N páginas, M enlaces por página) con la
+mezcla que vemos en el sitio real: favicons data:, onclick location.href, rutas
+anidadas pages/admin|socios|auth, prefijos /asefweb/ y ./, scripts sin type,
+inputs de formularios, caracteres invisibles y archivos con CRLF.
+
+Cada regla se mide aislada sobre el mismo corpus:
+  - throughput (MB/s), p50 y p99 por archivo
+  - pico de memoria (tracemalloc, en una pasada aparte para no distorsionar tiempos)
+Las reglas que trabajan sobre archivos (fix_file, clean_file) se miden sobre una
+copia en disco que se restaura antes de cada llamada (la restauración no se cuenta,
+pero sí la lectura/escritura que hace la propia regla).
+
+Uso:
+    python asef_bench.py --pages 200 --links 80 --out bench.json
+    python asef_bench.py --rules fix_attrs,repair_html
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import asef_profile
+
+ROOT = Path(__file__).parent
+
+PAGE_DIRS = ("", "pages/", "pages/admin/", "pages/socios/", "pages/auth/")
+LINK_FORMS = (
+    "pages/{name}.html", "/pages/{name}.html", "./pages/{name}.html", "/asefweb/pages/{name}.html",
+    "asefweb/pages/{name}.html", "../{name}.html", "#{name}", "https://example.com/{name}",
+    "mailto:info@{name}.com", "tel:+54{num}",
+)
+CSS_FORMS = ("css/{name}.css", "/css/{name}.css", "./css/{name}.css", "/asefweb/css/{name}.css", "{name}.css")
+JS_FORMS = ("js/{name}.js", "/js/{name}.js", "/asefweb/js/{name}.js", "{name}.js")
+FAVICONS = (
+    '<link rel="icon" href="favicon.svg" type="image/svg+xml">',
+    '<link rel="icon" type="image/svg+xml" href="data:image/svg+xml,%3Csvg xmlns=\'http://www.w3.org/2000/svg\'%3E%3C/svg%3E">',
+    '<link rel="icon" href="/asefweb/data:image/svg+xml,<svg></svg>">',
+)
+NAMES = ("servicios", "contacto", "funerarias", "recursos", "desarrollo", "main", "navigation", "auth", "carousel")
+
+
+def _load_py(name: str):
+    spec = importlib.util.spec_from_file_location(name, ROOT / "Py" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_page(rng: random.Random, links: int, crlf: bool) -> str:
+    pick = rng.choice
+    head = ["<!DOCTYPE html>", '<html lang="es">', "<head>", '<meta charset="UTF-8">',
+            '<meta name="viewport" content="width=device-width, initial-scale=1.0">']
+    head += [pick(FAVICONS) for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.3:
+        head.append('<base href="/asefweb/">')
+    if rng.random() < 0.3:
+        head.append('<meta charset="UTF-8">')
+    head.append("<!-- CSS Files -->")
+    for _ in range(rng.randint(2, 5)):
+        head.append(f'<link rel="stylesheet" href="{pick(CSS_FORMS).format(name=pick(NAMES))}">')
+    head.append(f"<title>ASEF · {pick(NAMES)}</title>")
+    head.append("</head>")
+
+    body = ["<body>", '<nav class="navbar"><ul class="nav-menu">']
+    for i in range(links):
+        name = pick(NAMES)
+        url = pick(LINK_FORMS).format(name=name, num=rng.randint(1000, 9999))
+        r = rng.random()
+        if r < 0.1:
+            body.append(f'  <button class="btn" onclick="location.href=\'{url}\'">{name}</button>')
+        elif r < 0.15:
+            body.append(f'  <img src="{url.replace(".html", ".png")}" alt="{name}">')
+        else:
+            body.append(f'  <li class="nav-item"><a href="{url}" class="nav-link">{name} {i}</a></li>')
+    body.append("</ul></nav>")
+    body.append('<form id="loginForm"><input type="email" id="email"><input type="password" id="password">'
+                '<input type="text" name="name"></form>')
+    body.append("<p>Texto​ con invisibles y opcional ? .valor   </p>")
+    for _ in range(rng.randint(1, 4)):
+        js = pick(JS_FORMS).format(name=pick(NAMES))
+        body.append(f'<script {"defer " if rng.random() < 0.5 else ""}src="{js}"></script>')
+    body += ["</body>", "</html>", ""]
+    text = "\n".join(head + body)
+    return text.replace("\n", "\r\n") if crlf else text
+
+
+def generate_corpus(pages: int, links: int, seed: int = 1, crlf_ratio: float = 0.25) -> list:
+    """Lista de (ruta relativa, texto) determinística para una semilla."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(pages):
+        rel = f"{PAGE_DIRS[i % len(PAGE_DIRS)]}page{i:04d}.html"
+        corpus.append((rel, generate_page(rng, links, rng.random() < crlf_ratio)))
+    return corpus
+
+
+def text_rules() -> dict:
+    """Reglas que reciben y devuelven texto."""
+    import asef_repair_all as repair
+    import asef_fix_html_all as html_all
+    import asef_fix_assets as assets
+    return {
+        "fix_attrs": lambda s: repair.fix_attrs(s),
+        "ensure_dynamic_base": lambda s: repair.ensure_dynamic_base(s),
+        "ensure_favicon": lambda s: repair.ensure_favicon(s),
+        "repair_html": lambda s: repair.repair_html(s),
+        "fix_html_all.fix_html": lambda s: html_all.fix_html(s),
+        "fix_assets.fix_assets": lambda s: assets.fix_assets(s),
+    }
+
+
+def file_rules() -> dict:
+    """Reglas que trabajan sobre una ruta en disco."""
+    import asef_paths_hardfix as hardfix
+    sanitize = _load_py("sanitize_js")
+    autocomplete = _load_py("fix_autocomplete")
+    return {
+        "paths_hardfix.fix_file": lambda p: hardfix.fix_file(Path(p)),
+        "sanitize_js.clean_file": lambda p: sanitize.clean_file(str(p)),
+        "fix_autocomplete.fix_file": lambda p: autocomplete.fix_file(str(p)),
+    }
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[k]
+
+
+def bench_rule(fn, corpus: list, on_disk: bool, workdir: Path, repeat: int) -> dict:
+    total_bytes = sum(len(t.encode("utf-8")) for _, t in corpus)
+    per_file = []
+    wall = 0.0
+    paths = []
+    if on_disk:
+        for rel, text in corpus:
+            p = workdir / rel
+            p.parent.mkdir(parents=True, exist_ok=True)
+            paths.append(p)
+
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        for _ in range(repeat):
+            for i, (rel, text) in enumerate(corpus):
+                if on_disk:
+                    paths[i].write_bytes(text.encode("utf-8"))
+                    arg = paths[i]
+                else:
+                    arg = text
+                t0 = time.perf_counter()
+                fn(arg)
+                dt = time.perf_counter() - t0
+                per_file.append(dt)
+                wall += dt
+
+        # Pico de memoria (el peor archivo) en una pasada aparte
+        peak = 0
+        tracemalloc.start()
+        for i, (rel, text) in enumerate(corpus):
+            if on_disk:
+                paths[i].write_bytes(text.encode("utf-8"))
+            arg = paths[i] if on_disk else text
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn(arg)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+
+    mb = total_bytes * repeat / (1024 * 1024)
+    return {
+        "files": len(corpus),
+        "bytes": total_bytes,
+        "repeat": repeat,
+        "total_s": round(wall, 6),
+        "mb_per_s": round(mb / wall, 3) if wall else None,
+        "p50_ms": round(_percentile(per_file, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(per_file, 0.99) * 1000, 4),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de reglas de reparación ASEF sobre un corpus sintético.")
+    parser.add_argument("--pages", type=int, default=100, help="Cantidad de páginas del corpus.")
+    parser.add_argument("--links", type=int, default=60, help="Enlaces por página.")
+    parser.add_argument("--crlf", type=float, default=0.25, help="Proporción de archivos con CRLF.")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla del generador.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por regla.")
+    parser.add_argument("--rules", help="Lista separada por comas (por defecto, todas).")
+    parser.add_argument("--out", metavar="ARCHIVO", help="Guarda los resultados en JSON.")
+    asef_profile.add_arguments(parser)
+    args = parser.parse_args()
+    asef_profile.start(args)
+
+    corpus = generate_corpus(args.pages, args.links, args.seed, args.crlf)
+    rules = {name: (fn, False) for name, fn in text_rules().items()}
+    rules.update({name: (fn, True) for name, fn in file_rules().items()})
+    if args.rules:
+        wanted = [r.strip() for r in args.rules.split(",")]
+        rules = {k: v for k, v in rules.items() if k in wanted}
+
+    size_kb = sum(len(t.encode("utf-8")) for _, t in corpus) / 1024
+    print(f"⏱  ASEF | Benchmark de reglas — {len(corpus)} páginas, {args.links} enlaces/página, {size_kb:.0f} KB\n")
+    print(f"{'regla':<28} {'MB/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'pico KB':>9}")
+
+    results = {}
+    workdir = Path(tempfile.mkdtemp(prefix="asef_bench_"))
+    try:
+        for name, (fn, on_disk) in rules.items():
+            r = bench_rule(fn, corpus, on_disk, workdir, args.repeat)
+            results[name] = r
+            print(f"{name:<28} {r['mb_per_s'] or 0:>8.2f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['peak_mem_kb']:>9.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        report = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "corpus": {"pages": args.pages, "links": args.links, "crlf": args.crlf,
+                       "seed": args.seed, "bytes": int(size_kb * 1024)},
+            "rules": results,
+        }
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nResultados guardados en: {args.out}")
+
+    asef_profile.finish(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+asef_bench_repair.py — Compara el motor de una sola pasada (repair_html) contra
+la cadena multi-pasada original (ensure_dynamic_base + fix_attrs + ensure_favicon).
+
+Se mide sobre dos entradas:
+  - las páginas del proyecto, con el cuerpo repetido (x1, x10, x50)
+  - el corpus sintético de asef_bench (por defecto 200 páginas x 80 enlaces,
+    con rutas sin normalizar: el caso denso en enlaces, donde se ve si el
+    motor parsea atributos de más), tal cual y ya reparado
+
+Uso:
+    python asef_bench_repair.py              # páginas del proyecto, x1, x10, x50 + corpus 200x80
+    python asef_bench_repair.py --scale 200  # documento más grande
+    python asef_bench_repair.py --pages 50 --links 300
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from asef_bench import generate_corpus
+from asef_repair_all import ensure_dynamic_base, fix_attrs, ensure_favicon, repair_html
+
+ROOT = Path(__file__).parent
+
+
+def multi_pass(html: str) -> str:
+    html, _ = ensure_dynamic_base(html)
+    html, _ = fix_attrs(html)
+    html, _ = ensure_favicon(html)
+    return html
+
+
+def single_pass(html: str) -> str:
+    # Con el base dinámico: el mismo trabajo que la cadena multi-pasada
+    html, _ = repair_html(html, dynamic_base=True)
+    return html
+
+
+def load_sample() -> str:
+    """Une index.html y las páginas de pages/** en un solo cuerpo de prueba."""
+    files = [ROOT / "index.html"] + sorted((ROOT / "pages").rglob("*.html"))
+    bodies = [f.read_text(encoding="utf-8", errors="ignore") for f in files if f.exists()]
+    return "\n".join(bodies)
+
+
+def scaled(sample: str, scale: int) -> str:
+    # Un solo <head> y el cuerpo repetido: simula un bundle grande de dist/
+    head, sep, body = sample.partition("</head>")
+    return head + sep + body * scale
+
+
+def timeit(fn, docs: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for html in docs:
+            fn(html)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def row(label: str, docs: list, repeat: int):
+    t_multi = timeit(multi_pass, docs, repeat)
+    t_single = timeit(single_pass, docs, repeat)
+    size_kb = sum(len(html.encode("utf-8")) for html in docs) / 1024
+    print(f"{label:>9} {size_kb:>8.0f}KB {t_multi * 1000:>11.2f} {t_single * 1000:>12.2f} {t_multi / t_single:>7.2f}x "
+          f"{size_kb / 1024 / t_single:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de reparación HTML.")
+    parser.add_argument("--scale", type=int, action="append", help="Factor de repetición del cuerpo (repetible).")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición (se toma el mejor).")
+    parser.add_argument("--pages", type=int, default=200, help="Páginas del corpus sintético (0 = no medirlo).")
+    parser.add_argument("--links", type=int, default=80, help="Enlaces por página del corpus sintético.")
+    args = parser.parse_args()
+
+    sample = load_sample()
+    print("⏱  ASEF | Benchmark repair_html (una pasada) vs cadena multi-pasada\n")
+    print(f"{'entrada':>9} {'tamaño':>10} {'multi (ms)':>11} {'single (ms)':>12} {'speedup':>8} {'MB/s':>7}")
+    for scale in args.scale or [1, 10, 50]:
+        row(f"x{scale}", [scaled(sample, scale)], args.repeat)
+    if args.pages:
+        corpus = [html for _, html in generate_corpus(args.pages, args.links)]
+        row(f"{args.pages}x{args.links}", corpus, args.repeat)
+        # El mismo corpus ya reparado: lo que ve cada corrida después de la primera
+        row("reparado", [single_pass(html) for html in corpus], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
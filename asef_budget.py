@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+asef_budget.py — Presupuesto de peso por página: compuerta antes del deploy.
+
+Para index.html y cada página de pages/** calcula lo que baja el navegador en
+la primera visita:
+  - HTML + CSS enlazados (con sus @import y url()) + clausura de módulos JS
+    (asef_modgraph) + imágenes (<img>, srcset eligiendo el candidato para
+    --viewport, poster, favicon)
+  - peso crudo y estimado con gzip (nivel 6, como un servidor típico; las
+    imágenes ya vienen comprimidas y cuentan crudas)
+  - cantidad de pedidos (locales + externos; de los externos no se sabe el peso)
+  - recursos que bloquean el render: hojas de estilos del <head> (y sus
+    @import) y <script src> clásicos del <head> sin defer/async
+
+y lo compara con asef_budgets.json: "default" para todas las páginas y
+"pages" con reemplazos por página o patrón (pages/admin/*.html), aplicados en
+orden. Si alguna página se pasa, muestra el desglose y sale con código 1.
+
+Todas las páginas comparten UN índice de referencias (asef_refs, con caché en
+disco) y un grafo de módulos: cada CSS/JS se mide una sola vez, y el tamaño
+gzip se guarda por hash en .asef_cache/budget.json. Con la caché caliente el
+sitio entero se revisa en milisegundos.
+
+Uso:
+    python asef_budget.py
+    python asef_budget.py --page index.html --viewport 390
+    python asef_budget.py --budgets otro.json --json reporte.json
+"""
+
+import argparse
+import fnmatch
+import gzip
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from asef_html import iter_tags
+from asef_link_graph import is_external, resolve
+from asef_manifest import MANIFEST_DIR
+from asef_modgraph import ModuleGraph
+from asef_refs import RefIndex
+
+ROOT = Path(__file__).parent
+BUDGETS_FILE = "asef_budgets.json"
+GZIP_CACHE = "budget.json"
+
+GZIP_LEVEL = 6
+GZIP_EXTS = (".html", ".css", ".js", ".mjs", ".svg", ".json", ".xml", ".txt")
+VIEWPORT = 1366
+
+# Métricas con presupuesto: nombre -> (etiqueta, unidad)
+METRICS = {
+    "total_kb": ("Peso total", "KB"),
+    "gzip_kb": ("Peso gzip (estimado)", "KB"),
+    "html_kb": ("HTML", "KB"),
+    "css_kb": ("CSS", "KB"),
+    "js_kb": ("JS", "KB"),
+    "img_kb": ("Imágenes", "KB"),
+    "requests": ("Pedidos", ""),
+    "render_blocking": ("Bloquean el render", ""),
+}
+
+# Si no hay archivo de presupuestos
+DEFAULT_BUDGETS = {"default": {"gzip_kb": 1000, "js_kb": 150, "requests": 40, "render_blocking": 8}, "pages": {}}
+
+CATEGORIES = ("html", "css", "js", "img", "other")
+IMG_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".ico")
+
+
+def is_page(rel: str) -> bool:
+    return rel == "index.html" or (rel.startswith("pages/") and rel.endswith(".html"))
+
+
+def category(rel: str) -> str:
+    ext = os.path.splitext(rel)[1].lower()
+    if ext == ".html":
+        return "html"
+    if ext == ".css":
+        return "css"
+    if ext in (".js", ".mjs"):
+        return "js"
+    return "img" if ext in IMG_EXTS else "other"
+
+
+def pick_srcset(srcset: str, viewport: int = VIEWPORT) -> str:
+    """Candidato que elegiría el navegador con un ancho de `viewport` (sizes=100vw, DPR 1)."""
+    best = None
+    for part in srcset.split(","):
+        bits = part.split()
+        if not bits:
+            continue
+        desc = bits[1] if len(bits) > 1 else "1x"
+        try:
+            width = int(desc[:-1]) if desc.endswith("w") else int(float(desc[:-1]) * viewport)
+        except ValueError:
+            continue
+        # El más chico que alcance; si ninguno alcanza, el más grande
+        key = (width < viewport, width if width >= viewport else -width)
+        if best is None or key < best[0]:
+            best = (key, bits[0])
+    return best[1] if best else ""
+
+
+class Sizes:
+    """Peso crudo y gzip de los archivos del sitio, con el gzip cacheado por hash."""
+
+    def __init__(self, index: RefIndex, use_cache: bool = True):
+        self.index = index
+        self.path = index.root / MANIFEST_DIR / GZIP_CACHE
+        self.use_cache = use_cache
+        self.gz = {}
+        self.memo = {}
+        self.dirty = False
+        if use_cache:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("level") == GZIP_LEVEL:
+                    self.gz = data.get("sizes", {})
+            except (OSError, ValueError):
+                pass
+
+    def get(self, rel: str) -> tuple[int, int]:
+        if rel in self.memo:
+            return self.memo[rel]
+        path = self.index.files[rel]
+        e = self.index.entries.get(rel)
+        raw = e["size"] if e else path.stat().st_size
+        packed = raw
+        if rel.lower().endswith(GZIP_EXTS):
+            digest = self.index.hash(rel)
+            packed = self.gz.get(digest)
+            if packed is None:
+                packed = len(gzip.compress(path.read_bytes(), compresslevel=GZIP_LEVEL, mtime=0))
+                self.gz[digest] = packed
+                self.dirty = True
+        self.memo[rel] = (raw, packed)
+        return raw, packed
+
+    def save(self):
+        if not (self.use_cache and self.dirty):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"level": GZIP_LEVEL, "sizes": self.gz}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def scan_page(html: str, page: str, has_base: bool, viewport: int = VIEWPORT) -> dict:
+    """Una pasada por los tags de la página: hojas de estilo, imágenes, externos y bloqueantes del <head>."""
+    found = {"styles": [], "images": [], "external": [], "blocking": []}
+    in_head = True
+    for tag in iter_tags(html, names=("body", "link", "script", "img", "video"), closing=("head",)):
+        if tag.name in ("/head", "body"):
+            in_head = False
+            continue
+        urls = []
+        if tag.name == "link":
+            rels = (tag.get("rel") or "").lower().split()
+            href = (tag.get("href") or "").strip()
+            if "stylesheet" in rels:
+                urls.append(("css", href))
+                media = (tag.get("media") or "all").strip().lower()
+                if in_head and media in ("all", "screen", ""):
+                    found["blocking"].append(href)
+            elif "icon" in rels:
+                urls.append(("img", href))
+        elif tag.name == "script":
+            src = (tag.get("src") or "").strip()
+            if src and in_head and (tag.get("type") or "").strip().lower() != "module" \
+                    and not tag.has("defer") and not tag.has("async"):
+                found["blocking"].append(src)
+            # Los scripts locales salen de la clausura de módulos; acá sólo interesan los externos
+            if src and is_external(src):
+                urls.append(("js", src))
+        elif tag.name == "img":
+            srcset = tag.get("srcset")
+            urls.append(("img", pick_srcset(srcset, viewport) if srcset else (tag.get("src") or "").strip()))
+        elif tag.name == "video" and tag.get("poster"):
+            urls.append(("img", tag.get("poster").strip()))
+        for kind, url in urls:
+            if not url or url.startswith("data:"):
+                continue
+            if is_external(url):
+                if url.startswith(("http://", "https://", "//")):
+                    found["external"].append(url)
+                continue
+            target = resolve(url, page, has_base)
+            if target:
+                found["styles" if kind == "css" else "images"].append(target)
+    return found
+
+
+def measure_page(page: str, index: RefIndex, graph: ModuleGraph, sizes: Sizes, viewport: int = VIEWPORT) -> dict:
+    html = index.files[page].read_text(encoding="utf-8", errors="replace")
+    found = scan_page(html, page, index.entries[page]["base"], viewport)
+
+    files = {page}
+    missing = set()
+    blocking = len(found["blocking"])
+    # CSS: hojas enlazadas + @import (bloquean igual) + url() (fuentes, fondos)
+    stack = list(found["styles"])
+    while stack:
+        rel = stack.pop()
+        if rel in files:
+            continue
+        if rel not in index.files:
+            missing.add(rel)
+            continue
+        files.add(rel)
+        for ref in index.local_refs(rel):
+            stack.append(ref.target)
+            if ref.kind == "import":
+                blocking += 1
+    # url() en <style> y style="..." de la página
+    files.update(r.target for r in index.local_refs(page) if r.kind == "url")
+    info = graph.page(page)
+    files.update(info["modules"])
+    missing.update(info["missing"])
+    for rel in found["images"]:
+        (files if rel in index.files else missing).add(rel)
+
+    totals = {c: [0, 0] for c in CATEGORIES}
+    detail = []
+    for rel in sorted(files):
+        raw, packed = sizes.get(rel)
+        totals[category(rel)][0] += raw
+        totals[category(rel)][1] += packed
+        detail.append((rel, raw, packed))
+    external = sorted(set(found["external"]) | set(info["external"]))
+    raw_total = sum(t[0] for t in totals.values())
+    gz_total = sum(t[1] for t in totals.values())
+    return {
+        "metrics": {
+            "total_kb": round(raw_total / 1024, 1),
+            "gzip_kb": round(gz_total / 1024, 1),
+            "html_kb": round(totals["html"][0] / 1024, 1),
+            "css_kb": round(totals["css"][0] / 1024, 1),
+            "js_kb": round(totals["js"][0] / 1024, 1),
+            "img_kb": round(totals["img"][0] / 1024, 1),
+            "requests": len(files) + len(external),
+            "render_blocking": blocking,
+        },
+        "files": detail,
+        "external": external,
+        "missing": sorted(missing),
+    }
+
+
+def load_budgets(path: Path) -> dict:
+    if not path.exists():
+        return DEFAULT_BUDGETS
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError as e:
+        raise SystemExit(f"❌ {path.name} no es JSON válido: {e}")
+    unknown = {k for b in [data.get("default", {}), *data.get("pages", {}).values()] for k in b} - set(METRICS)
+    unknown = {k for k in unknown if not k.startswith("_")}
+    if unknown:
+        raise SystemExit(f"❌ Métricas desconocidas en {path.name}: {', '.join(sorted(unknown))} "
+                         f"(válidas: {', '.join(METRICS)})")
+    return data
+
+
+def budget_for(page: str, budgets: dict) -> dict:
+    """'default' + cada entrada de 'pages' cuyo patrón coincide, en orden (la última gana)."""
+    limits = dict(budgets.get("default", {}))
+    for pattern, override in budgets.get("pages", {}).items():
+        if page == pattern or fnmatch.fnmatchcase(page, pattern):
+            limits.update(override)
+    return {k: v for k, v in limits.items() if not k.startswith("_") and v is not None}
+
+
+def check(root: Path, budgets: dict, viewport: int = VIEWPORT, use_cache: bool = True, only=None) -> dict:
+    t0 = time.perf_counter()
+    index = RefIndex(root, use_cache=use_cache).update()
+    graph = ModuleGraph(index)
+    sizes = Sizes(index, use_cache=use_cache)
+    pages = {}
+    for page in sorted(rel for rel in index.entries if is_page(rel)):
+        if only and page not in only:
+            continue
+        res = measure_page(page, index, graph, sizes, viewport)
+        limits = budget_for(page, budgets)
+        res["limits"] = limits
+        res["over"] = {k: (res["metrics"][k], v) for k, v in limits.items() if res["metrics"][k] > v}
+        pages[page] = res
+    sizes.save()
+    return {
+        "pages": pages,
+        "index_hits": index.hits,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def print_breakdown(page: str, res: dict, top: int = 8):
+    m = res["metrics"]
+    print(f"\n📄 {page}")
+    for key, (label, unit) in METRICS.items():
+        limit = res["limits"].get(key)
+        mark = "❌" if key in res["over"] else "  "
+        suffix = f" {unit}" if unit else ""
+        print(f"  {mark} {label:<20} {f'{m[key]}{suffix}':>12}" + (f"  (límite {limit}{suffix})" if limit is not None else ""))
+    heavy = sorted(res["files"], key=lambda f: f[1], reverse=True)[:top]
+    print("     Más pesados:")
+    for rel, raw, packed in heavy:
+        print(f"       {rel:<40} {raw / 1024:>9.1f} KB  (gzip {packed / 1024:.1f} KB)")
+    for url in res["external"]:
+        print(f"       ↗ {url}")
+    for rel in res["missing"]:
+        print(f"       ⚠️  no existe: {rel}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de peso por página de ASEF (compuerta de deploy).")
+    parser.add_argument("--budgets", default=str(ROOT / BUDGETS_FILE), help="Archivo de presupuestos (JSON).")
+    parser.add_argument("--viewport", type=int, default=VIEWPORT, help="Ancho (px) para elegir el candidato de srcset.")
+    parser.add_argument("--page", action="append", help="Revisar sólo esta(s) página(s), con desglose.")
+    parser.add_argument("--json", metavar="ARCHIVO", help="Guarda el reporte en JSON.")
+    parser.add_argument("--no-cache", action="store_true", help="Re-extrae referencias y recomprime (ignora .asef_cache).")
+    args = parser.parse_args()
+
+    budgets_path = Path(args.budgets)
+    budgets = load_budgets(budgets_path)
+    print(f"⚖️  ASEF | Presupuesto por página ({budgets_path.name if budgets_path.exists() else 'valores por defecto'})\n")
+    report = check(ROOT, budgets, args.viewport, use_cache=not args.no_cache, only=args.page)
+    pages = report["pages"]
+
+    print(f"{'página':<34} {'KB':>8} {'gzip KB':>8} {'JS KB':>7} {'img KB':>8} {'pedidos':>7} {'bloq':>5}")
+    for page, res in pages.items():
+        m = res["metrics"]
+        mark = "❌" if res["over"] else "✅"
+        print(f"{page:<34} {m['total_kb']:>8} {m['gzip_kb']:>8} {m['js_kb']:>7} {m['img_kb']:>8} "
+              f"{m['requests']:>7} {m['render_blocking']:>5} {mark}")
+
+    failed = {p: r for p, r in pages.items() if r["over"]}
+    for page in args.page or ():
+        if page not in pages:
+            print(f"\n⚠️  {page}: no es una página del sitio")
+    for page, res in pages.items():
+        if res["over"] or (args.page and page in args.page):
+            print_breakdown(page, res)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    print("\n===== RESUMEN ASEF BUDGET =====")
+    print(f"Páginas revisadas : {len(pages)}")
+    print(f"Fuera de presup.  : {len(failed)}")
+    print(f"Índice en caché   : {report['index_hits']}")
+    print(f"Tiempo            : {report['elapsed_ms']} ms")
+    if failed:
+        print("\n❌ Presupuesto excedido:")
+        for page, res in failed.items():
+            over = ", ".join(f"{METRICS[k][0]} {v} > {lim}" for k, (v, lim) in res["over"].items())
+            print(f"  - {page}: {over}")
+        sys.exit(1)
+    print("✅ Todas las páginas dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+asef_fingerprint.py — Etapa de build: assets con hash en el nombre (caché larga).
+
+Con nombres estables (css/main.css, js/auth.js, ...) los visitantes de GitHub
+Pages revalidan todo en cada visita o se quedan con código viejo después de un
+deploy. Esta etapa arma un árbol de salida (por defecto build/) donde:
+  - cada CSS/JS/imagen/fuente local tiene además una copia nombre.<hash>.ext
+  - todas las referencias a esos assets apuntan a la copia con hash: href/src/
+    srcset en los HTML, url()/@import en CSS e import entre módulos js/*.js
+  - asset-manifest.json mapea ruta original -> ruta con hash
+
+Todo sale de una sola pasada guiada por el índice de referencias (asef_refs,
+con caché por hash): no se vuelve a parsear nada para reescribir.
+
+El hash de un asset es el de su contenido, y si referencia otros assets (un CSS
+con url(), un módulo con import) se combina con los hashes de ellos: cambiar una
+imagen cambia el nombre del CSS que la usa, y un asset que no cambió conserva
+su nombre entre builds (la caché del navegador sobrevive al deploy).
+
+Con --targets se genera un árbol por destino (build/local para '/',
+build/pages para '/asefweb/') con las URLs ya resueltas y sin el script de base
+dinámico: ver asef_targets.
+
+Con --minify los HTML/CSS/JS salen minificados (asef_minify, con caché) y la
+versión del minificador entra en el hash, así el nombre cambia si cambian los
+bytes publicados.
+
+Los nombres originales se siguen publicando para las URLs que el índice no ve
+(rutas armadas en tiempo de ejecución). Lo de public/ se publica en la raíz
+con su nombre, como en Vite. Sólo se escriben los archivos que cambian y se
+borran los que quedaron de builds anteriores.
+
+Uso:
+    python asef_fingerprint.py
+    python asef_fingerprint.py --out build --no-cache
+    python asef_fingerprint.py --minify
+    python asef_fingerprint.py --minify --targets local,pages   # build/local y build/pages
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import sys
+import time
+from pathlib import Path
+
+from asef_link_graph import PUBLIC_DIRS
+from asef_manifest import hash_bytes
+from asef_minify import MINIFIER, Minifier
+from asef_output import atomic_write
+from asef_refs import RefIndex
+from asef_targets import Page, check_runtime_base, parse_targets
+from asef_walk import walk_files
+
+ROOT = Path(__file__).parent
+OUT_DIR = "build"
+ASSET_MANIFEST = "asset-manifest.json"
+HASH_LEN = 8
+PRECOMPRESSED_EXTS = (".gz", ".br")
+
+FINGERPRINT_EXTS = (".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif",
+                    ".ico", ".woff", ".woff2")
+
+
+def hashed_name(rel: str, digest: str) -> str:
+    """css/main.css -> css/main.<hash>.css"""
+    stem, ext = posixpath.splitext(rel)
+    return f"{stem}.{digest}{ext}"
+
+
+def swap_basename(url: str, name: str) -> str:
+    """Cambia el último segmento de la ruta de `url` conservando carpeta, ?query y #ancla."""
+    cut = len(url)
+    for ch in "?#":
+        i = url.find(ch)
+        if i >= 0:
+            cut = min(cut, i)
+    path, rest = url[:cut], url[cut:]
+    folder = path.rsplit("/", 1)[0] + "/" if "/" in path else ""
+    return folder + name + rest
+
+
+def rewrite_refs(text: str, refs: list, names: dict) -> tuple[str, int]:
+    """Reemplaza, de izquierda a derecha, cada referencia a un asset con hash."""
+    out = []
+    last = 0
+    count = 0
+    for ref in sorted(refs, key=lambda r: r.start):
+        new = names.get(ref.target)
+        if new is None or ref.start < last:
+            continue
+        out.append(text[last:ref.start])
+        out.append(swap_basename(ref.url, posixpath.basename(new)))
+        last = ref.end
+        count += 1
+    if not count:
+        return text, 0
+    out.append(text[last:])
+    return "".join(out), count
+
+
+class Fingerprints:
+    """Hash de cada asset: contenido + hashes de los assets que referencia (memoizado)."""
+
+    def __init__(self, index: RefIndex, salt: str = ""):
+        self.index = index
+        self.salt = salt          # versión de las transformaciones que cambian los bytes publicados
+        self.memo = {}
+        self.visiting = set()
+
+    def eligible(self, rel: str) -> bool:
+        if not rel.endswith(FINGERPRINT_EXTS):
+            return False
+        # Lo de public/ se publica con nombre fijo (favicon.svg, ...)
+        source = self.index.files[rel].relative_to(self.index.root).parts[0]
+        return source not in PUBLIC_DIRS
+
+    def get(self, rel: str) -> str:
+        if rel in self.memo:
+            return self.memo[rel]
+        if rel in self.visiting:
+            # Ciclo de imports: se corta con el hash del contenido
+            return self.index.hash(rel)[:HASH_LEN]
+        self.visiting.add(rel)
+        deps = sorted({r.target for r in self.index.local_refs(rel) if r.target != rel and self.eligible(r.target)})
+        own = self.index.hash(rel)
+        if self.salt:
+            own = hash_bytes(f"{own}:{self.salt}".encode("utf-8"))
+        if deps:
+            parts = [own] + [f"{d}={self.get(d)}" for d in deps]
+            digest = hash_bytes("\0".join(parts).encode("utf-8"))[:HASH_LEN]
+        else:
+            digest = own[:HASH_LEN]
+        self.visiting.discard(rel)
+        self.memo[rel] = digest
+        return digest
+
+
+def write_tree(out: Path, produced: dict) -> tuple[int, int, int]:
+    """Escribe sólo lo que cambió y borra lo que sobra. Devuelve (escritos, iguales, borrados)."""
+    written = unchanged = 0
+    for rel, data in produced.items():
+        target = out / rel
+        try:
+            same = target.stat().st_size == len(data) and target.read_bytes() == data
+        except OSError:
+            same = False
+        if same:
+            unchanged += 1
+            continue
+        atomic_write(target, data)
+        written += 1
+
+    removed = 0
+    if out.is_dir():
+        for p in walk_files(out, gitignore=False):
+            rel = p.relative_to(out).as_posix()
+            # Las variantes .gz/.br de un archivo vigente son de asef_precompress
+            if rel not in produced and not (rel.endswith(PRECOMPRESSED_EXTS) and rel[:-3] in produced):
+                os.remove(p)
+                removed += 1
+    return written, unchanged, removed
+
+
+def build(src: Path, out: Path, use_cache: bool = True, minifier: Minifier = None, targets: dict = None) -> dict:
+    """
+    Genera el árbol con fingerprints en `out` (minificado si se pasa `minifier`).
+    Con `targets` ({nombre: prefijo}) genera out/<nombre>/ por destino, con las
+    URLs resueltas y sin base dinámico (asef_targets). Devuelve estadísticas.
+    """
+    t0 = time.perf_counter()
+    if out.resolve() == src.resolve() or out.resolve() in src.resolve().parents:
+        raise SystemExit(f"❌ La salida no puede contener a las fuentes: {out}")
+    index = RefIndex(src, use_cache=use_cache).update()
+    fps = Fingerprints(index, salt=MINIFIER if minifier else "")
+    names = {rel: hashed_name(rel, fps.get(rel)) for rel in sorted(index.files) if fps.eligible(rel)}
+
+    shared = {}           # iguales en todos los destinos
+    pages = {}            # rel -> Page (sólo con targets): se parsean una vez, se generan por destino
+    rewritten = 0
+    for rel, path in sorted(index.files.items()):
+        data = path.read_bytes()
+        if targets and rel in index.entries:
+            is_html = rel.endswith(".html")
+            refs = index.refs(rel)
+            if is_html or any(r.target and r.url.startswith("/") for r in refs):
+                page = Page.parse(data.decode("utf-8", errors="replace"), refs, index.entries[rel]["base"],
+                                  names, html=is_html)
+                pages[rel] = page
+                rewritten += page.slots
+                continue
+        refs = [r for r in index.local_refs(rel) if r.target in names]
+        if refs:
+            text, n = rewrite_refs(data.decode("utf-8", errors="replace"), refs, names)
+            data = text.encode("utf-8")
+            rewritten += n
+        if minifier is not None:
+            data = minifier.minify(rel, data)
+        shared[rel] = data
+        if rel in names:
+            shared[names[rel]] = data
+    shared[ASSET_MANIFEST] = (json.dumps({"version": 1, "assets": names}, ensure_ascii=False, indent=2,
+                                         sort_keys=True) + "\n").encode("utf-8")
+
+    stats = {"written": 0, "unchanged": 0, "removed": 0, "leftovers": []}
+    trees = {None: (out, shared)} if not targets else {}
+    for name, prefix in (targets or {}).items():
+        produced = dict(shared)
+        for rel, page in pages.items():
+            data = page.render(prefix).encode("utf-8")
+            if minifier is not None:
+                data = minifier.minify(rel, data, label=f"{name}/{rel}")
+            produced[rel] = data
+            if rel in names:
+                produced[names[rel]] = data
+        # Comprobación byte a byte: nada de la base en tiempo de ejecución en la salida
+        stats["leftovers"] += [(name, rel, marker) for rel, marker in check_runtime_base(produced)]
+        trees[name] = (out / name, produced)
+    for tree_out, produced in trees.values():
+        w, u, r = write_tree(tree_out, produced)
+        stats["written"] += w
+        stats["unchanged"] += u
+        stats["removed"] += r
+    if targets and out.is_dir():
+        # Restos de un build sin --targets (o de un destino que ya no se pide)
+        for p in walk_files(out, gitignore=False):
+            if p.relative_to(out).parts[0] not in targets:
+                os.remove(p)
+                stats["removed"] += 1
+    if out.is_dir():
+        for folder, _, _ in os.walk(out, topdown=False):
+            if Path(folder) != out and not os.listdir(folder):
+                os.rmdir(folder)
+
+    return {
+        "files": len(index.files),
+        "assets": len(names),
+        "refs_rewritten": rewritten,
+        "targets": list(targets or ()),
+        **stats,
+        "index_hits": index.hits,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint de assets ASEF (nombre.<hash>.ext) en un árbol de salida.")
+    parser.add_argument("--out", default=str(ROOT / OUT_DIR), help="Carpeta de salida (se borra lo que sobra).")
+    parser.add_argument("--no-cache", action="store_true", help="Re-extrae todas las referencias (ignora .asef_cache/refs.json).")
+    parser.add_argument("--minify", action="store_true", help="Minifica HTML/CSS/JS (asef_minify) antes de escribir.")
+    parser.add_argument("--targets", metavar="local,pages",
+                        help="Un árbol por destino (out/<nombre>/) con URLs resueltas y sin base dinámico; "
+                             "también nombre=/prefijo/.")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    print(f"🏷  ASEF | Fingerprint de assets → {out}\n")
+    minifier = Minifier(ROOT, use_cache=not args.no_cache) if args.minify else None
+    targets = parse_targets(args.targets) if args.targets else None
+    stats = build(ROOT, out, use_cache=not args.no_cache, minifier=minifier, targets=targets)
+
+    print("===== RESUMEN ASEF FINGERPRINT =====")
+    print(f"Archivos del sitio    : {stats['files']}")
+    print(f"Assets con hash       : {stats['assets']}")
+    print(f"Referencias reescritas: {stats['refs_rewritten']}")
+    if targets:
+        print(f"Destinos              : {', '.join(f'{n} ({p})' for n, p in targets.items())}")
+    print(f"Escritos / iguales    : {stats['written']} / {stats['unchanged']}")
+    print(f"Eliminados (viejos)   : {stats['removed']}")
+    print(f"Índice en caché       : {stats['index_hits']}")
+    print(f"Tiempo                : {stats['elapsed_ms']} ms")
+    if minifier is not None:
+        minifier.report()
+    if stats["leftovers"]:
+        print("\n❌ Quedó lógica de base dinámica en la salida:")
+        for name, rel, marker in stats["leftovers"]:
+            print(f"  - {name}/{rel}: {marker}")
+        sys.exit(1)
+    for name in targets or (None,):
+        print(f"✔ Manifiesto: {(out / name if name else out) / ASSET_MANIFEST}")
+
+
+if __name__ == "__main__":
+    main()
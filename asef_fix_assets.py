@@ -1,108 +1,352 @@
 import os
 import re
+import argparse
+
+from asef_hints import HINT_MARK, HINT_RELS, existing_hints, graph_version, insert_hints, plan_hints, strip_hints
+from asef_html import iter_tags
+from asef_manifest import Manifest, rules_hash
+from asef_output import OUTPUT
+import asef_output
+from asef_walk import walk_files
+from asef_profile import PROFILER
+import asef_profile
 
 # ==========================================================
 # ASEFWEB – Asset & Meta Fixer (versión final)
 # ----------------------------------------------------------
 # Corrige rutas CSS/JS, limpia duplicados de favicon/meta/base,
-# corrige favicon dañado y elimina comentarios redundantes.
+# corrige favicon dañado, elimina comentarios redundantes y agrega
+# resource hints (modulepreload/preconnect, ver asef_hints).
+# Todo trabaja sólo sobre el <head>: se ubica </head> una vez, los
+# cambios salen como tramos (inicio, fin, nuevo) y el archivo se arma
+# con un único join al escribir; del <body> sólo se buscan los src= de
+# los <script>, sin copiarlo.
 # Compatible con localhost y GitHub Pages (/asefweb/).
 # ==========================================================
 
 ROOT = "C:\\asefweb"
 TARGET_EXT = (".html",)
 
-def fix_assets(content):
-    # --- 1️⃣ Corrige rutas de CSS/JS ---
-    content = re.sub(r'href="/css/', 'href="css/', content)
-    content = re.sub(r'src="/js/', 'src="js/', content)
-    content = re.sub(r'href="/asefweb/css/', 'href="css/', content)
-    content = re.sub(r'src="/asefweb/js/', 'src="js/', content)
-
-    # --- 2️⃣ Elimina duplicados de favicon, meta y base ---
-    lines = content.splitlines()
-    seen_favicon = seen_base = seen_charset = seen_viewport = False
-    cleaned_lines = []
-
-    for line in lines:
-        line_strip = line.strip()
-
-        # Favicon
-        if re.search(r'rel=["\']icon["\']', line_strip, re.I):
-            if seen_favicon:
-                continue
-            seen_favicon = True
-
-        # <base>
-        if re.search(r'<base ', line_strip, re.I):
-            if seen_base:
-                continue
-            seen_base = True
-
-        # Meta charset
-        if re.search(r'<meta.*charset', line_strip, re.I):
-            if seen_charset:
-                continue
-            seen_charset = True
-
-        # Meta viewport
-        if re.search(r'<meta.*viewport', line_strip, re.I):
-            if seen_viewport:
-                continue
-            seen_viewport = True
-
-        cleaned_lines.append(line)
-
-    content = "\n".join(cleaned_lines)
-
-    # --- 3️⃣ Corrige favicons dañados ---
-    content = re.sub(
-        r'href="[^"]*data:image/svg\+xml[^"]*"',
-        'href="data:image/svg+xml,<svg xmlns=\'http://www.w3.org/2000/svg\' viewBox=\'0 0 100 100\'><text y=\'.9em\' font-size=\'90\'>🏛️</text></svg>"',
-        content,
-    )
-
-    # --- 4️⃣ Elimina comentarios HTML redundantes ---
-    redundant_comments = [
-        r'<!--\s*CSS\s*Files\s*-->',
-        r'<!--\s*JS\s*Files\s*-->',
-        r'<!--\s*Favicon\s*-->',
-        r'<!--\s*Canonical\s*URL\s*-->',
-        r'<!--\s*Meta\s*Tags\s*-->',
-        r'<!--\s*SEO\s*Meta\s*Tags\s*-->',
-        r'<!--\s*Open\s*Graph\s*Tags\s*-->',
-    ]
-    for pattern in redundant_comments:
-        content = re.sub(pattern, "", content, flags=re.I)
+# Rutas absolutas de CSS/JS propios: una sola pasada para los cuatro prefijos.
+# El patrón arranca con el literal '="/' (búsqueda rápida) y el nombre del
+# atributo se verifica mirando hacia atrás en el repl: href para css/, src para js/.
+RE_ASSET_ROOT = re.compile(r'="/(?:asefweb/)?(css|js)/')
+ROOT_ATTR = {"css": "href", "js": "src"}
+# Fuera del <head> sólo quedan los <script src> (van al final del <body>); el
+# patrón arranca con un literal, así la búsqueda en el <body> no se detiene en cada carácter
+RE_SCRIPT_ROOT = re.compile(r'src="/(?:asefweb/)?js/')
+
+# Comentarios que no aportan nada (todos viven en el <head>)
+RE_REDUNDANT_COMMENT = re.compile(
+    r'<!--\s*(?:CSS\s*Files|JS\s*Files|Favicon|Canonical\s*URL|Meta\s*Tags'
+    r'|SEO\s*Meta\s*Tags|Open\s*Graph\s*Tags)\s*-->',
+    re.I,
+)
+RE_BLANK_LINES = re.compile(r'\n\s*\n+')
+RE_DATA_FAVICON = re.compile(r'href="[^"]*data:image/svg\+xml[^"]*"')
+DATA_FAVICON = 'href="data:image/svg+xml,<svg xmlns=\'http://www.w3.org/2000/svg\' viewBox=\'0 0 100 100\'><text y=\'.9em\' font-size=\'90\'>🏛️</text></svg>"'
+RE_TITLE_CLOSE = re.compile(r'</title\s*>', re.I)
+RE_HEAD_CLOSE = re.compile(r'</head\s*>', re.I)
+
+# Elementos del <head> que se deduplican (gana el primero con la misma clave)
+HEAD_DEDUP_TAGS = ("base", "meta", "link", "title")
+
+
+def _root_repl(m):
+    folder = m.group(1)
+    attr = ROOT_ATTR[folder]
+    if m.start() >= len(attr) and m.string.startswith(attr, m.start() - len(attr)):
+        return f'="{folder}/'
+    return m.group(0)
+
+
+def _apply_edits(text, edits):
+    """Texto con los tramos (inicio, fin, nuevo) reemplazados, en un solo join (sin tramos: el mismo texto)."""
+    if not edits:
+        return text
+    parts = []
+    last = 0
+    for start, end, new in sorted(edits, key=lambda e: e[0]):
+        parts.append(text[last:start])
+        parts.append(new)
+        last = end
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+def _root_edits(content, start, end):
+    edits = []
+    for m in RE_ASSET_ROOT.finditer(content, start, end):
+        new = _root_repl(m)
+        if new != m.group(0):
+            edits.append((m.start(), m.end(), new))
+    return edits
+
+
+def asset_root_edits(content, bounds):
+    """
+    Tramos de las rutas /css/ y /js/ absolutas. Con `bounds` (el <head>) se
+    revisa el <head> entero y, del resto, sólo los src= (los <script> del final
+    del <body>); sin <head> cerrado, todo el documento.
+    """
+    with PROFILER.rule("fix_assets.roots", content) as rule:
+        if bounds is None:
+            edits = _root_edits(content, 0, len(content))
+        else:
+            start, end = bounds
+            edits = _root_edits(content, start, end)
+            edits += [(m.start() + 3, m.end(), '="js/') for m in RE_SCRIPT_ROOT.finditer(content, end)]
+        rule.matches = rule.replacements = len(edits)
+    return edits
+
+
+def fix_asset_roots(content):
+    # --- 1️⃣ Corrige rutas de CSS/JS (en el <head> y en los <script> del <body>) ---
+    return _apply_edits(content, asset_root_edits(content, head_range(content)))
+
+
+def _head_start(html, close):
+    """Fin de <head> si el tokenizador llega a `close` como cierre real; si no, None."""
+    start = None
+    for tag in iter_tags(html, names=("head",), closing=("head",)):
+        if tag.name == "head":
+            if start is None:
+                start = tag.end
+        elif tag.start == close:
+            return start
+        else:
+            return None
+    return None
+
+
+def head_range(content):
+    """
+    (inicio, fin) del contenido del <head>: desde el '>' de <head> hasta </head>.
+    </head> se ubica con una búsqueda literal y se tokeniza sólo hasta ahí, así
+    que el costo depende del tamaño del <head>, no de la página. Si ese </head>
+    cae dentro de un <script> o comentario se tokeniza el documento completo.
+    Devuelve None si no hay <head> cerrado.
+    """
+    close = RE_HEAD_CLOSE.search(content)
+    if close is None:
+        return None
+    start = _head_start(content[:close.end()], close.start())
+    if start is not None:
+        return start, close.start()
+    for tag in iter_tags(content, names=("head",), closing=("head",)):
+        if tag.name == "head":
+            if start is None:
+                start = tag.end
+        elif start is not None:
+            return start, tag.start
+    return None
+
+
+def _head_edit(content, fn, bounds, pending=()):
+    """
+    fn(texto_del_head) como tramo [(inicio, fin, head_nuevo)] ([] si no cambia).
+    `pending` son tramos ya calculados dentro del <head>: se aplican antes de fn.
+    """
+    start, end = bounds
+    head = content[start:end]
+    fixed = fn(_apply_edits(head, [(s - start, e - start, new) for s, e, new in pending]))
+    return [] if fixed == head else [(start, end, fixed)]
+
+
+def _in_head(content, fn):
+    """Aplica fn(texto_del_head) y reinserta el resultado; sin <head> cerrado, no cambia nada."""
+    bounds = head_range(content)
+    if bounds is None:
+        return content
+    return _apply_edits(content, _head_edit(content, fn, bounds))
+
+
+def dedup_key(tag):
+    """Clave semántica de un elemento del <head> (None si no se deduplica)."""
+    name = tag.name
+    if name == "base":
+        return ("base",)
+    if name == "title":
+        return ("title",)
+    if name == "meta":
+        if tag.has("charset"):
+            return ("charset",)
+        meta_name = (tag.get("name") or "").strip().lower()
+        if meta_name == "viewport":
+            return ("viewport",)
+        return None
+    rel = " ".join((tag.get("rel") or "").lower().split())
+    if "icon" in rel.split():
+        return ("icon", rel, (tag.get("sizes") or "").strip().lower(), (tag.get("media") or "").strip())
+    if rel in HINT_RELS:
+        return ("hint", rel, (tag.get("href") or "").strip(), tag.has("crossorigin"))
+    return None
+
+
+def _element_end(tag, head):
+    if tag.name != "title":
+        return tag.end
+    close = RE_TITLE_CLOSE.match(head, tag.raw_end)
+    return close.end() if close else tag.raw_end
+
+
+def _drop_span(head, start, end):
+    """
+    Amplía [start, end) a la línea completa si el elemento está solo en ella;
+    si comparte la línea, se lleva sólo los espacios que lo preceden.
+    """
+    line_start = head.rfind("\n", 0, start) + 1
+    line_end = head.find("\n", end)
+    line_end = len(head) if line_end < 0 else line_end
+    if head[line_start:start].strip() or head[end:line_end].strip():
+        while start > line_start and head[start - 1] in " \t":
+            start -= 1
+        return start, end
+    return line_start, min(line_end + 1, len(head))
 
+
+def _dedup_head(head):
+    seen = set()
+    drops = []
+    for tag in iter_tags(head, names=HEAD_DEDUP_TAGS):
+        key = dedup_key(tag)
+        if key is None:
+            continue
+        if key in seen:
+            drops.append(_drop_span(head, tag.start, _element_end(tag, head)))
+        else:
+            seen.add(key)
+    if not drops:
+        return head, 0
+    parts = []
+    pos = 0
+    for start, end in drops:
+        parts.append(head[pos:start])
+        pos = end
+    parts.append(head[pos:])
+    return "".join(parts), len(drops)
+
+
+def _dedup_rule(head):
+    with PROFILER.rule("fix_assets.dedup", head) as rule:
+        head, dropped = _dedup_head(head)
+        rule.matches = rule.replacements = dropped
+    return head
+
+
+def _favicon_rule(head):
+    return PROFILER.sub("fix_assets.favicon", RE_DATA_FAVICON, DATA_FAVICON, head)
+
+
+def _hints_rule(head, hints):
+    # Los hints propios de la corrida anterior se reemplazan por el plan nuevo
+    with PROFILER.rule("fix_assets.hints", head) as rule:
+        rule.matches = rule.replacements = len(hints)
+        return insert_hints(strip_hints(head), hints)
+
+
+def _cleanup_rule(head):
+    head = PROFILER.sub("fix_assets.comments", RE_REDUNDANT_COMMENT, "", head)
     # Elimina líneas vacías duplicadas (doble salto de línea)
-    content = re.sub(r'\n\s*\n+', '\n', content)
+    return PROFILER.sub("fix_assets.blank_lines", RE_BLANK_LINES, '\n', head)
+
+
+def dedup_meta(content):
+    # --- 2️⃣ Elimina duplicados de favicon, <base>, charset, viewport y <title> (sólo <head>) ---
+    return _in_head(content, _dedup_rule)
+
+
+def fix_data_favicon(content):
+    # --- 3️⃣ Corrige favicons dañados (sólo <head>) ---
+    return _in_head(content, _favicon_rule)
+
 
-    return content
+def strip_redundant(content):
+    # --- 4️⃣ Elimina comentarios redundantes y líneas vacías (sólo <head>) ---
+    return _in_head(content, _cleanup_rule)
+
+
+def add_resource_hints(content, rel):
+    # --- 5️⃣ modulepreload/preconnect según el grafo de módulos de la página (sólo <head>) ---
+    hints = plan_hints(content, rel)
+    if not hints and HINT_MARK not in content:
+        return content
+    return _in_head(content, lambda head: _hints_rule(head, hints))
+
+
+def hints_version():
+    """Los hints de una página cambian si cambian los imports de sus módulos."""
+    return graph_version()
+
+
+def fix_head(head, hints=None):
+    # hints=None: sin ruta no hay plan, los hints del <head> no se tocan
+    if hints is not None:
+        head = _hints_rule(head, hints)
+    return _cleanup_rule(_favicon_rule(_dedup_rule(head)))
+
+
+def fix_assets_edits(content, rel=None):
+    """Tramos a reemplazar: el <head> (rutas, hints y las tres limpiezas de una vez) y los src= del <body>."""
+    bounds = head_range(content)
+    roots = asset_root_edits(content, bounds)
+    if bounds is None:
+        return roots
+    hints = plan_hints(content, rel) if rel is not None else None
+    head_end = bounds[1]
+    return (_head_edit(content, lambda head: fix_head(head, hints), bounds, [e for e in roots if e[0] < head_end])
+            + [e for e in roots if e[0] >= head_end])
+
+
+def fix_assets(content, rel=None):
+    return _apply_edits(content, fix_assets_edits(content, rel))
 
 
 def process_html(filepath):
-    with open(filepath, "r", encoding="utf-8") as f:
-        original = f.read()
+    original = OUTPUT.read_text(filepath)
 
-    fixed = fix_assets(original)
-    if fixed != original:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(fixed)
+    rel = os.path.relpath(filepath, ROOT).replace(os.sep, "/")
+    with PROFILER.file(rel):
+        edits = fix_assets_edits(original, rel)
+    # Único join del documento, directo a la escritura
+    if edits and OUTPUT.write_text(filepath, _apply_edits(original, edits), original):
         print(f"✅ Limpieza aplicada: {os.path.relpath(filepath, ROOT)}")
         return 1
     return 0
 
 
+# Versión de las reglas para el manifiesto incremental
+TOOL = "fix_assets"
+RULES = rules_hash(fix_assets, fix_assets_edits, fix_asset_roots, asset_root_edits, _root_edits, _apply_edits,
+                   head_range, _head_start, _head_edit, _in_head, dedup_key, _dedup_head, _drop_span,
+                   _element_end, fix_head, _favicon_rule, _cleanup_rule, _hints_rule, plan_hints, insert_hints,
+                   strip_hints, existing_hints, HINT_MARK, RE_REDUNDANT_COMMENT, RE_ASSET_ROOT, RE_SCRIPT_ROOT)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Limpieza de assets y metadatos en los HTML de ASEF.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora el manifiesto incremental y procesa todo.")
+    asef_profile.add_arguments(parser)
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_profile.start(args)
+    asef_output.start(args, ROOT)
+
     print("🎨 Iniciando limpieza avanzada de HTMLs ASEF...")
+    manifest = Manifest(ROOT, enabled=not args.no_cache)
+    version = f"{RULES}:{hints_version()}"
     total_fixed = 0
-    for root, _, files in os.walk(ROOT):
-        for file in files:
-            if file.endswith(TARGET_EXT):
-                path = os.path.join(root, file)
-                total_fixed += process_html(path)
-    print(f"\n✔ Finalizado. Archivos actualizados: {total_fixed}")
+    for path in walk_files(ROOT, TARGET_EXT):
+        if manifest.lookup(path, TOOL, version) is not None:
+            continue
+        fixed = process_html(path)
+        total_fixed += fixed
+        if not fixed:
+            manifest.store(path, TOOL, version, 0)
+    manifest.save()
+    print(f"\n✔ Finalizado. Archivos actualizados: {total_fixed} (sin cambios en caché: {manifest.hits})")
+    asef_profile.finish(args)
+    asef_output.finish(args, total_fixed)
 
 
 if __name__ == "__main__":
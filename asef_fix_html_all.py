@@ -1,9 +1,44 @@
 import os
 import re
+import argparse
+
+from asef_output import OUTPUT
+import asef_output
+from asef_parallel import imap_files
+from asef_walk import walk_files
+from asef_profile import PROFILER
+import asef_profile
 
 ROOT = "C:/asefweb"
 TARGETS = [".html"]
 
+# Cota de tiempo (ver asef_fuzz.py): cada etiqueta se toma entera con una clase
+# negada que nunca falla ('>' o fin del documento) y las condiciones se revisan
+# dentro de ella, así ningún tramo se escanea más de una vez: O(n).
+RE_LINK_TAG = re.compile(r"<link[^>]*>?", re.IGNORECASE)
+RE_REL_ICON = re.compile(r"rel=['\"]icon['\"]", re.IGNORECASE)
+RE_SCRIPT_OPEN = re.compile(r"<script(?P<attrs>[^>]*)>?")
+RE_TYPE_MODULE = re.compile(r"type=[\"']module[\"']")
+RE_SRC_JS_LAST = re.compile(r"src=[\"'][^\"']+\.js[\"']\Z")
+# Sólo desde el inicio de cada tramo de espacios (sin el lookbehind, \s+ se
+# reintenta en cada posición del tramo: cuadrático con corridas largas)
+RE_SPACE_GT = re.compile(r"(?<!\s)\s+>+")
+
+
+def _favicon_repl(m, favicon_tag):
+    tag = m.group(0)
+    if tag.endswith(">") and RE_REL_ICON.search(tag):
+        return favicon_tag
+    return tag
+
+
+def _type_module_repl(m):
+    tag, attrs = m.group(0), m.group("attrs")
+    if not tag.endswith(">") or RE_TYPE_MODULE.search(attrs) or not RE_SRC_JS_LAST.search(attrs):
+        return tag
+    return f'<script type="module"{attrs}>'
+
+
 def fix_html(content):
     original = content
 
@@ -18,13 +53,8 @@ def fix_html(content):
     )
 
     # Elimina versiones corruptas con /asefweb/ o /
-    content = re.sub(
-        r"<link[^>]*rel=['\"]icon['\"][^>]*>",
-        favicon_tag,
-        content,
-        flags=re.IGNORECASE,
-    )
-    content = re.sub(
+    content = PROFILER.sub("fix_html.favicon", RE_LINK_TAG, lambda m: _favicon_repl(m, favicon_tag), content)
+    content = PROFILER.sub("fix_html.favicon_prefix", 
         r'href=["\']/?asefweb/data:image/svg\+xml,',
         'href="data:image/svg+xml,',
         content,
@@ -42,53 +72,62 @@ def fix_html(content):
             "base.href=isLocal?'/':'/asefweb/';"
             "document.head.prepend(base);})();</script>"
         )
-        content = content.replace("<head>", f"<head>\n  {base_script}\n")
+        with PROFILER.rule("fix_html.base_script", content) as r:
+            r.matches = r.replacements = content.count("<head>")
+            content = content.replace("<head>", f"<head>\n  {base_script}\n")
 
     # ============================================================
     # 3️⃣ Asegura type=\"module\" en scripts
     # ============================================================
-    content = re.sub(
-        r'<script(?![^>]*type=["\']module["\'])((?:(?!src).)*src=["\'][^"\']+\.js["\'])>',
-        r'<script type="module"\1>',
-        content,
-    )
+    content = PROFILER.sub("fix_html.type_module", RE_SCRIPT_OPEN, _type_module_repl, content)
 
     # ============================================================
     # 4️⃣ Corrige enlaces con /css/pages/ o rutas erróneas
     # ============================================================
-    content = re.sub(r'href=["\']/asefweb/css/\.?/?pages/', 'href="/asefweb/pages/', content)
-    content = re.sub(r'href=["\']/asefweb/css/', 'href="/asefweb/css/', content)
-    content = re.sub(r'src=["\']/asefweb/css/', 'src="/asefweb/css/', content)
+    content = PROFILER.sub("fix_html.css_pages", r'href=["\']/asefweb/css/\.?/?pages/', 'href="/asefweb/pages/', content)
+    content = PROFILER.sub("fix_html.css_href", r'href=["\']/asefweb/css/', 'href="/asefweb/css/', content)
+    content = PROFILER.sub("fix_html.css_src", r'src=["\']/asefweb/css/', 'src="/asefweb/css/', content)
 
     # ============================================================
     # 5️⃣ Limpieza general
     # ============================================================
-    content = re.sub(r'\s+>+', '>', content)
-    content = re.sub(r"['\"];\s*>", "\">", content)
+    content = PROFILER.sub("fix_html.cleanup_gt", RE_SPACE_GT, '>', content)
+    content = PROFILER.sub("fix_html.cleanup_quote", r"['\"];\s*>", "\">", content)
 
     return content if content != original else None
 
 
-def process_html_files(root_dir):
-    changed = 0
-    for subdir, _, files in os.walk(root_dir):
-        for file in files:
-            if any(file.endswith(ext) for ext in TARGETS):
-                path = os.path.join(subdir, file)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    fixed = fix_html(content)
-                    if fixed:
-                        with open(path, "w", encoding="utf-8") as f:
-                            f.write(fixed)
-                        changed += 1
-                        print(f"✅ Corregido: {os.path.relpath(path, ROOT)}")
-                except Exception as e:
-                    print(f"❌ Error al procesar {file}: {e}")
+def fix_html_file(path):
+    """Corrige un archivo; devuelve 1 si se modificó, 0 si no (o si hubo error)."""
+    try:
+        content = OUTPUT.read_text(path)
+        with PROFILER.file(os.path.relpath(path, ROOT)):
+            fixed = fix_html(content)
+        if fixed and OUTPUT.write_text(path, fixed, content):
+            print(f"✅ Corregido: {os.path.relpath(path, ROOT)}")
+            return 1
+    except Exception as e:
+        print(f"❌ Error al procesar {os.path.basename(path)}: {e}")
+    return 0
+
+
+def process_html_files(root_dir, jobs=1):
+    paths = walk_files(root_dir, TARGETS)
+
+    changed = sum(imap_files(fix_html_file, paths, jobs))
 
     print(f"\n✔ Proceso completado. Archivos corregidos: {changed}")
+    return changed
 
 
 if __name__ == "__main__":
-    process_html_files(ROOT)
+    parser = argparse.ArgumentParser(description="Corrige favicon, base, scripts y enlaces en los HTML de ASEF.")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Procesos en paralelo (1 = serial).")
+    asef_profile.add_arguments(parser)
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_profile.start(args)
+    asef_output.start(args, ROOT)
+    changed = process_html_files(ROOT, jobs=args.jobs)
+    asef_profile.finish(args)
+    asef_output.finish(args, changed)
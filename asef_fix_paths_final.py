@@ -5,23 +5,22 @@ Corrige rutas locales, ignora y limpia URLs externas, y deja el proyecto listo p
 """
 
 import re
+import argparse
 from pathlib import Path
 
-# Carpetas a analizar
-TARGET_DIRS = [
-    Path("."),
-    Path("pages"),
-    Path("pages/admin"),
-    Path("pages/socios"),
-    Path("pages/auth"),
-]
+from asef_walk import walk_files
+from asef_output import OUTPUT
+import asef_output
+
+# Carpeta a analizar (incluye pages/, pages/admin, pages/socios, pages/auth)
+TARGET_ROOT = Path(".")
 
 # Expresiones regulares
 RE_SCRIPT_SRC = re.compile(r'<script\s+([^>]*src=["\'])([^"\']+)["\']([^>]*)>', re.IGNORECASE)
 RE_LINK_HREF = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
 
 def fix_html(path: Path):
-    text = path.read_text(encoding="utf-8")
+    text = OUTPUT.read_text(path)
     original = text
 
     # Corrige scripts <script src="...">
@@ -70,22 +69,26 @@ def fix_html(path: Path):
         flags=re.IGNORECASE
     )
 
-    if text != original:
-        path.write_text(text, encoding="utf-8")
+    if OUTPUT.write_text(path, text, original):
         print(f"✅ Corregido: {path}")
         return True
     return False
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Corrige rutas locales de scripts, CSS y favicon en los HTML de ASEF.")
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_output.start(args, TARGET_ROOT)
+
     changed = 0
     print("🔧 Reparando rutas ASEF (HTML + CSS + JS)...")
-    for d in TARGET_DIRS:
-        for html in d.rglob("*.html"):
-            if fix_html(html):
-                changed += 1
+    for html in walk_files(TARGET_ROOT, (".html",)):
+        if fix_html(html):
+            changed += 1
     print(f"\n📄 Archivos modificados: {changed}")
     print("✔ Limpieza completada correctamente.\n")
+    asef_output.finish(args, changed)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+asef_fuzz.py — Fuzz adversarial + chequeo de complejidad de los matchers HTML.
+
+Alimenta cada regla con entradas patológicas de tamaño creciente (n, 2n, 4n, ...)
+y estima el exponente de crecimiento del tiempo (pendiente log-log). Cada punto
+es la mediana de varias muestras, y cada muestra repite la llamada hasta durar
+al menos MIN_SAMPLE_S (como timeit): las entradas chicas no quedan en el ruido y
+las grandes no tienen que crecer hasta salirse de la caché del procesador. Si alguna
+regla crece más que linealmente (exponente > --max-exponent) el script termina
+con código 1, así puede correr en CI antes de tocar una regex.
+
+Casos:
+  - comillas sin cerrar (href=", src=', onclick="location.href=')
+  - etiquetas sin '>' (<script, <link, <a repetidos)
+  - una etiqueta con 100k atributos (src= repetido, data-*)
+  - bundle minificado en una sola línea (sin saltos)
+  - valores y corridas de espacios muy largos
+
+Uso:
+    python asef_fuzz.py
+    python asef_fuzz.py --max-kb 1024 --cases unclosed_dq,many_attrs --rules fix_html
+"""
+
+import argparse
+import gc
+import math
+import statistics
+import sys
+import time
+
+RULES_DEFAULT_KB = 1024
+
+# Duración mínima de una muestra: por debajo, el scheduler y el GC pesan más que la regla
+MIN_SAMPLE_S = 0.05
+# Si una medición supera esto se corta la escalera (ya es evidente que no escala)
+BUDGET_S = 2.0
+
+
+# -------------------------------------------------------------------
+# Generadores: devuelven un texto de ~size caracteres
+# -------------------------------------------------------------------
+def _fill(unit: str, size: int, head: str = "", tail: str = "") -> str:
+    return head + unit * max(1, (size - len(head) - len(tail)) // len(unit)) + tail
+
+
+CASES = {
+    "unclosed_dq": lambda n: _fill('<a href="pages/x.html ', n),
+    "unclosed_sq": lambda n: _fill("<img src='img/x.png ", n),
+    "unclosed_onclick": lambda n: _fill("<button onclick=\"location.href='pages/x ", n),
+    "unclosed_script": lambda n: _fill("<script data-x=1 ", n),
+    "unclosed_link": lambda n: _fill('<link rel="icon" ', n),
+    "many_attrs": lambda n: _fill(' data-a="1"', n, "<script", ' src="js/x.js">'),
+    "many_src": lambda n: _fill(" src=x", n, "<script", ">"),
+    "many_src_quoted": lambda n: _fill(' src="a"', n, "<script", ">"),
+    "minified_bundle": lambda n: _fill(
+        '<script src="js/a.js" defer></script><a href="/asefweb/pages/b.html" class="x">b</a>'
+        "<link rel=\"stylesheet\" href=\"./css/c.css\"><div onclick=\"location.href='d.html'\">", n,
+        "<!DOCTYPE html><html><head>", "</head></html>"),
+    "script_no_src": lambda n: _fill('<script type="text/plain" data-y="z">', n),
+    "long_value": lambda n: _fill("a", n, '<script src="', '">'),
+    "long_spaces": lambda n: _fill(" ", n, "<div", "x"),
+    "quote_soup": lambda n: _fill("\"'=<>", n),
+    "many_imgs": lambda n: _fill('<div class="carousel-slide"><img src="images/a.png" alt="x"/>', n),
+}
+
+
+def rules() -> dict:
+    """Reglas a medir: texto -> cualquier cosa."""
+    import asef_repair_all as repair
+    import asef_fix_html_all as html_all
+    import asef_fix_assets as assets
+    import asef_validate_paths as validate
+    import asef_refs as refs
+    import asef_minify as minify
+    import asef_images as images
+    from asef_html import iter_tags
+    return {
+        "fix_attrs": repair.fix_attrs,
+        "repair_html": repair.repair_html,
+        "fix_html": html_all.fix_html,
+        "fix_assets": assets.fix_assets,
+        "iter_tags": lambda s: sum(1 for t in iter_tags(s) if t.attrs is not None),
+        "find_links": validate.find_links,
+        "refs_html": lambda s: refs.extract("index.html", s),
+        "refs_js": refs.extract_js,
+        "minify_html": minify.minify_html,
+        "minify_css": minify.minify_css,
+        "minify_js": minify.minify_js,
+        "rewrite_imgs": lambda s: images.rewrite_imgs(s, "index.html", {}, False),
+    }
+
+
+# -------------------------------------------------------------------
+# Medición
+# -------------------------------------------------------------------
+def _sample(fn, text: str, loops: int) -> float:
+    # Como timeit: sin GC durante la muestra (lo que dejaron las reglas anteriores no cuenta)
+    gc.collect()
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn(text)
+        return time.perf_counter() - t0
+    finally:
+        gc.enable()
+
+
+def timed(fn, text: str, repeat: int) -> float:
+    """
+    Segundos por llamada: mediana de `repeat` muestras de `loops` llamadas, con
+    `loops` duplicándose hasta que una muestra dura MIN_SAMPLE_S. Una llamada
+    que ya supera el presupuesto se devuelve sola (la escalera se corta ahí).
+    """
+    loops = 1
+    t = _sample(fn, text, loops)
+    if t > BUDGET_S:
+        return t
+    while t < MIN_SAMPLE_S:
+        loops *= 2
+        t = _sample(fn, text, loops)
+    samples = [t] + [_sample(fn, text, loops) for _ in range(repeat - 1)]
+    return statistics.median(samples) / loops
+
+
+def growth_exponent(points: list):
+    """Pendiente de mínimos cuadrados de log(t) vs log(n)."""
+    pts = [(math.log(n), math.log(t)) for n, t in points if t > 0]
+    if len(pts) < 2:
+        return None
+    mx = sum(x for x, _ in pts) / len(pts)
+    my = sum(y for _, y in pts) / len(pts)
+    den = sum((x - mx) ** 2 for x, _ in pts)
+    return sum((x - mx) * (y - my) for x, y in pts) / den if den else None
+
+
+def ladder(fn, gen, min_kb: int, max_kb: int, repeat: int) -> list:
+    points = []
+    kb = min_kb
+    while kb <= max_kb:
+        text = gen(kb * 1024)
+        t = timed(fn, text, repeat)
+        points.append((len(text), t))
+        if t > BUDGET_S:
+            break
+        kb *= 2
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz adversarial y chequeo de tiempo lineal de los matchers ASEF.")
+    parser.add_argument("--min-kb", type=int, default=32, help="Tamaño inicial de la escalera.")
+    parser.add_argument("--max-kb", type=int, default=RULES_DEFAULT_KB, help="Tamaño máximo de la escalera.")
+    parser.add_argument("--repeat", type=int, default=5, help="Muestras por tamaño (se toma la mediana).")
+    parser.add_argument("--max-exponent", type=float, default=1.3,
+                        help="Exponente de crecimiento a partir del cual se considera super-lineal.")
+    parser.add_argument("--rules", help="Reglas separadas por comas (por defecto, todas).")
+    parser.add_argument("--cases", help="Casos separados por comas (por defecto, todos).")
+    args = parser.parse_args()
+
+    selected_rules = rules()
+    if args.rules:
+        wanted = [r.strip() for r in args.rules.split(",")]
+        selected_rules = {k: v for k, v in selected_rules.items() if k in wanted}
+    cases = CASES
+    if args.cases:
+        wanted = [c.strip() for c in args.cases.split(",")]
+        cases = {k: v for k, v in cases.items() if k in wanted}
+
+    print(f"🧪 ASEF | Fuzz adversarial — {args.min_kb}..{args.max_kb} KB, exponente máximo {args.max_exponent}\n")
+    print(f"{'regla':<14} {'caso':<18} {'KB máx':>8} {'ms máx':>9} {'exp':>6}")
+
+    failures = []
+    for rule_name, fn in selected_rules.items():
+        for case_name, gen in cases.items():
+            points = ladder(fn, gen, args.min_kb, args.max_kb, args.repeat)
+            exp = growth_exponent(points)
+            size, t = points[-1]
+            # Sin exponente: ya el primer tamaño superó el presupuesto
+            bad = exp > args.max_exponent if exp is not None else t > BUDGET_S
+            mark = "❌" if bad else "  "
+            exp_txt = f"{exp:.2f}" if exp is not None else "-"
+            print(f"{rule_name:<14} {case_name:<18} {size / 1024:>8.0f} {t * 1000:>9.2f} {exp_txt:>6} {mark}")
+            if bad:
+                failures.append((rule_name, case_name, exp_txt))
+
+    print("\n===== RESUMEN ASEF FUZZ =====")
+    if failures:
+        print(f"❌ {len(failures)} combinaciones crecen más que linealmente:")
+        for rule_name, case_name, exp_txt in failures:
+            print(f"  - {rule_name} / {case_name} (exponente {exp_txt})")
+        sys.exit(1)
+    print("✅ Todas las reglas escalan linealmente con las entradas adversariales.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+asef_hints.py — Resource hints por página: modulepreload, preconnect y dns-prefetch.
+
+Los módulos de una página se descubren de a un nivel (el navegador recién ve
+los import de auth.js cuando lo bajó) y el SDK de Firebase viene de un CDN
+(vite.config.js lo marca como external): cada página arma una cascada de
+pedidos en serie. Con el grafo de módulos (asef_modgraph, sobre el índice de
+asef_refs) se calcula qué conviene anunciar en el <head>:
+  - <link rel="modulepreload"> para la clausura de los <script type="module">
+    locales (primero los importados, que son la cascada; después las entradas)
+  - <link rel="preconnect"> + <link rel="dns-prefetch"> para los orígenes
+    externos de <script src> y <link rel="stylesheet"> (con crossorigin si el
+    recurso se pide en modo CORS: módulos y fuentes de Google Fonts)
+
+Los hints que emite esta etapa llevan data-asef-hint: en cada corrida se quitan
+y se insertan los del plan nuevo, así los que dejaron de corresponder (un import
+que ya no está) se van y no ocupan lugar. Los escritos a mano se respetan: no se
+repiten, y entre ellos y los propios no se pasa de MAX_HINTS por página
+(MAX_ORIGINS para los orígenes). No es un script suelto: lo aplica
+asef_fix_assets en la misma pasada del <head> que la deduplicación y la limpieza
+(y el pipeline como regla assets_hints).
+
+    hints = plan_hints(html, "pages/admin/dashboard.html")
+    head = insert_hints(strip_hints(head), hints)
+"""
+
+import posixpath
+from pathlib import Path
+
+from asef_html import iter_tags, line_ending
+from asef_link_graph import is_external, resolve
+from asef_manifest import hash_bytes
+from asef_modgraph import JS_EXTS, ModuleGraph
+from asef_refs import RefIndex
+from asef_targets import element_end, is_dynamic_base
+
+ROOT = Path(__file__).parent
+
+MAX_HINTS = 10          # <link> de hints por página, contando los que ya estaban
+MAX_ORIGINS = 3         # orígenes externos con preconnect (cada conexión cuesta)
+HINT_RELS = ("modulepreload", "preload", "preconnect", "dns-prefetch")
+HINT_MARK = "data-asef-hint"     # atributo de los hints propios (los que se reemplazan en cada corrida)
+
+# Orígenes que un recurso externo va a pedir después (origen -> [(origen, crossorigin)])
+FOLLOW_ORIGINS = {
+    "https://fonts.googleapis.com": [("https://fonts.gstatic.com", True)],
+}
+
+_GRAPHS = {}
+
+
+def site_graph(root=None) -> ModuleGraph:
+    """Grafo de módulos del sitio, uno por proceso (el índice tiene caché en disco)."""
+    root = root or ROOT
+    key = str(root)
+    if key not in _GRAPHS:
+        _GRAPHS[key] = ModuleGraph(RefIndex(root).update())
+    return _GRAPHS[key]
+
+
+def forget_graph(root=None):
+    """Descarta el grafo memoizado (--watch: se guardó un módulo y sus imports pueden ser otros)."""
+    _GRAPHS.pop(str(root or ROOT), None)
+
+
+def graph_version(root=None) -> str:
+    """Cambia si cambia algún módulo del sitio (los hints de una página dependen de sus imports)."""
+    graph = site_graph(root)
+    return hash_bytes("\0".join(f"{rel}={graph.index.hash(rel)}" for rel in graph.modules()).encode("utf-8"))
+
+
+def origin(url: str) -> str:
+    """'https://www.gstatic.com/firebasejs/x.js' -> 'https://www.gstatic.com'."""
+    if url.startswith("//"):
+        url = "https:" + url
+    scheme, _, rest = url.partition("://")
+    return f"{scheme.lower()}://{rest.split('/', 1)[0].split('?', 1)[0].lower()}"
+
+
+def _rel_list(tag) -> list:
+    return (tag.get("rel") or "").lower().split()
+
+
+def existing_hints(html: str) -> tuple[set, int]:
+    """
+    ({(rel, destino u origen)}, cantidad de <link> de hints) escritos a mano en el
+    documento (los propios no cuentan: se reemplazan por el plan nuevo).
+    """
+    found = set()
+    count = 0
+    for tag in iter_tags(html, names=("link",)):
+        rels = [r for r in _rel_list(tag) if r in HINT_RELS]
+        href = (tag.get("href") or "").strip()
+        if not rels or not href or tag.has(HINT_MARK):
+            continue
+        count += 1
+        for r in rels:
+            found.add((r, origin(href) if is_external(href) else href))
+    return found, count
+
+
+def _module_url(target: str, page: str, has_base: bool) -> str:
+    """URL de un módulo con la misma convención que el resto de la página."""
+    if has_base:
+        return target
+    return posixpath.relpath(target, posixpath.dirname(page) or ".")
+
+
+def plan_hints(html: str, page: str, graph: ModuleGraph = None, max_hints: int = MAX_HINTS) -> list:
+    """[<link ...>] a agregar al <head> de `page` (sitio-relativa), ya deduplicados y con tope."""
+    graph = graph or site_graph()
+    has_base = False
+    entries = []
+    origins = {}            # origen -> crossorigin (en orden de aparición)
+    for tag in iter_tags(html, names=("base", "script", "link")):
+        if tag.name == "base" or (tag.name == "script" and is_dynamic_base(tag)):
+            has_base = True
+            continue
+        if tag.name == "script":
+            url = (tag.get("src") or "").strip()
+            cors = (tag.get("type") or "").strip().lower() == "module"
+        elif "stylesheet" in _rel_list(tag):
+            url = (tag.get("href") or "").strip()
+            cors = tag.has("crossorigin")
+        else:
+            continue
+        if not url:
+            continue
+        if is_external(url):
+            if url.startswith(("http://", "https://", "//")):
+                o = origin(url)
+                origins[o] = origins.get(o, False) or cors
+                for follow, follow_cors in FOLLOW_ORIGINS.get(o, ()):
+                    origins[follow] = origins.get(follow, False) or follow_cors
+            continue
+        target = resolve(url, page, has_base)
+        if cors and target and target.endswith(JS_EXTS) and target in graph.index.files:
+            entries.append(target)
+
+    # Clausura por niveles: los importados (la cascada) antes que las entradas
+    depth = {rel: 0 for rel in entries}
+    queue = list(entries)
+    for rel in queue:
+        for _, dep in graph.imports(rel)[0]:
+            if dep not in depth and dep in graph.index.files:
+                depth[dep] = depth[rel] + 1
+                queue.append(dep)
+    modules = [rel for _, rel in sorted(enumerate(depth), key=lambda e: (-depth[e[1]], e[0]))]
+
+    have, count = existing_hints(html)
+    budget = max_hints - count
+    hints = []
+    preconnected = sum(1 for r, _ in have if r == "preconnect")
+    for o, cors in origins.items():
+        if ("preconnect", o) in have or preconnected >= MAX_ORIGINS or budget < 2:
+            continue
+        cross = " crossorigin" if cors else ""
+        hints.append(f'<link rel="preconnect" href="{o}"{cross} {HINT_MARK}>')
+        hints.append(f'<link rel="dns-prefetch" href="{o}" {HINT_MARK}>')
+        preconnected += 1
+        budget -= 2
+    for rel in modules:
+        url = _module_url(rel, page, has_base)
+        if ("modulepreload", url) in have:
+            continue
+        if budget < 1:
+            break
+        hints.append(f'<link rel="modulepreload" href="{url}" {HINT_MARK}>')
+        budget -= 1
+    return hints
+
+
+def strip_hints(head: str) -> str:
+    """Quita del contenido del <head> los hints propios (con su línea si estaban solos en ella)."""
+    if HINT_MARK not in head:
+        return head
+    parts = []
+    pos = 0
+    for tag in iter_tags(head, names=("link",)):
+        if not tag.has(HINT_MARK):
+            continue
+        start, end = tag.start, tag.end
+        line_start = head.rfind("\n", 0, start) + 1
+        line_end = head.find("\n", end)
+        if not head[line_start:start].strip() and not head[end:len(head) if line_end < 0 else line_end].strip():
+            if line_end >= 0:
+                start, end = line_start, line_end + 1
+            else:
+                # Última línea sin salto final: se va el salto que la precede
+                start, end = max(pos, line_start - 1), len(head)
+                if head[start - 1:start] == "\r" and start - 1 >= pos:
+                    start -= 1
+        parts.append(head[pos:start])
+        pos = end
+    parts.append(head[pos:])
+    return "".join(parts)
+
+
+def insert_hints(head: str, hints: list) -> str:
+    """
+    Inserta los hints en el contenido del <head>: después del <base> / script de
+    base dinámico (las URLs relativas tienen que resolverse contra él) y antes
+    de la primera hoja de estilos o script.
+    """
+    if not hints:
+        return head
+    nl = line_ending(head)
+    after = 0
+    pos = None
+    for tag in iter_tags(head, names=("base", "script", "link", "style")):
+        if tag.name == "base" or (tag.name == "script" and is_dynamic_base(tag)):
+            after = element_end(head, tag)
+            pos = None
+            continue
+        if pos is None and tag.start >= after and (tag.name != "link" or "stylesheet" in _rel_list(tag)):
+            pos = tag.start
+    if pos is None:
+        pos = len(head.rstrip())
+        indent = head[head.rfind("\n", 0, pos) + 1:pos]
+        indent = indent[:len(indent) - len(indent.lstrip())]
+        return head[:pos] + "".join(f"{nl}{indent}{h}" for h in hints) + head[pos:]
+    line_start = head.rfind("\n", 0, pos) + 1
+    indent = head[line_start:pos]
+    if indent.strip():
+        # La etiqueta comparte línea con otras (<head> minificado): los hints van pegados a ella
+        return head[:pos] + "".join(hints) + head[pos:]
+    return head[:line_start] + "".join(f"{indent}{h}{nl}" for h in hints) + head[line_start:]
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+asef_html.py — Tokenizador de etiquetas HTML en una sola pasada.
+
+Recorre el documento de izquierda a derecha y entrega cada etiqueta de apertura
+con su nombre y sus posiciones exactas, sin construir árbol ni copias
+intermedias. Los atributos se parsean sólo si alguien los pide (Tag.attrs), así
+que las etiquetas que no interesan cuestan una sola coincidencia de regex.
+Los cuerpos de <script>, <style>, <textarea> y <title> se tratan como texto
+crudo (no se buscan etiquetas adentro) y los comentarios se saltan enteros.
+
+Todas las expresiones usan alternativas con primer carácter disjunto y clases
+negadas, de modo que no hay retroceso anidado, y ninguna coincidencia falla
+después de avanzar: el costo es O(tamaño del documento) incluso con comillas
+sin cerrar.
+"""
+
+import re
+from typing import Iterator, NamedTuple
+
+RAW_TEXT_TAGS = ("script", "style", "textarea", "title")
+
+# Un token que empieza con '<': comentario, declaración/cierre o etiqueta de apertura.
+# En la etiqueta se alternan tramos sin comillas y cadenas entre comillas completas
+# (bucle "desenrollado": cada tramo empieza con un carácter distinto, no hay ambigüedad);
+# una comilla sin cerrar o una etiqueta sin '>' se extienden hasta el fin del documento
+# (como en el navegador), así la coincidencia nunca falla y nunca se reintenta.
+RE_TOKEN = re.compile(
+    r"""<(?:
+        (?P<comment>!--.*?(?:-->|\Z))
+       |(?P<decl>[!?/][^>]*>?)
+       |(?P<name>[A-Za-z][A-Za-z0-9:-]*)[^>"']*(?:(?:"[^"]*(?:"|\Z)|'[^']*(?:'|\Z))[^>"']*)*(?:>|\Z)
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+
+# Un atributo (con los separadores que lo preceden): nombre y, opcionalmente,
+# "= valor" con comillas dobles, simples o sin comillas. Una sola coincidencia por
+# atributo: los separadores no se buscan aparte.
+RE_ATTR_TOKEN = re.compile(
+    r"""[\s/"'=]*
+        (?P<name>[^\s"'>/=]+)
+        (?:\s*=\s*
+            (?:"(?P<dq>[^"]*)"
+              |'(?P<sq>[^']*)'
+              |(?P<uq>[^\s>]+)))?""",
+    re.VERBOSE,
+)
+RE_ATTR_SEP = re.compile(r"""[\s/"'=]+""")
+
+_RAW_END = {name: re.compile(r"</%s[\s/>]" % name, re.IGNORECASE) for name in RAW_TEXT_TAGS}
+
+# Nombre de una etiqueta de cierre (sobre el grupo decl, que empieza con '/')
+RE_CLOSE_NAME = re.compile(r"/\s*([A-Za-z][A-Za-z0-9:-]*)")
+
+
+class Attr(NamedTuple):
+    name: str        # nombre en minúsculas
+    value: str       # valor crudo (sin comillas)
+    start: int       # inicio del valor en el documento
+    end: int         # fin del valor en el documento
+    quote: str       # '"', "'" o "" si no tiene comillas
+
+
+def parse_attrs(html: str, pos: int, end: int) -> list:
+    """Parsea los atributos de html[pos:end] (interior de una etiqueta) en orden."""
+    attrs = []
+    match = RE_ATTR_TOKEN.match
+    while pos < end:
+        a = match(html, pos, end)
+        if a is None:
+            # Sólo separadores hasta el final, o un '>' suelto (de comillas desparejas): se saltea
+            sep = RE_ATTR_SEP.match(html, pos, end)
+            pos = (sep.end() if sep else pos) + 1
+            continue
+        if a["dq"] is not None:
+            attrs.append(Attr(a["name"].lower(), a["dq"], a.start("dq"), a.end("dq"), '"'))
+        elif a["sq"] is not None:
+            attrs.append(Attr(a["name"].lower(), a["sq"], a.start("sq"), a.end("sq"), "'"))
+        elif a["uq"] is not None:
+            attrs.append(Attr(a["name"].lower(), a["uq"], a.start("uq"), a.end("uq"), ""))
+        else:
+            attrs.append(Attr(a["name"].lower(), "", a.end(), a.end(), ""))
+        pos = a.end()
+    return attrs
+
+
+class Tag:
+    """Etiqueta de apertura: html[start:end] es '<nombre ...>'."""
+
+    __slots__ = ("html", "name", "start", "end", "raw_end", "_name_end", "_attrs")
+
+    def __init__(self, html: str, name: str, start: int, end: int, raw_end: int):
+        self.html = html
+        self.name = name          # nombre en minúsculas
+        self.start = start        # posición del '<'
+        self.end = end            # posición siguiente al '>' (o fin del documento si no cierra)
+        self.raw_end = raw_end    # fin del texto crudo (script/style/...) o igual a end
+        self._name_end = start + 1 + len(name)
+        self._attrs = None
+
+    @property
+    def closed(self) -> bool:
+        return self.html[self.end - 1] == ">"
+
+    @property
+    def attrs(self) -> list:
+        if self._attrs is None:
+            inner_end = self.end - 1 if self.closed else self.end
+            self._attrs = parse_attrs(self.html, self._name_end, inner_end)
+        return self._attrs
+
+    @property
+    def text(self) -> str:
+        return self.html[self.start:self.end]
+
+    def attr(self, name: str):
+        for a in self.attrs:
+            if a.name == name:
+                return a
+        return None
+
+    def get(self, name: str, default=None):
+        a = self.attr(name)
+        return default if a is None else a.value
+
+    def has(self, name: str) -> bool:
+        return self.attr(name) is not None
+
+    def mentions(self, pattern: re.Pattern) -> bool:
+        """Búsqueda acotada a la etiqueta, sin parsear atributos."""
+        return pattern.search(self.html, self._name_end, self.end) is not None
+
+
+def line_ending(html: str) -> str:
+    """'\r\n' si el documento usa CRLF (según su primera línea), '\n' si no: lo que se inserta respeta el archivo."""
+    nl = html.find("\n")
+    return "\r\n" if nl > 0 and html[nl - 1] == "\r" else "\n"
+
+
+def iter_tags(html: str, pos: int = 0, stop: int = -1, names=None, hint=None, closing=()) -> Iterator[Tag]:
+    """
+    Genera las etiquetas de apertura de `html` a partir de `pos`.
+    Las de cierre, comentarios y declaraciones se saltan, salvo las de cierre cuyo
+    nombre está en `closing`: esas se devuelven como Tag con nombre "/nombre".
+    Si `stop` >= 0 no se devuelven etiquetas que empiecen en o después de esa posición.
+
+    Filtro opcional (se evalúa sin construir Tag): si se pasa `names` y/o `hint`,
+    sólo se devuelven las etiquetas cuyo nombre está en `names` o cuyo texto
+    contiene una coincidencia del patrón `hint`.
+    """
+    n = len(html) if stop < 0 else stop
+    search = RE_TOKEN.search
+    filtered = names is not None or hint is not None
+    names = names or ()
+    hint_search = hint.search if hint is not None else None
+    while True:
+        m = search(html, pos)
+        if not m:
+            return
+        start, end = m.span()
+        if start >= n:
+            return
+        name = m["name"]
+        if name is None:
+            pos = end
+            if closing:
+                c = RE_CLOSE_NAME.match(m.group("decl") or "")
+                if c and c.group(1).lower() in closing:
+                    yield Tag(html, "/" + c.group(1).lower(), start, end, end)
+            continue
+        name = name.lower()
+        raw_end = end
+        raw = _RAW_END.get(name)
+        if raw is not None:
+            r = raw.search(html, end)
+            raw_end = len(html) if not r else r.start()
+        pos = raw_end
+        if filtered and name not in names and (hint_search is None or hint_search(html, start, end) is None):
+            continue
+        yield Tag(html, name, start, end, raw_end)
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+asef_images.py — Imágenes responsivas: variantes por ancho, dimensiones y carga diferida.
+
+El carrusel de la portada manda images/carrusel1.png y carrusel2.png (MB) a
+todos los dispositivos y ningún <img> declara width/height (salto de layout al
+cargar) ni pistas de carga. Esta etapa, sobre los HTML del sitio:
+  - genera, junto a cada imagen local PNG/JPEG usada en un <img>, variantes
+    nombre-480w.webp, nombre-960w.webp, ... y nombre-<máx>w.png (o .jpg) hasta
+    el ancho de la fuente (con Pillow; sin Pillow se saltea este paso)
+  - reescribe el <img>: srcset con las WebP, sizes, y src a la variante PNG/JPEG
+    más grande como respaldo (mismo DOM: el carrusel y su CSS no cambian)
+  - agrega width/height intrínsecos (leídos de la cabecera del archivo, sin
+    Pillow) a todo <img> local que no los tenga
+  - agrega loading="lazy" y decoding="async" a todas las imágenes, salvo la
+    primera del carrusel (.carousel-slide), que queda eager con fetchpriority=high
+
+Las variantes se codifican en un pool de procesos (asef_parallel) y quedan en
+.asef_cache/images por hash de la fuente: una imagen que no cambió nunca se
+vuelve a codificar. Correrlo dos veces no cambia nada; las escrituras pasan
+por asef_output (--dry-run, --check, snapshots).
+
+Las variantes son salida generada: git las ignora (.gitignore) pero se publican
+y se sirven igual (asef_walk.RE_GENERATED). En un clon nuevo faltan hasta la
+primera corrida; si no se pueden generar (sin Pillow) y alguna página las pide,
+la etapa termina con error para que el deploy no publique imágenes rotas.
+
+Uso:
+    python asef_images.py
+    python asef_images.py --widths 480,960,1920 --sizes "(max-width: 768px) 100vw, 50vw"
+    python asef_images.py --check
+"""
+
+import argparse
+import posixpath
+import re
+import struct
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from asef_fingerprint import swap_basename
+from asef_html import iter_tags
+from asef_link_graph import is_external, resolve
+from asef_manifest import MANIFEST_DIR, hash_bytes, rules_hash
+import asef_output
+from asef_parallel import default_jobs, imap_files
+from asef_refs import RefIndex
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ROOT = Path(__file__).parent
+CACHE_NAME = "images"
+
+WIDTHS = (480, 960, 1440, 1920)
+DEFAULT_SIZES = "100vw"
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+RASTER_EXTS = (".png", ".jpg", ".jpeg")
+SIZED_EXTS = RASTER_EXTS + (".gif", ".webp", ".svg")
+
+# La primera imagen dentro de un elemento con esta clase se carga sin demora (LCP)
+EAGER_CLASS = "carousel-slide"
+
+# images/carrusel1-960w.webp -> variante generada (no es una fuente)
+RE_VARIANT = re.compile(r"-(\d+)w\.(?:webp|png|jpe?g)$", re.IGNORECASE)
+RE_SVG_TAG = re.compile(rb"<svg\b[^>]*>", re.IGNORECASE)
+RE_SVG_ATTR = re.compile(rb"""\b(width|height|viewBox)\s*=\s*["']([^"']*)["']""")
+
+
+# -------------------------------------------------------------------
+# Dimensiones (cabecera del archivo, sin Pillow)
+# -------------------------------------------------------------------
+def _svg_size(data: bytes):
+    tag = RE_SVG_TAG.search(data, 0, 4096)
+    if not tag:
+        return None
+    attrs = {k.decode(): v.decode() for k, v in RE_SVG_ATTR.findall(tag.group(0))}
+    try:
+        if "width" in attrs and "height" in attrs and not attrs["width"].endswith("%"):
+            return (round(float(attrs["width"].rstrip("px"))), round(float(attrs["height"].rstrip("px"))))
+        box = attrs.get("viewBox", "").replace(",", " ").split()
+        if len(box) == 4:
+            return (round(float(box[2])), round(float(box[3])))
+    except ValueError:
+        pass
+    return None
+
+
+def _jpeg_size(data: bytes):
+    pos = 2
+    while pos + 9 < len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        # SOF0..SOF15 salvo DHT (C4), JPG (C8) y DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h, w = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return (w, h)
+        pos += 2 + length
+    return None
+
+
+def image_size(data: bytes):
+    """(ancho, alto) de un PNG, JPEG, GIF, WebP o SVG; None si no se reconoce."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"\xff\xd8":
+        return _jpeg_size(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", data[26:30])
+            return (w & 0x3FFF, h & 0x3FFF)
+        if chunk == b"VP8L":
+            b = data[21:25]
+            return (1 + (((b[1] & 0x3F) << 8) | b[0]), 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | (b[1] >> 6)))
+        if chunk == b"VP8X":
+            return (1 + int.from_bytes(data[24:27], "little"), 1 + int.from_bytes(data[27:30], "little"))
+        return None
+    if b"<svg" in data[:4096]:
+        return _svg_size(data)
+    return None
+
+
+# -------------------------------------------------------------------
+# Variantes (Pillow)
+# -------------------------------------------------------------------
+def variant_widths(width: int, widths=WIDTHS) -> list:
+    """Anchos a generar: los configurados menores que la fuente, más el tope (sin agrandar)."""
+    top = min(width, max(widths))
+    return [w for w in sorted(widths) if w < top] + [top]
+
+
+def fallback_ext(rel: str) -> str:
+    ext = posixpath.splitext(rel)[1].lower()
+    return ".jpg" if ext == ".jpeg" else ext
+
+
+def variant_plan(rel: str, size: tuple, widths=WIDTHS) -> list:
+    """[(ruta del sitio, ancho, formato)] de las variantes de `rel` (WebP por ancho + respaldo)."""
+    stem = posixpath.splitext(rel)[0]
+    ws = variant_widths(size[0], widths)
+    plan = [(f"{stem}-{w}w.webp", w, "webp") for w in ws]
+    plan.append((f"{stem}-{ws[-1]}w{fallback_ext(rel)}", ws[-1], fallback_ext(rel)[1:]))
+    return plan
+
+
+def source_of(rel: str) -> str:
+    """images/carrusel1-1920w.png -> images/carrusel1.png (el src ya reescrito vuelve a su fuente)."""
+    return RE_VARIANT.sub(lambda m: posixpath.splitext(m.group(0))[1], rel) if RE_VARIANT.search(rel) else rel
+
+
+def _encode(img, width: int, fmt: str) -> bytes:
+    from io import BytesIO
+    if img.width != width:
+        resample = getattr(Image, "Resampling", Image).LANCZOS
+        img = img.resize((width, max(1, round(img.height * width / img.width))), resample)
+    buf = BytesIO()
+    if fmt == "webp":
+        img.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+    elif fmt == "png":
+        img.save(buf, "PNG", optimize=True)
+    else:
+        img.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+ENCODER = rules_hash(_encode, WEBP_QUALITY, JPEG_QUALITY, Image.__version__ if Image is not None else None)
+
+
+def cache_path(cache_dir: Path, digest: str, width: int, fmt: str) -> Path:
+    key = hash_bytes(f"{ENCODER}:{digest}:{width}:{fmt}".encode("utf-8"))
+    return Path(cache_dir) / key[:2] / f"{key[2:]}.{fmt}"
+
+
+def encode_variants(path: Path, cache_dir: Path, widths=WIDTHS, force: bool = False) -> int:
+    """Codifica en la caché las variantes que falten de `path`. Devuelve cuántas codificó."""
+    data = path.read_bytes()
+    digest = hash_bytes(data)
+    encoded = 0
+    with Image.open(path) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+        for _, width, fmt in variant_plan(path.name, img.size, widths):
+            target = cache_path(cache_dir, digest, width, fmt)
+            if target.exists() and not force:
+                continue
+            asef_output.atomic_write(target, _encode(img, width, fmt))
+            encoded += 1
+    return encoded
+
+
+# -------------------------------------------------------------------
+# Reescritura de <img>
+# -------------------------------------------------------------------
+def _attr_edits(tag, values: dict) -> list:
+    """[(inicio, fin, texto)] que dejan en `tag` los atributos de `values` (reemplaza o agrega)."""
+    edits = []
+    for name, value in values.items():
+        a = tag.attr(name)
+        if a is None:
+            continue
+        if a.quote:
+            edits.append((a.start, a.end, value))
+        elif a.start == a.end and tag.html[a.start - 1:a.start] != "=":
+            edits.append((a.start, a.end, f'="{value}"'))      # atributo sin valor
+        else:
+            edits.append((a.start, a.end, f'"{value}"'))
+    missing = "".join(f' {name}="{value}"' for name, value in values.items() if not tag.has(name))
+    if missing:
+        pos = tag.end - 1 if tag.closed else tag.end
+        if tag.html[pos - 1] == "/":
+            pos -= 1
+        while tag.html[pos - 1].isspace():
+            pos -= 1
+        edits.append((pos, pos, missing))
+    return edits
+
+
+def rewrite_imgs(html: str, rel: str, images: dict, has_base: bool, sizes: str = DEFAULT_SIZES) -> tuple[str, int]:
+    """
+    Reescribe los <img> de `html` (página `rel`). `images`: ruta del sitio ->
+    {"size": (ancho, alto) o None, "variants": [(ruta, ancho, formato)]}.
+    Devuelve (html, <img> modificados).
+    """
+    edits = []
+    touched = 0
+    eager_pending = False
+    eager_done = False
+    for tag in iter_tags(html):
+        if not eager_done and EAGER_CLASS in (tag.get("class") or "").split():
+            eager_pending = True
+        if tag.name != "img":
+            continue
+        values = {}
+        src = (tag.get("src") or "").strip()
+        target = None if not src or is_external(src) else resolve(src, rel, has_base)
+        info = images.get(source_of(target)) if target else None
+        if info is not None:
+            webp = [(path, w) for path, w, fmt in info["variants"] if fmt == "webp"]
+            if webp:
+                fallback = info["variants"][-1][0]
+                values["src"] = swap_basename(src, posixpath.basename(fallback))
+                values["srcset"] = ", ".join(f"{swap_basename(src, posixpath.basename(p))} {w}w" for p, w in webp)
+                if not tag.has("sizes"):
+                    values["sizes"] = sizes
+            if info["size"] and not tag.has("width") and not tag.has("height"):
+                values["width"], values["height"] = (str(n) for n in info["size"])
+        if eager_pending:
+            eager_pending = False
+            eager_done = True
+            values["loading"] = "eager"
+            values["fetchpriority"] = "high"
+        elif not tag.has("loading"):
+            values["loading"] = "lazy"
+        if not tag.has("decoding"):
+            values["decoding"] = "async"
+        values = {k: v for k, v in values.items() if tag.get(k) != v}
+        if values:
+            edits += _attr_edits(tag, values)
+            touched += 1
+    if not edits:
+        return html, 0
+    out = []
+    last = 0
+    for start, end, text in sorted(edits, key=lambda e: e[0]):
+        out.append(html[last:start])
+        out.append(text)
+        last = end
+    out.append(html[last:])
+    return "".join(out), touched
+
+
+RULES = rules_hash(rewrite_imgs, _attr_edits, swap_basename, source_of, variant_plan, variant_widths, image_size,
+                   _jpeg_size, _svg_size, EAGER_CLASS, RE_VARIANT)
+TOOL = "images"
+
+
+# -------------------------------------------------------------------
+# Etapa
+# -------------------------------------------------------------------
+def img_sources(index: RefIndex) -> dict:
+    """{página HTML: [ruta del sitio de cada <img> local]} (tal como la pide: fuente o variante)."""
+    found = {}
+    for rel, e in index.entries.items():
+        if not rel.endswith(".html"):
+            continue
+        html = index.files[rel].read_text(encoding="utf-8", errors="replace")
+        targets = []
+        for tag in iter_tags(html, names=("img",)):
+            src = (tag.get("src") or "").strip()
+            target = None if not src or is_external(src) else resolve(src, rel, e["base"])
+            if target:
+                targets.append(target)
+        found[rel] = targets
+    return found
+
+
+def run(root: Path, widths=WIDTHS, sizes: str = DEFAULT_SIZES, jobs: int = 1, use_cache: bool = True) -> dict:
+    t0 = time.perf_counter()
+    cache_dir = root / MANIFEST_DIR / CACHE_NAME
+    index = RefIndex(root, use_cache=use_cache).update()
+    pages = img_sources(index)
+    used = sorted({source_of(t) for targets in pages.values() for t in targets
+                   if source_of(t) in index.files and t.lower().endswith(SIZED_EXTS)})
+
+    images = {}
+    todo = []
+    for rel in used:
+        data = index.files[rel].read_bytes()
+        size = image_size(data)
+        variants = []
+        if Image is not None and size and rel.lower().endswith(RASTER_EXTS):
+            variants = variant_plan(rel, size, widths)
+            digest = hash_bytes(data)
+            if not use_cache or not all(cache_path(cache_dir, digest, w, f).exists() for _, w, f in variants):
+                todo.append(index.files[rel])
+            images[rel] = {"size": size, "variants": variants, "digest": digest, "raw": len(data)}
+        else:
+            images[rel] = {"size": size, "variants": variants, "raw": len(data)}
+    encoded = sum(imap_files(partial(encode_variants, cache_dir=cache_dir, widths=widths, force=not use_cache),
+                             todo, jobs))
+
+    # Variantes junto a la fuente (sólo se escriben las que cambian) y limpieza de las viejas
+    written = removed = 0
+    report = []
+    for rel, info in images.items():
+        if not info["variants"]:
+            continue
+        folder = index.files[rel].parent
+        expected = set()
+        webp = []
+        for vrel, w, fmt in info["variants"]:
+            name = posixpath.basename(vrel)
+            expected.add(name)
+            data = cache_path(cache_dir, info["digest"], w, fmt).read_bytes()
+            if fmt == "webp":
+                webp.append(len(data))
+            try:
+                original = (folder / name).read_bytes()
+            except OSError:
+                original = None
+            if original == data:
+                continue
+            if asef_output.OUTPUT.writes:
+                asef_output.OUTPUT.write_bytes(folder / name, data, original)
+            else:
+                # Binario: sin diff, sólo se anuncia
+                asef_output.OUTPUT.changed.append(str(folder / name))
+                print(f"🖼  {'(nuevo)' if original is None else '(cambia)'} {asef_output.OUTPUT.label(folder / name)}")
+            written += 1
+        stem = posixpath.splitext(posixpath.basename(rel))[0]
+        for p in folder.glob(f"{stem}-*w.*"):
+            m = RE_VARIANT.search(p.name)
+            if m and p.name[:m.start()] == stem and p.name not in expected:
+                removed += asef_output.OUTPUT.remove(p)
+        report.append((rel, info["raw"], min(webp), max(webp)))
+
+    # Variantes que una página pide, que no están y que esta corrida no puede generar
+    missing = sorted({t for targets in pages.values() for t in targets
+                      if t != source_of(t) and t not in index.files
+                      and not images.get(source_of(t), {}).get("variants")})
+
+    changed_pages = touched = 0
+    for rel in pages:
+        path = index.files[rel]
+        original = asef_output.OUTPUT.read_text(path)
+        html, n = rewrite_imgs(original, rel, images, index.entries[rel]["base"], sizes)
+        if asef_output.OUTPUT.write_text(path, html, original):
+            print(f"✅ <img> actualizados ({n}): {rel}")
+            changed_pages += 1
+            touched += n
+
+    return {
+        "pages": len(pages),
+        "images": len(images),
+        "encoded": encoded,
+        "cached": len(report) - len(todo),
+        "written": written,
+        "removed": removed,
+        "changed_pages": changed_pages,
+        "imgs": touched,
+        "report": report,
+        "missing": missing,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Variantes responsivas, width/height y loading de los <img> de ASEF.")
+    parser.add_argument("--widths", default=",".join(map(str, WIDTHS)), help="Anchos de las variantes (px).")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Atributo sizes para los <img> que no lo tengan.")
+    parser.add_argument("--jobs", "-j", type=int, default=default_jobs(), help="Procesos para codificar.")
+    parser.add_argument("--no-cache", action="store_true", help="Recodifica todo (ignora .asef_cache/images).")
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_output.start(args, ROOT)
+
+    widths = tuple(sorted({int(w) for w in args.widths.split(",") if w.strip()}))
+    print(f"🖼  ASEF | Imágenes responsivas (anchos {', '.join(map(str, widths))})")
+    if Image is None:
+        print("ℹ️  Pillow no instalado: sólo width/height y loading, sin variantes (pip install pillow).")
+    stats = run(ROOT, widths, args.sizes, jobs=args.jobs, use_cache=not args.no_cache)
+
+    if stats["report"]:
+        print(f"\n{'imagen':<32} {'original KB':>12} {'webp KB (min–máx)':>20}")
+        for rel, raw, smallest, largest in stats["report"]:
+            print(f"{rel:<32} {raw / 1024:>12.1f} {f'{smallest / 1024:.1f}–{largest / 1024:.1f}':>20}")
+
+    print("\n===== RESUMEN ASEF IMAGES =====")
+    print(f"Páginas revisadas   : {stats['pages']}")
+    print(f"Imágenes locales    : {stats['images']}")
+    print(f"Codificadas ahora   : {stats['encoded']} variante(s)")
+    print(f"Fuentes en caché    : {stats['cached']}")
+    print(f"Variantes escritas  : {stats['written']}")
+    print(f"Variantes borradas  : {stats['removed']}")
+    print(f"<img> actualizados  : {stats['imgs']} en {stats['changed_pages']} página(s)")
+    print(f"Tiempo              : {stats['elapsed_ms']} ms")
+    asef_output.finish(args, len(asef_output.OUTPUT.changed))
+    if stats["missing"]:
+        print(f"\n❌ {len(stats['missing'])} variante(s) pedidas por las páginas no existen (pip install pillow):")
+        for rel in stats["missing"]:
+            print(f"  - {rel}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+asef_link_graph.py — Grafo de enlaces offline y detector de enlaces rotos.
+
+1) Indexa una sola vez todos los archivos del proyecto en un set en memoria
+   (vía asef_walk; lo de public/ se sirve desde la raíz, como en Vite).
+2) Extrae href/src/onclick(location.href) de index.html y pages/**, y url()/@import
+   de css/*.css (también en <style> y style="..." de los HTML).
+3) Resuelve cada enlace contra el índice con un lookup de hash (sin stat):
+   - páginas con <base> o con el snippet de base dinámico: relativo a la raíz
+     del sitio ('/' en local, '/asefweb/' en GitHub Pages);
+   - páginas sin base y CSS: relativo a la carpeta del archivo.
+4) Reporta destinos inexistentes, páginas huérfanas y assets sin referencias,
+   y puede exportar el grafo a JSON (--json) para otras herramientas.
+
+Uso:
+    python asef_link_graph.py
+    python asef_link_graph.py --json link_graph.json --strict
+"""
+
+import argparse
+import json
+import posixpath
+import re
+import sys
+import time
+from pathlib import Path
+
+from asef_html import iter_tags
+from asef_targets import is_dynamic_base
+from asef_walk import walk_files
+
+ROOT = Path(__file__).parent
+SITE_PREFIX = "/asefweb/"
+
+# Carpetas cuyo contenido se publica en la raíz del sitio
+PUBLIC_DIRS = ("public",)
+
+# Extensiones que cuentan como assets (para "sin referencias")
+ASSET_EXTS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico",
+              ".pdf", ".docx", ".xlsx", ".json", ".woff", ".woff2")
+
+EXTERNAL_PREFIXES = ("http://", "https://", "//", "mailto:", "tel:", "whatsapp:", "fax:",
+                     "data:", "javascript:", "blob:", "#")
+
+RE_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""", re.IGNORECASE)
+RE_CSS_IMPORT = re.compile(r"""@import\s+(['"])([^'"]+)\1""", re.IGNORECASE)
+RE_ONCLICK_LOC = re.compile(r"""\blocation\.href\s*=\s*(['"])([^'"]*)\1""", re.IGNORECASE)
+RE_LINK_HINT = re.compile(r"(?:href|src|onclick|style)\s*=", re.IGNORECASE)
+
+
+def build_index(root: Path) -> set:
+    """Rutas (posix, relativas a la raíz del sitio) de todos los archivos propios."""
+    index = set()
+    for p in walk_files(root):
+        rel = p.relative_to(root).as_posix()
+        index.add(rel)
+        top, _, rest = rel.partition("/")
+        if top in PUBLIC_DIRS and rest:
+            index.add(rest)
+    return index
+
+
+def is_external(url: str) -> bool:
+    return url.lower().startswith(EXTERNAL_PREFIXES)
+
+
+def extract_css_links(css: str) -> list:
+    links = [("url", m.group(2).strip()) for m in RE_CSS_URL.finditer(css)]
+    links += [("import", m.group(2).strip()) for m in RE_CSS_IMPORT.finditer(css)]
+    return links
+
+
+def extract_html_links(html: str) -> tuple[list, bool]:
+    """
+    Devuelve ([(tipo, url), ...], usa_base) para un documento HTML.
+    usa_base es True si la página define <base> o trae el snippet de base dinámico.
+    """
+    links = []
+    has_base = False
+    for tag in iter_tags(html, names=("base", "script", "style"), hint=RE_LINK_HINT):
+        if tag.name == "base":
+            has_base = True
+            continue
+        if tag.name == "script" and is_dynamic_base(tag):
+            has_base = True
+        if tag.name == "style":
+            links += extract_css_links(html[tag.end:tag.raw_end])
+        for a in tag.attrs:
+            if a.name in ("href", "src"):
+                links.append((a.name, a.value.strip()))
+            elif a.name == "onclick":
+                links += [("onclick", m.group(2)) for m in RE_ONCLICK_LOC.finditer(a.value)]
+            elif a.name == "style" and "url(" in a.value:
+                links += extract_css_links(a.value)
+    return links, has_base
+
+
+def resolve(url: str, source: str, root_relative: bool):
+    """
+    Resuelve `url` (tal como aparece en `source`) a una ruta relativa a la raíz del sitio.
+    Devuelve None para URLs externas, anclas o plantillas.
+    """
+    if not url or is_external(url) or "${" in url or "{{" in url:
+        return None
+    url = url.split("#", 1)[0].split("?", 1)[0]
+    if not url:
+        return None
+    if url.startswith("/"):
+        path = url[len(SITE_PREFIX):] if url.startswith(SITE_PREFIX) else url.lstrip("/")
+    elif root_relative:
+        path = url
+    else:
+        path = posixpath.join(posixpath.dirname(source), url)
+    path = posixpath.normpath(path)
+    if path in (".", ""):
+        return "index.html"
+    if path.startswith("../"):
+        return path
+    if url.endswith("/"):
+        path = posixpath.join(path, "index.html")
+    return path
+
+
+def source_files(root: Path) -> list:
+    files = [p for p in walk_files(root, (".html",)) if p.relative_to(root).parts[0] in ("index.html", "pages")]
+    files += [p for p in walk_files(root / "css", (".css",))] if (root / "css").is_dir() else []
+    return files
+
+
+def build_graph(root: Path = ROOT) -> dict:
+    """Construye el grafo completo y el reporte de problemas."""
+    t0 = time.perf_counter()
+    index = build_index(root)
+    edges = []
+    dangling = []
+    referenced = set()
+    checked = 0
+
+    for path in source_files(root):
+        source = path.relative_to(root).as_posix()
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        if source.endswith(".css"):
+            links, root_relative = extract_css_links(text), False
+        else:
+            links, root_relative = extract_html_links(text)
+        for kind, url in links:
+            target = resolve(url, source, root_relative)
+            if target is None:
+                continue
+            checked += 1
+            exists = target in index
+            edges.append({"source": source, "target": target, "kind": kind, "url": url, "exists": exists})
+            if exists:
+                referenced.add(target)
+            else:
+                dangling.append({"source": source, "url": url, "target": target})
+
+    pages = sorted(p for p in index if p.endswith(".html") and (p == "index.html" or p.startswith("pages/")))
+    linked_pages = {e["target"] for e in edges if e["exists"] and e["source"] != e["target"]}
+    orphans = [p for p in pages if p != "index.html" and p not in linked_pages]
+    # Los archivos sueltos en la raíz (package.json, vite.config.js, ...) y las carpetas
+    # ocultas son configuración, no assets del sitio
+    unreferenced = sorted(
+        p for p in index
+        if p.endswith(ASSET_EXTS) and p not in referenced
+        and "/" in p and not p.startswith(".") and not p.startswith(PUBLIC_DIRS)
+    )
+
+    return {
+        "root": str(root),
+        "files": sorted(index),
+        "edges": edges,
+        "dangling": dangling,
+        "orphans": orphans,
+        "unreferenced": unreferenced,
+        "links_checked": checked,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grafo de enlaces y detector de enlaces rotos del proyecto ASEF.")
+    parser.add_argument("--json", metavar="ARCHIVO", help="Exporta el grafo completo a JSON.")
+    parser.add_argument("--strict", action="store_true", help="Sale con código 1 si hay enlaces rotos.")
+    args = parser.parse_args()
+
+    print("🕸  ASEF | Grafo de enlaces (HTML + CSS)\n")
+    graph = build_graph(ROOT)
+
+    if graph["dangling"]:
+        print("❌ Enlaces a destinos inexistentes:")
+        for d in graph["dangling"]:
+            print(f"  - {d['source']}: {d['url']}  →  {d['target']}")
+    if graph["orphans"]:
+        print("\n⚠️ Páginas huérfanas (nadie las enlaza):")
+        for p in graph["orphans"]:
+            print(f"  - {p}")
+    if graph["unreferenced"]:
+        print("\n⚠️ Assets sin referencias desde HTML/CSS:")
+        for p in graph["unreferenced"]:
+            print(f"  - {p}")
+
+    print("\n===== RESUMEN ASEF LINK GRAPH =====")
+    print(f"Archivos indexados: {len(graph['files'])}")
+    print(f"Enlaces resueltos : {graph['links_checked']}")
+    print(f"Rotos             : {len(graph['dangling'])}")
+    print(f"Páginas huérfanas : {len(graph['orphans'])}")
+    print(f"Assets sin uso    : {len(graph['unreferenced'])}")
+    print(f"Tiempo            : {graph['elapsed_ms']} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(graph, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nGrafo exportado a: {args.json}")
+
+    if args.strict and graph["dangling"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
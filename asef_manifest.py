@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+asef_manifest.py — Manifiesto incremental compartido por los scripts de reparación.
+
+Guarda en disco (.asef_cache/manifest.json) una entrada por archivo con:
+  - size, mtime_ns y hash del contenido
+  - por herramienta: hash de sus reglas y el resultado de la última corrida
+
+Un archivo se saltea (sin decodificarlo) cuando:
+  1) size y mtime_ns coinciden con la entrada  -> sólo cuesta un stat, o
+  2) el size coincide y el hash de los bytes también (p. ej. un "touch")
+y además la herramienta registró ese contenido con el mismo hash de reglas.
+
+Si una herramienta reescribe el archivo, el hash cambia y se descartan los
+registros de las demás herramientas (deben volver a mirarlo). Si cambian las
+reglas de una herramienta sólo se invalidan sus propios registros.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+
+MANIFEST_DIR = ".asef_cache"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def rules_hash(*parts) -> str:
+    """
+    Hash de la versión de un conjunto de reglas. Acepta funciones (se hashea su
+    código fuente), regex compiladas (patrón + flags) y cualquier valor con repr estable.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if callable(part) and hasattr(part, "__code__"):
+            try:
+                part = inspect.getsource(part)
+            except (OSError, TypeError):
+                part = part.__code__.co_code
+        elif hasattr(part, "pattern") and hasattr(part, "flags"):
+            part = f"{part.pattern!r}/{part.flags}"
+        if not isinstance(part, bytes):
+            part = repr(part).encode("utf-8")
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, root, enabled: bool = True, path=None):
+        self.root = Path(root)
+        # `path` permite guardar fuera de `root` (p. ej. el manifiesto de un árbol de build)
+        self.path = Path(path) if path else self.root / MANIFEST_DIR / MANIFEST_NAME
+        self.enabled = enabled
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        if enabled:
+            self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("files", {})
+
+    def key(self, path) -> str:
+        p = Path(path)
+        try:
+            p = p.relative_to(self.root)
+        except ValueError:
+            pass
+        return p.as_posix()
+
+    def lookup(self, path, tool: str, rules: str):
+        """
+        Devuelve el resultado guardado por `tool` si el archivo no cambió y las
+        reglas son las mismas; si no, None (hay que procesarlo).
+        """
+        if not self.enabled:
+            return None
+        e = self.entries.get(self.key(path))
+        if not e:
+            return None
+        rec = e["tools"].get(tool)
+        if not rec or rec["rules"] != rules:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != e["size"]:
+            return None
+        if st.st_mtime_ns != e["mtime_ns"]:
+            # Mismo tamaño, otra fecha: comparamos bytes (sin decodificar)
+            try:
+                data = Path(path).read_bytes()
+            except OSError:
+                return None
+            if hash_bytes(data) != e["hash"]:
+                return None
+            e["mtime_ns"] = st.st_mtime_ns
+            self.dirty = True
+        self.hits += 1
+        return rec["result"]
+
+    def store(self, path, tool: str, rules: str, result=None):
+        """Registra que `tool` procesó el contenido actual del archivo con `rules`."""
+        if not self.enabled:
+            return
+        try:
+            st = os.stat(path)
+            digest = hash_bytes(Path(path).read_bytes())
+        except OSError:
+            return
+        key = self.key(path)
+        e = self.entries.get(key)
+        if not e or e["hash"] != digest:
+            e = {"tools": {}}
+            self.entries[key] = e
+        e["size"] = st.st_size
+        e["mtime_ns"] = st.st_mtime_ns
+        e["hash"] = digest
+        e["tools"][tool] = {"rules": rules, "result": result}
+        self.dirty = True
+
+    def save(self):
+        if not (self.enabled and self.dirty):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": self.entries}, ensure_ascii=False, sort_keys=True),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        self.dirty = False
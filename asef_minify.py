@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+"""
+asef_minify.py — Minificación de HTML, CSS y JS con caché por hash de la fuente.
+
+asef_fix_assets ya limpia líneas en blanco y comentarios redundantes en las
+fuentes; esto es la minificación real del build, conservadora a propósito:
+  - HTML: quita comentarios (no los condicionales) y colapsa los espacios del
+    texto y de las etiquetas a uno solo, manteniendo un salto de línea si lo
+    había (nunca junta dos palabras). <pre> y <textarea> quedan intactos; el
+    contenido de <style> pasa por el minificador de CSS y el de <script> (JS
+    clásico o módulo) por el de JS; el resto de los <script> (JSON, plantillas)
+    no se toca.
+  - CSS: quita comentarios (salvo /*! ... */), colapsa espacios y los borra
+    alrededor de { } ; , >, después de ':' y el ';' final de cada bloque. Strings y url() sin
+    comillas se copian tal cual.
+  - JS: quita comentarios (salvo /*! ... */) y la indentación, colapsa espacios
+    dentro de la línea sólo junto a { } ( ) [ ] ; , : y conserva TODOS los saltos
+    de línea (la inserción automática de ';' sigue viendo lo mismo). Strings,
+    template literals y regex se copian tal cual.
+
+Los resultados se guardan en .asef_cache/minify/, con clave (hash de la fuente,
+tipo, versión del minificador): un build repetido sólo minifica lo que cambió.
+
+Uso:
+    python asef_minify.py                 # minifica build/ en el lugar
+    python asef_minify.py --dir dist
+    python asef_fingerprint.py --minify   # dentro del build, antes del hash
+"""
+
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+from asef_html import iter_tags
+from asef_manifest import MANIFEST_DIR, hash_bytes, rules_hash
+from asef_output import atomic_write
+from asef_walk import walk_files
+
+ROOT = Path(__file__).parent
+OUT_DIR = "build"
+CACHE_NAME = "minify"
+MINIFY_EXTS = (".html", ".css", ".js", ".mjs")
+
+JS_TYPES = ("", "text/javascript", "application/javascript", "module")
+
+
+# -------------------------------------------------------------------
+# CSS
+# -------------------------------------------------------------------
+# Strings (la comilla final es opcional: nunca falla), comentarios, url() sin comillas y espacios
+RE_CSS_TOKEN = re.compile(
+    r"""(?P<str>"[^"\\\n]*(?:\\.[^"\\\n]*)*"?|'[^'\\\n]*(?:\\.[^'\\\n]*)*'?)
+       |(?P<comment>/\*.*?(?:\*/|\Z))
+       |(?P<url>url\(\s*[^'"\s)][^)]*(?:\)|\Z))
+       |(?P<ws>[ \t\r\n\f]+)""",
+    re.VERBOSE | re.DOTALL | re.IGNORECASE,
+)
+CSS_TIGHT = "{};,>"
+
+
+def minify_css(css: str) -> str:
+    out = []
+    pending = False
+    pos = 0
+
+    def emit(chunk: str):
+        nonlocal pending
+        if not chunk:
+            return
+        # Después de ':' el espacio nunca hace falta (antes sí: "a :hover" es otro selector)
+        if pending and out and out[-1][-1] not in CSS_TIGHT + ":" and chunk[0] not in CSS_TIGHT:
+            out.append(" ")
+        pending = False
+        out.append(chunk)
+
+    def emit_literal(chunk: str):
+        chunk = chunk.replace(";}", "}")
+        if chunk.startswith("}") and out and out[-1].endswith(";") and not out[-1].startswith(("'", '"')):
+            out[-1] = out[-1][:-1]
+            if not out[-1]:
+                out.pop()
+        emit(chunk)
+
+    for m in RE_CSS_TOKEN.finditer(css):
+        if m.start() > pos:
+            emit_literal(css[pos:m.start()])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            pending = True
+        elif kind == "comment":
+            if m.group().startswith("/*!"):
+                emit(m.group())
+            else:
+                pending = True
+        else:
+            emit(m.group())
+    if pos < len(css):
+        emit_literal(css[pos:])
+    return "".join(out)
+
+
+# -------------------------------------------------------------------
+# JS
+# -------------------------------------------------------------------
+JS_TIGHT = "{}()[];,:"
+JS_IDENT = re.compile(r"[A-Za-z0-9_$\\]+")
+# Después de estas palabras, '/' abre una regex (no es división)
+REGEX_KEYWORDS = frozenset({"return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+                            "throw", "case", "do", "else", "yield", "await"})
+REGEX_AFTER = "(,=:[!&|?{};+-*%<>~^"
+JS_WS = " \t\r\n\f\v\u00a0\ufeff"
+
+
+def _skip_string(js: str, i: int) -> int:
+    """Fin de un string '...' o "..." que empieza en i (corta en un salto de línea sin escapar)."""
+    quote = js[i]
+    i += 1
+    n = len(js)
+    while i < n:
+        c = js[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote or c == "\n":
+            return i + 1
+        i += 1
+    return n
+
+
+def _skip_template(js: str, i: int) -> int:
+    """Fin de un template literal, incluidas las expresiones ${...} anidadas."""
+    i += 1
+    n = len(js)
+    while i < n:
+        c = js[i]
+        if c == "\\":
+            i += 2
+        elif c == "`":
+            return i + 1
+        elif c == "$" and js.startswith("{", i + 1):
+            i = _skip_code(js, i + 2)
+        else:
+            i += 1
+    return n
+
+
+def _skip_code(js: str, i: int) -> int:
+    """Dentro de ${...}: avanza hasta la '}' que lo cierra (respeta strings, templates y comentarios)."""
+    depth = 0
+    n = len(js)
+    while i < n:
+        c = js[i]
+        if c in "'\"":
+            i = _skip_string(js, i)
+        elif c == "`":
+            i = _skip_template(js, i)
+        elif js.startswith("//", i):
+            j = js.find("\n", i)
+            i = n if j < 0 else j
+        elif js.startswith("/*", i):
+            j = js.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+        elif c == "{":
+            depth += 1
+            i += 1
+        elif c == "}":
+            if depth == 0:
+                return i + 1
+            depth -= 1
+            i += 1
+        else:
+            i += 1
+    return n
+
+
+def _skip_regex(js: str, i: int) -> int:
+    """Fin de una regex literal /.../flags (las clases [...] pueden contener '/')."""
+    i += 1
+    n = len(js)
+    in_class = False
+    while i < n:
+        c = js[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "\n":
+            return i
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "/":
+            m = JS_IDENT.match(js, i + 1)
+            return m.end() if m else i + 1
+        i += 1
+    return n
+
+
+def minify_js(js: str) -> str:
+    out = []
+    pending = ""          # "", " " o "\n": espacio pendiente antes del próximo token
+    last = ""             # último carácter significativo emitido
+    word = ""             # última palabra emitida (para return /re/ ...)
+    i = 0
+    n = len(js)
+
+    def emit(chunk: str, nxt: str):
+        nonlocal pending, last
+        if pending == "\n" and out:
+            out.append("\n")
+        elif pending == " " and out and last not in JS_TIGHT and nxt not in JS_TIGHT:
+            out.append(" ")
+        pending = ""
+        out.append(chunk)
+        last = chunk[-1]
+
+    while i < n:
+        c = js[i]
+        if c in JS_WS:
+            j = i
+            while j < n and js[j] in JS_WS:
+                j += 1
+            if "\n" in js[i:j] or "\r" in js[i:j]:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = j
+            continue
+        if c == "/" and js.startswith("//", i):
+            j = js.find("\n", i)
+            i = n if j < 0 else j
+            continue
+        if c == "/" and js.startswith("/*", i):
+            j = js.find("*/", i + 2)
+            end = n if j < 0 else j + 2
+            comment = js[i:end]
+            if comment.startswith("/*!"):
+                emit(comment, "/")
+            elif "\n" in comment:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = end
+            continue
+        if c in "'\"":
+            end = _skip_string(js, i)
+        elif c == "`":
+            end = _skip_template(js, i)
+        elif c == "/" and (not last or last in REGEX_AFTER or (last.isalnum() and word in REGEX_KEYWORDS)):
+            end = _skip_regex(js, i)
+        elif JS_IDENT.match(c):
+            end = JS_IDENT.match(js, i).end()
+            emit(js[i:end], c)
+            word = js[i:end]
+            i = end
+            continue
+        else:
+            end = i + 1
+        emit(js[i:end], c)
+        word = ""
+        i = end
+    return "".join(out)
+
+
+# -------------------------------------------------------------------
+# HTML
+# -------------------------------------------------------------------
+RE_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?(?:-->|\Z)", re.DOTALL)
+# Comentarios junto con los espacios que los rodean, o un tramo de espacios
+RE_HTML_GAP = re.compile(r"(?:[ \t\r\n\f]*<!--(?!\[if).*?(?:-->|\Z))+[ \t\r\n\f]*|[ \t\r\n\f]+", re.DOTALL)
+RE_TAG_WS = re.compile(r"""("[^"]*"|'[^']*')|[ \t\r\n\f]+""")
+PRESERVE_TAGS = ("pre", "textarea")
+
+
+def _collapse(ws: str) -> str:
+    return "\n" if "\n" in ws else " "
+
+
+def _gap(text: str) -> str:
+    """Texto entre etiquetas: sin comentarios y con los espacios colapsados."""
+    def repl(m):
+        ws = RE_HTML_COMMENT.sub("", m.group())
+        return _collapse(ws) if ws else ""
+    return RE_HTML_GAP.sub(repl, text)
+
+
+def _tag(text: str) -> str:
+    return RE_TAG_WS.sub(lambda m: m.group(1) or " ", text)
+
+
+def minify_html(html: str) -> str:
+    out = []
+    pos = 0
+    preserve = None       # (nombre, profundidad) mientras se está dentro de <pre>/<textarea>
+    closing = PRESERVE_TAGS
+    for tag in iter_tags(html, closing=closing):
+        if preserve is not None:
+            name, depth = preserve
+            if tag.name == name:
+                preserve = (name, depth + 1)
+            elif tag.name == "/" + name:
+                depth -= 1
+                preserve = None if depth == 0 else (name, depth)
+                if preserve is None:
+                    out.append(html[pos:tag.end])
+                    pos = tag.end
+            continue
+        out.append(_gap(html[pos:tag.start]))
+        if tag.name.startswith("/"):
+            out.append(html[tag.start:tag.end])
+            pos = tag.end
+            continue
+        out.append(_tag(html[tag.start:tag.end]))
+        pos = tag.end
+        if tag.name in PRESERVE_TAGS:
+            preserve = (tag.name, 1)
+            continue
+        if tag.raw_end > tag.end:
+            body = html[tag.end:tag.raw_end]
+            if tag.name == "style":
+                body = minify_css(body)
+            elif tag.name == "script" and (tag.get("type") or "").strip().lower() in JS_TYPES:
+                body = minify_js(body)
+            out.append(body)
+            pos = tag.raw_end
+    if preserve is not None:
+        out.append(html[pos:])
+    else:
+        out.append(_gap(html[pos:]))
+    return "".join(out)
+
+
+# Versión del minificador: entra en la clave de la caché
+MINIFIER = rules_hash(minify_css, minify_js, minify_html, _skip_string, _skip_template, _skip_code, _skip_regex,
+                      _gap, _tag, _collapse, RE_CSS_TOKEN, RE_HTML_COMMENT, RE_HTML_GAP, RE_TAG_WS, CSS_TIGHT, JS_TIGHT,
+                      sorted(REGEX_KEYWORDS), REGEX_AFTER, JS_TYPES)
+
+MINIFIERS = {".html": minify_html, ".css": minify_css, ".js": minify_js, ".mjs": minify_js}
+
+
+# -------------------------------------------------------------------
+# Caché
+# -------------------------------------------------------------------
+class Minifier:
+    """minify(rel, data) con caché en disco y ahorro por archivo."""
+
+    def __init__(self, root=ROOT, use_cache: bool = True):
+        self.dir = Path(root) / MANIFEST_DIR / CACHE_NAME
+        self.use_cache = use_cache
+        self.hits = self.misses = 0
+        self.saved = {}           # rel -> (bytes antes, bytes después)
+
+    def _path(self, key: str) -> Path:
+        return self.dir / key[:2] / key[2:]
+
+    def minify(self, rel: str, data: bytes, label: str = None) -> bytes:
+        ext = os.path.splitext(rel)[1].lower()
+        fn = MINIFIERS.get(ext)
+        if fn is None:
+            return data
+        key = hash_bytes(f"{MINIFIER}:{ext}:{hash_bytes(data)}".encode("utf-8"))
+        path = self._path(key)
+        result = None
+        if self.use_cache:
+            try:
+                result = path.read_bytes()
+                self.hits += 1
+            except OSError:
+                pass
+        if result is None:
+            self.misses += 1
+            result = fn(data.decode("utf-8", errors="replace")).encode("utf-8")
+            if self.use_cache:
+                atomic_write(path, result)
+        self.saved[label or rel] = (len(data), len(result))
+        return result
+
+    def report(self, top: int = None):
+        rows = sorted(self.saved.items(), key=lambda kv: kv[1][0] - kv[1][1], reverse=True)
+        for rel, (before, after) in rows[:top]:
+            pct = (before - after) * 100 / before if before else 0
+            print(f"  {rel:<40} {before / 1024:>8.1f} KB → {after / 1024:>8.1f} KB  (-{pct:.0f}%)")
+        before = sum(b for b, _ in self.saved.values())
+        after = sum(a for _, a in self.saved.values())
+        print(f"Minificados: {len(self.saved)} archivo(s), {before / 1024:.1f} KB → {after / 1024:.1f} KB "
+              f"(-{(before - after) / 1024:.1f} KB) · caché {self.hits} / nuevos {self.misses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minificación de HTML/CSS/JS de un árbol de build ASEF (en el lugar).")
+    parser.add_argument("--dir", default=str(ROOT / OUT_DIR), help="Árbol a minificar (build/ o dist/).")
+    parser.add_argument("--no-cache", action="store_true", help="Minifica todo de nuevo (ignora .asef_cache/minify).")
+    args = parser.parse_args()
+
+    out = Path(args.dir)
+    print(f"🪶 ASEF | Minificación → {out}\n")
+    t0 = time.perf_counter()
+    minifier = Minifier(ROOT, use_cache=not args.no_cache)
+    written = 0
+    for path in walk_files(out, MINIFY_EXTS, gitignore=False):
+        data = path.read_bytes()
+        result = minifier.minify(path.relative_to(out).as_posix(), data)
+        if result != data:
+            atomic_write(path, result)
+            written += 1
+
+    print("===== RESUMEN ASEF MINIFY =====")
+    minifier.report()
+    print(f"Reescritos : {written}")
+    print(f"Tiempo     : {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+asef_modgraph.py — Grafo de módulos ES del sitio: qué JS necesita cada página.
+
+Las páginas cargan js/firebase-init.js, auth.js, navigation.js, ... como
+type="module" (lo fuerza asef_repair_all), pero nadie sabe qué página usa qué
+módulo. Sobre el índice de referencias (asef_refs, con caché por hash: una
+segunda corrida no re-parsea nada) se arma el grafo:
+  - entradas de cada página: sus <script src> locales (y los externos, aparte)
+  - aristas: import/export ... from, import '...' (estáticas) e import('...')
+    (dinámicas: se cargan recién cuando el código las pide)
+  - clausura transitiva por página, con bytes estáticos y dinámicos
+
+y se reporta:
+  - módulos inalcanzables: JS del sitio que ninguna página carga ni importa
+    (main.js/counter.js de la plantilla de Vite, restos sueltos)
+  - cargas duplicadas: el mismo <script src> dos veces, el mismo archivo con
+    URLs distintas (?v=..., otra ruta: el navegador lo evalúa dos veces) y
+    entradas redundantes (ya las importa otra entrada de la página)
+  - imports rotos y copias viejas (*.js.bak) junto a los módulos
+
+    from asef_modgraph import ModuleGraph
+    graph = ModuleGraph(RefIndex(ROOT).update())
+    graph.page("index.html")["bytes"]
+
+Uso:
+    python asef_modgraph.py
+    python asef_modgraph.py --page pages/admin/users.html
+    python asef_modgraph.py --json grafo.json
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from asef_refs import RefIndex
+from asef_walk import walk_files
+
+ROOT = Path(__file__).parent
+
+JS_EXTS = (".js", ".mjs")
+STALE_SUFFIXES = (".bak", ".old", ".orig")
+
+
+def _query(url: str) -> str:
+    """'?v=2' de 'js/a.js?v=2#x' ('' si no tiene): con otra query es otro módulo para el navegador."""
+    path = url.split("#", 1)[0]
+    return "?" + path.split("?", 1)[1] if "?" in path else ""
+
+
+class ModuleGraph:
+    """Grafo de imports sobre un RefIndex ya actualizado (todo se deriva del índice)."""
+
+    def __init__(self, index: RefIndex):
+        self.index = index
+        self.memo = {}
+
+    def modules(self) -> list:
+        return sorted(rel for rel in self.index.files if rel.endswith(JS_EXTS))
+
+    def pages(self) -> list:
+        return sorted(rel for rel in self.index.entries if rel.endswith(".html"))
+
+    def size(self, rel: str) -> int:
+        e = self.index.entries.get(rel)
+        return e["size"] if e else self.index.files[rel].stat().st_size
+
+    def imports(self, rel: str) -> tuple[list, list]:
+        """([(url, destino)] estáticos, [(url, destino)] dinámicos) de un módulo."""
+        if rel not in self.memo:
+            static, dynamic = [], []
+            for r in self.index.refs(rel):
+                if r.target and r.target.endswith(JS_EXTS):
+                    if r.kind == "module":
+                        static.append((r.url, r.target))
+                    elif r.kind == "dynamic":
+                        dynamic.append((r.url, r.target))
+            self.memo[rel] = (static, dynamic)
+        return self.memo[rel]
+
+    def entries(self, page: str) -> tuple[list, list]:
+        """([(url, destino)] de los <script src> locales en orden, [url externas])."""
+        local, external = [], []
+        for r in self.index.refs(page):
+            if r.kind != "src":
+                continue
+            if r.target is None:
+                if r.url.split("?", 1)[0].endswith(JS_EXTS):
+                    external.append(r.url)
+            elif r.target.endswith(JS_EXTS):
+                local.append((r.url, r.target))
+        return local, external
+
+    def closure(self, roots, dynamic: bool = False) -> dict:
+        """Módulos alcanzables desde `roots` -> {destino: {claves de URL con que se pide}}."""
+        seen = {}
+        stack = list(roots)
+        while stack:
+            url, rel = stack.pop()
+            key = rel + _query(url)
+            if rel in seen:
+                seen[rel].add(key)
+                continue
+            seen[rel] = {key}
+            if rel not in self.index.files:
+                continue
+            static, lazy = self.imports(rel)
+            stack += static + (lazy if dynamic else [])
+        return seen
+
+    def page(self, page: str) -> dict:
+        local, external = self.entries(page)
+        static = self.closure(local)
+        everything = self.closure(local, dynamic=True)
+        lazy = sorted(set(everything) - set(static))
+        present = [rel for rel in static if rel in self.index.files]
+
+        # Duplicados: misma entrada dos veces, mismo archivo con URLs distintas, entradas redundantes
+        listed = {}
+        for url, rel in local:
+            listed.setdefault(rel + _query(url), []).append(url)
+        duplicates = [f"<script src> repetido: {urls[0]} (x{len(urls)})" for urls in listed.values() if len(urls) > 1]
+        duplicates += [f"{rel} se pide con {len(keys)} URLs distintas: {', '.join(sorted(keys))}"
+                       for rel, keys in sorted(everything.items()) if len(keys) > 1]
+        for url, rel in local:
+            others = [e for e in local if e[1] != rel]
+            if rel in self.closure(others):
+                duplicates.append(f"{url}: entrada redundante (ya la importa otro módulo de la página)")
+
+        return {
+            "entries": [rel for _, rel in local],
+            "external": external,
+            "modules": sorted(present),
+            "bytes": sum(self.size(rel) for rel in present),
+            "dynamic": [rel for rel in lazy if rel in self.index.files],
+            "dynamic_bytes": sum(self.size(rel) for rel in lazy if rel in self.index.files),
+            "missing": sorted(rel for rel in everything if rel not in self.index.files),
+            "duplicates": sorted(set(duplicates)),
+        }
+
+    def analyze(self) -> dict:
+        pages = {p: self.page(p) for p in self.pages()}
+        reached = set()
+        for info in pages.values():
+            reached.update(info["modules"], info["dynamic"])
+        unreachable = [rel for rel in self.modules() if rel not in reached]
+        stale = sorted(p.relative_to(self.index.root).as_posix()
+                       for p in walk_files(self.index.root, tuple(ext + s for ext in JS_EXTS for s in STALE_SUFFIXES)))
+        broken = set()
+        for src in self.modules():
+            static, dynamic = self.imports(src)
+            broken.update((src, url) for url, rel in static + dynamic if rel not in self.index.files)
+        return {
+            "pages": pages,
+            "unreachable": [{"module": rel, "bytes": self.size(rel)} for rel in unreachable],
+            "broken": [{"module": src, "import": url} for src, url in sorted(broken)],
+            "stale": stale,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grafo de módulos ES de ASEF: clausura por página y módulos muertos.")
+    parser.add_argument("--page", action="append", help="Detalle de esta(s) página(s) (ruta del sitio).")
+    parser.add_argument("--json", metavar="ARCHIVO", help="Guarda el análisis completo en JSON ('-' = stdout).")
+    parser.add_argument("--no-cache", action="store_true", help="Re-extrae todas las referencias (ignora .asef_cache/refs.json).")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = RefIndex(ROOT, use_cache=not args.no_cache).update()
+    graph = ModuleGraph(index)
+    report = graph.analyze()
+    elapsed = round((time.perf_counter() - t0) * 1000, 2)
+
+    if args.json:
+        text = json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+        if args.json == "-":
+            print(text, end="")
+            return
+        Path(args.json).write_text(text, encoding="utf-8")
+
+    pages = report["pages"]
+    print("🧩 ASEF | Grafo de módulos ES\n")
+    print(f"{'página':<34} {'entradas':>8} {'módulos':>8} {'KB':>8} {'+dyn KB':>8} {'ext':>4}")
+    for page, info in pages.items():
+        print(f"{page:<34} {len(info['entries']):>8} {len(info['modules']):>8} {info['bytes'] / 1024:>8.1f} "
+              f"{info['dynamic_bytes'] / 1024:>8.1f} {len(info['external']):>4}")
+
+    for page in args.page or ():
+        info = pages.get(page)
+        if info is None:
+            print(f"\n⚠️  {page}: no es una página del sitio")
+            continue
+        print(f"\n📄 {page}")
+        for rel in info["modules"]:
+            mark = "▶" if rel in info["entries"] else " "
+            print(f"  {mark} {rel:<36} {index.files[rel].stat().st_size / 1024:>7.1f} KB")
+        for rel in info["dynamic"]:
+            print(f"  ⋯ {rel:<36} (import dinámico)")
+        for url in info["external"]:
+            print(f"  ↗ {url}")
+
+    dup_pages = {p: info["duplicates"] for p, info in pages.items() if info["duplicates"]}
+    if dup_pages:
+        print("\n🔁 Cargas duplicadas:")
+        for page, items in dup_pages.items():
+            for item in items:
+                print(f"  - {page}: {item}")
+    if report["unreachable"]:
+        print("\n🪦 Módulos inalcanzables (ninguna página los carga):")
+        for item in report["unreachable"]:
+            print(f"  - {item['module']} ({item['bytes'] / 1024:.1f} KB)")
+    # Entradas que no existen (los imports rotos ya salen por módulo)
+    missing = sorted((p, rel) for p, info in pages.items() for rel in info["missing"] if rel in info["entries"])
+    if report["broken"] or missing:
+        print("\n❌ Referencias a módulos que no existen:")
+        for item in report["broken"]:
+            print(f"  - {item['module']}: import '{item['import']}'")
+        for page, rel in missing:
+            print(f"  - {page}: {rel}")
+    if report["stale"]:
+        print("\n🧹 Copias viejas junto a los módulos:")
+        for rel in report["stale"]:
+            print(f"  - {rel}")
+
+    print("\n===== RESUMEN ASEF MODGRAPH =====")
+    print(f"Páginas               : {len(pages)}")
+    print(f"Módulos del sitio     : {len(graph.modules())}")
+    print(f"Inalcanzables         : {len(report['unreachable'])}")
+    print(f"Páginas con duplicados: {len(dup_pages)}")
+    print(f"Referencias rotas     : {len(report['broken']) + len(missing)}")
+    print(f"Índice en caché       : {index.hits}")
+    print(f"Tiempo                : {elapsed} ms")
+
+
+if __name__ == "__main__":
+    main()
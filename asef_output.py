@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+asef_output.py — Capa de salida compartida por los scripts que reescriben archivos.
+
+Tres modos, con los mismos flags en todos los scripts:
+  - normal     : escribe sólo si los bytes cambian, vía temporal + os.replace
+                 (atómico: nunca queda un archivo a medio escribir, y los archivos
+                 idénticos no se tocan, así el watcher de Vite no reconstruye nada)
+  - --dry-run  : no toca el disco; emite un diff unificado por archivo a stdout
+                 o a un archivo (--dry-run cambios.patch, aplicable con git apply)
+  - --check    : no toca el disco; termina con código 1 si algo cambiaría
+                 (compuerta rápida para deploy.ps1)
+
+Las reglas siguen devolviendo texto; sólo el primer y el último paso cambian:
+    texto = OUTPUT.read_text(ruta)   -> sin traducir saltos de línea
+    OUTPUT.write_text(ruta, texto_nuevo, original=texto_leído)   -> True si cambió
+    OUTPUT.replace(temporal, ruta)   -> publica un temporal ya escrito (streaming)
+    OUTPUT.remove(ruta)
+
+El texto se lee y se escribe tal cual (sin traducir saltos de línea): un archivo
+con CRLF sigue con CRLF, y --dry-run muestra sólo las líneas que cambian. El modo viaja a los
+workers de asef_parallel por una variable de entorno.
+
+En modo normal cada escritura queda registrada (antes/después) en el almacén de
+asef_snapshots, fuera del árbol: reemplaza a los .bak y permite deshacer la
+corrida (python asef_snapshots.py rollback <run-id>). --no-snapshot lo desactiva.
+"""
+
+import difflib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from asef_snapshots import ENV_RUN, SnapshotRun
+
+OUTPUT_MODES = ("write", "dry-run", "check")
+ENV_MODE = "ASEF_OUTPUT_MODE"
+TMP_SUFFIX = ".asef-tmp"
+
+
+def _publish(tmp, path: Path):
+    """os.replace del temporal sobre `path`, con los permisos de `path` (o los por defecto si es nuevo)."""
+    if path.exists():
+        shutil.copymode(path, tmp)
+    else:
+        # mkstemp crea con 0600: un archivo nuevo lleva los permisos por defecto
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+    os.replace(tmp, path)
+
+
+def atomic_write(path, data: bytes):
+    """Escribe `data` en un temporal de la misma carpeta y lo publica con os.replace."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=TMP_SUFFIX, dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        _publish(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _read(path):
+    try:
+        return Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+class Output:
+    def __init__(self, mode: str = None):
+        self.mode = mode or os.environ.get(ENV_MODE, "write")
+        self.root = Path.cwd()
+        self.patch = None         # archivo abierto con --dry-run ARCHIVO
+        self.changed = []         # rutas que cambiaron (o cambiarían) en este proceso
+        self.snapshot = SnapshotRun.from_env() if self.mode == "write" else None
+
+    @property
+    def writes(self) -> bool:
+        return self.mode == "write"
+
+    def label(self, path) -> str:
+        p = Path(path)
+        try:
+            return p.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return p.as_posix()
+
+    # ---------------------------------------------------------------
+    # Diff
+    # ---------------------------------------------------------------
+    def diff(self, path, old: bytes, new: bytes):
+        """Diff unificado (estilo git) de old -> new; None = archivo inexistente."""
+        name = self.label(path)
+        a = old.decode("utf-8", errors="replace").splitlines(keepends=True) if old is not None else []
+        b = new.decode("utf-8", errors="replace").splitlines(keepends=True) if new is not None else []
+        out = self.patch or sys.stdout
+        out.write(f"diff --git a/{name} b/{name}\n")
+        if old is None:
+            out.write("new file mode 100644\n")
+        elif new is None:
+            out.write("deleted file mode 100644\n")
+        lines = difflib.unified_diff(
+            a, b,
+            f"a/{name}" if old is not None else "/dev/null",
+            f"b/{name}" if new is not None else "/dev/null",
+        )
+        for line in lines:
+            out.write(line)
+            if not line.endswith("\n"):
+                out.write("\n\\ No newline at end of file\n")
+
+    # ---------------------------------------------------------------
+    # Lectura / escritura
+    # ---------------------------------------------------------------
+    def read_text(self, path, encoding: str = "utf-8", errors: str = "strict") -> str:
+        """Texto del archivo con sus fines de línea originales (pareja de write_text)."""
+        return Path(path).read_bytes().decode(encoding, errors)
+
+    def write_bytes(self, path, data: bytes, original: bytes = None) -> bool:
+        """Escribe (o muestra/registra) `data` si difiere de lo que hay en disco."""
+        if original is None:
+            original = _read(path)
+        if original == data:
+            return False
+        self.changed.append(str(path))
+        if self.mode == "write":
+            if self.snapshot is not None:
+                self.snapshot.record(path, original, data)
+            atomic_write(path, data)
+        elif self.mode == "dry-run":
+            self.diff(path, original, data)
+        return True
+
+    def write_text(self, path, text: str, original: str = None, encoding: str = "utf-8") -> bool:
+        """
+        Como write_bytes para texto. Si se pasa el texto leído (`original`) y es
+        igual, no hay ni una lectura extra; si difiere, se comparan los bytes reales.
+        """
+        if original is not None and text == original:
+            return False
+        return self.write_bytes(path, text.encode(encoding))
+
+    def replace(self, tmp, path) -> bool:
+        """Publica un temporal ya escrito junto a `path` (p. ej. por un proceso en streaming)."""
+        self.changed.append(str(path))
+        if self.mode == "write":
+            try:
+                if self.snapshot is not None:
+                    self.snapshot.record(path, _read(path), Path(tmp).read_bytes())
+                _publish(tmp, Path(path))
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            return True
+        try:
+            if self.mode == "dry-run":
+                self.diff(path, _read(path), Path(tmp).read_bytes())
+        finally:
+            os.remove(tmp)
+        return True
+
+    def remove(self, path) -> bool:
+        original = _read(path)
+        if original is None:
+            return False
+        self.changed.append(str(path))
+        if self.mode == "write":
+            if self.snapshot is not None:
+                self.snapshot.record(path, original, None)
+            os.remove(path)
+        elif self.mode == "dry-run":
+            self.diff(path, original, None)
+        return True
+
+
+OUTPUT = Output()
+
+
+# -------------------------------------------------------------------
+# Integración con argparse (mismo flag en todos los scripts)
+# -------------------------------------------------------------------
+def add_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--dry-run", nargs="?", const="-", metavar="ARCHIVO.patch",
+                       help="No escribe nada: diff unificado por archivo a stdout (o a ARCHIVO.patch).")
+    group.add_argument("--check", action="store_true",
+                       help="No escribe nada: sale con código 1 si algún archivo cambiaría.")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="No registra las escrituras en el almacén de snapshots (sin rollback).")
+
+
+def start(args, root=None):
+    mode = "dry-run" if getattr(args, "dry_run", None) else "check" if getattr(args, "check", False) else "write"
+    OUTPUT.mode = mode
+    OUTPUT.root = Path(root) if root is not None else Path.cwd()
+    os.environ[ENV_MODE] = mode
+    os.environ.pop(ENV_RUN, None)
+    OUTPUT.snapshot = None
+    if mode == "write" and not getattr(args, "no_snapshot", False):
+        OUTPUT.snapshot = SnapshotRun.begin(OUTPUT.root, Path(sys.argv[0]).stem)
+    if mode == "dry-run" and args.dry_run != "-":
+        OUTPUT.patch = open(args.dry_run, "w", encoding="utf-8", newline="")
+        # Los workers de un pool no pueden escribir en el mismo archivo de diff
+        if getattr(args, "jobs", 1) > 1:
+            print("ℹ️  --dry-run ARCHIVO fuerza --jobs 1 para armar un único diff.")
+            args.jobs = 1
+
+
+def finish(args, changed: int = None):
+    """
+    Cierra el modo. `changed` es la cantidad de archivos que cambiaron según el
+    script (los workers de un pool no reportan a OUTPUT.changed del principal).
+    Con --check y cambios pendientes termina con código 1.
+    """
+    if OUTPUT.patch is not None:
+        OUTPUT.patch.close()
+        OUTPUT.patch = None
+    n = len(OUTPUT.changed) if changed is None else changed
+    summary = OUTPUT.snapshot.summary() if OUTPUT.snapshot is not None else ""
+    if summary:
+        print(f"\n{summary}")
+    if OUTPUT.mode == "dry-run":
+        where = "" if args.dry_run == "-" else f" (diff en {args.dry_run})"
+        print(f"\n🔎 --dry-run: {n} archivo(s) cambiarían; no se escribió nada{where}.")
+    elif OUTPUT.mode == "check":
+        if n:
+            print(f"\n❌ --check: {n} archivo(s) cambiarían.")
+            sys.exit(1)
+        print("\n✅ --check: nada para cambiar.")
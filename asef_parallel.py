@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+asef_parallel.py — Ejecución en paralelo (pool de procesos) para los scripts por archivo.
+
+imap_files(func, paths, jobs) aplica `func` a cada ruta y devuelve los resultados
+en el mismo orden de `paths`, a medida que van llegando. Con jobs <= 1 corre en
+el proceso actual, sin pool.
+
+Para que la salida sea idéntica a una corrida serial:
+  - los archivos se agrupan en lotes consecutivos (por bytes) para que el costo
+    de IPC no se coma la ganancia con archivos chicos;
+  - lo que `func` imprime en el worker se captura y se reimprime en el proceso
+    principal, en orden, junto con su resultado.
+
+`func` debe ser una función de nivel de módulo (se serializa con pickle).
+"""
+
+import contextlib
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# Tamaño objetivo de cada lote enviado a un worker
+BATCH_BYTES = 256 * 1024
+# Lotes por worker, para repartir bien la carga cuando hay archivos grandes
+BATCHES_PER_JOB = 4
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def make_batches(paths, jobs: int, batch_bytes: int = BATCH_BYTES) -> list:
+    """Agrupa rutas consecutivas en lotes de ~batch_bytes (nunca vacíos)."""
+    sizes = []
+    for p in paths:
+        try:
+            sizes.append(os.path.getsize(p))
+        except OSError:
+            sizes.append(0)
+    total = sum(sizes)
+    target = max(1, min(batch_bytes, total // max(1, jobs * BATCHES_PER_JOB)))
+
+    batches, current, acc = [], [], 0
+    for p, size in zip(paths, sizes):
+        current.append(p)
+        acc += size
+        if acc >= target:
+            batches.append(current)
+            current, acc = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _run_batch(func, paths) -> list:
+    out = []
+    for p in paths:
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):
+            res = func(p)
+        out.append((res, buf.getvalue()))
+    return out
+
+
+def imap_files(func, paths, jobs: int = 1):
+    """Generador: resultados de func(path) en el orden de `paths`."""
+    paths = list(paths)
+    if jobs <= 1 or len(paths) < 2:
+        for p in paths:
+            yield func(p)
+        return
+
+    batches = make_batches(paths, jobs)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(batches))) as ex:
+        for batch in ex.map(_run_batch, repeat(func), batches):
+            for res, text in batch:
+                if text:
+                    sys.stdout.write(text)
+                yield res
@@ -11,43 +11,50 @@ Arreglo definitivo de rutas para ASEF:
 """
 
 import re
+import argparse
 from pathlib import Path
 
+from asef_walk import walk_files
+from asef_output import OUTPUT
+import asef_output
+from asef_profile import PROFILER
+
 ROOT = Path(__file__).parent
 HTMLS = [ROOT/"index.html", ROOT/"dist"/"index.html"]
 if (ROOT/"pages").exists():
-    HTMLS += list((ROOT/"pages").rglob("*.html"))
+    HTMLS += walk_files(ROOT/"pages", (".html",))
 
 CSS_FILES = ("main.css", "navigation.css", "carousel.css", "responsive.css")
 JS_FILES  = ("firebase-init.js", "auth.js", "carousel.js", "navigation.js", "main.js")
 
-def fix_file(p: Path) -> bool:
-    if not p.exists():
-        return False
-    s = p.read_text(encoding="utf-8", errors="ignore")
-
+def normalize_eol(s: str) -> str:
     # 0) normalizo EOL para que los regex funcionen bien
-    s = s.replace("\r\n", "\n")
+    return s.replace("\r\n", "\n")
 
+def strip_base_script(s: str) -> str:
     # 1) eliminar inyección de <base> por JS si quedó
-    s = re.sub(
+    return PROFILER.sub(
+        "hardfix.base_script",
         r"<script>\s*\(function\(\)\s*\{.*?document\.head\.prepend\(base\);\s*\}\)\(\);\s*</script>\s*",
         "",
         s,
         flags=re.S
     )
 
+def fix_asset_paths(s: str) -> str:
     # 2) CSS: asegurar "css/ARCHIVO.css"
     css_pat = "|".join(map(re.escape, CSS_FILES))
 
     # /asefweb/ARCHIVO.css  o  /asefweb/css/ARCHIVO.css  -> css/ARCHIVO.css
-    s = re.sub(
+    s = PROFILER.sub(
+        "hardfix.css_asefweb",
         rf'href=["\']/?asefweb/(?:css/)?({css_pat})["\']',
         r'href="css/\1"',
         s, flags=re.I
     )
     # ARCHIVO.css suelto -> css/ARCHIVO.css (evitar duplicar si ya tiene css/)
-    s = re.sub(
+    s = PROFILER.sub(
+        "hardfix.css_bare",
         rf'href=["\'](?!css/)\b({css_pat})["\']',
         r'href="css/\1"',
         s, flags=re.I
@@ -55,26 +62,30 @@ def fix_file(p: Path) -> bool:
 
     # 3) JS propios: asegurar "js/ARCHIVO.js"
     js_pat = "|".join(map(re.escape, JS_FILES))
-    s = re.sub(
+    s = PROFILER.sub(
+        "hardfix.js_asefweb",
         rf'src=["\']/?asefweb/(?:js/)?({js_pat})["\']',
         r'src="js/\1"',
         s, flags=re.I
     )
-    s = re.sub(
+    s = PROFILER.sub(
+        "hardfix.js_bare",
         rf'src=["\'](?!js/)\b({js_pat})["\']',
         r'src="js/\1"',
         s, flags=re.I
     )
 
     # 4) Páginas internas: /asefweb/css/pages/...  o  /asefweb/pages/...  -> pages/...
-    s = re.sub(
+    s = PROFILER.sub(
+        "hardfix.pages",
         r'href=["\']/?asefweb/(?:css/)?pages/([^"\']+)["\']',
         r'href="pages/\1"',
         s, flags=re.I
     )
 
     # 5) Anclas con prefijos: /asefweb/css/#...  o  /asefweb/#...  -> #...
-    s = re.sub(
+    s = PROFILER.sub(
+        "hardfix.anchors",
         r'href=["\']/?asefweb/(?:css/)?#',
         'href="#',
         s, flags=re.I
@@ -83,37 +94,56 @@ def fix_file(p: Path) -> bool:
     # 6) Si quedó algún CSS sin carpeta por reemplazos raros: navigation.css, main.css, etc.
     # (este refuerzo ataca casos que escaparon a 2)
     for name in CSS_FILES:
-        s = re.sub(
+        s = PROFILER.sub(
+            "hardfix.css_reinforce",
             rf'href=["\']{re.escape(name)}["\']',
             f'href="css/{name}"', s, flags=re.I
         )
+    return s
 
+def fix_favicon(s: str) -> str:
     # 7) Normalizo favicon (opcional): data-URL problemático -> archivo
-    s = re.sub(
+    return PROFILER.sub(
+        "hardfix.favicon",
         r'<link[^>]+rel=["\']icon["\'][^>]*>',
         '<link rel="icon" href="favicon.svg">', s, flags=re.I
     )
 
-    p.write_text(s, encoding="utf-8")
-    return True
-
-def ensure_favicon():
-    fav = ROOT/"favicon.svg"
+def fix_file(p: Path) -> bool:
+    if not p.exists():
+        return False
+    original = OUTPUT.read_text(p, errors="ignore")
+    s = fix_favicon(fix_asset_paths(strip_base_script(normalize_eol(original))))
+    if "\r\n" in original:
+        # Los regex trabajan sobre LF; el archivo conserva sus CRLF
+        s = s.replace("\n", "\r\n")
+    # Sólo se escribe si cambió algo (antes se reescribía todo y Vite reconstruía)
+    return OUTPUT.write_text(p, s, original)
+
+def ensure_favicon(root=None):
+    fav = Path(root or ROOT)/"favicon.svg"
     if not fav.exists():
-        fav.write_text(
+        return OUTPUT.write_text(
+            fav,
             '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
             "<text y='.9em' font-size='90'>🏛️</text></svg>",
-            encoding="utf-8"
         )
+    return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Arreglo definitivo de rutas CSS/JS/páginas y favicon de ASEF.")
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_output.start(args, ROOT)
+
     fixed = 0
     for f in HTMLS:
         if fix_file(f):
             print(f"✅ Arreglado: {f.relative_to(ROOT)}")
             fixed += 1
-    ensure_favicon()
-    print(f"\n✔ Listo. Archivos procesados: {fixed}")
+    created = ensure_favicon()
+    print(f"\n✔ Listo. Archivos modificados: {fixed} de {len(HTMLS)}")
+    asef_output.finish(args, fixed + int(created))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+asef_pipeline.py — Pipeline único de reparación: una lectura y una escritura por archivo.
+
+Las reglas de los scripts sueltos (asef_repair_all, asef_fix_html_all,
+asef_fix_assets, asef_paths_hardfix, fix_base_paths, Py/fix_autocomplete,
+Py/sanitize_js) se declaran acá como objetos Rule:
+  - exts:  a qué archivos se aplica
+  - owns:  qué aspecto del documento define y con qué valor, p. ej.
+           {"favicon": "favicon.svg"} o {"base": "dynamic-snippet"}.
+           Dos reglas que definen el mismo aspecto con valores distintos se
+           deshacen entre sí: el pipeline se niega a correrlas juntas.
+  - after: reglas que, si están habilitadas, tienen que correr antes.
+
+Cada archivo se decodifica una vez, el texto pasa por todas las reglas
+habilitadas (orden topológico de `after`, desempatado por el orden del
+registro) y se escribe a lo sumo una vez. El resultado es determinístico:
+una segunda corrida no cambia nada.
+
+Uso:
+    python asef_pipeline.py                 # reglas por defecto
+    python asef_pipeline.py --list          # registro, aspectos y orden
+    python asef_pipeline.py --rules sanitize,repair_html -j 4
+    python asef_pipeline.py --dry-run cambios.patch   # diff, sin tocar el disco
+    python asef_pipeline.py --check                   # código 1 si algo cambiaría
+    python asef_pipeline.py --watch --dev             # junto a `npm run dev`: repara al guardar
+"""
+
+import argparse
+import importlib
+import importlib.util
+import sys
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import NamedTuple
+
+from asef_hints import forget_graph, site_graph
+from asef_manifest import Manifest, rules_hash
+from asef_output import OUTPUT
+import asef_output
+from asef_parallel import imap_files
+from asef_profile import PROFILER
+import asef_profile
+from asef_modgraph import JS_EXTS
+from asef_walk import walk_files
+from asef_watch import watch
+
+ROOT = Path(__file__).parent
+
+TOOL = "pipeline"
+
+
+class Rule(NamedTuple):
+    name: str
+    module: str             # "asef_x" o "Py/x" para los scripts de Py/
+    func: str               # función texto -> texto (ver `returns`)
+    exts: tuple = (".html",)
+    owns: dict = {}
+    after: tuple = ()
+    returns: str = "text"   # "text", "tuple" (texto, stats) u "optional" (None = sin cambios)
+    setup: str = ""         # función del módulo a llamar una vez por corrida, con la raíz
+    with_path: bool = False  # la función recibe también la ruta del archivo (texto, ruta) -> texto
+    version: str = ""       # función del módulo () -> str con el estado externo del que depende
+    doc: str = ""
+
+
+REGISTRY = [
+    Rule("eol", "asef_paths_hardfix", "normalize_eol",
+         owns={"eol": "lf"},
+         doc="CRLF -> LF"),
+    Rule("sanitize", "Py/sanitize_js", "clean_text", exts=(".js", ".html"),
+         owns={"invisibles": "strip"}, after=("eol",),
+         doc="'? .' -> '?.', caracteres invisibles, BOM y espacios finales"),
+    Rule("hardfix_base", "asef_paths_hardfix", "strip_base_script",
+         owns={"base": "none"}, after=("eol", "sanitize"),
+         doc="quita el <script> que inyecta <base>"),
+    Rule("base_paths", "fix_base_paths", "inject_base_text",
+         owns={"base": "inline-script"}, after=("eol", "sanitize"),
+         doc="<script> de <base> dinámico al inicio del <head>"),
+    Rule("repair_html", "asef_repair_all", "repair_html", returns="tuple", setup="ensure_favicon_file",
+         owns={"favicon": "favicon.svg+type", "urls": "relative", "script_type": "module"},
+         after=("eol", "sanitize"),
+         doc="href/src/onclick relativos, type=module y favicon.svg en una pasada"),
+    Rule("dynamic_base", "asef_repair_all", "repair_html_dev", returns="tuple",
+         owns={"base": "dynamic-snippet", "favicon": "favicon.svg+type", "urls": "relative",
+               "script_type": "module"},
+         after=("repair_html",),
+         doc="script de base dinámico tras <head>, sólo para `npm run dev` (--dev)"),
+    Rule("fix_html", "asef_fix_html_all", "fix_html", returns="optional",
+         owns={"base": "inline-script-min", "favicon": "data-url", "urls": "absolute",
+               "script_type": "module"},
+         after=("eol", "sanitize"),
+         doc="favicon data-URL, <script> de base, type=module y rutas /asefweb/"),
+    Rule("hardfix_paths", "asef_paths_hardfix", "fix_asset_paths",
+         owns={"urls": "relative"}, after=("repair_html", "hardfix_base"),
+         doc="css/ y js/ para los assets propios, pages/ y anclas sin /asefweb/"),
+    Rule("hardfix_favicon", "asef_paths_hardfix", "fix_favicon", setup="ensure_favicon",
+         owns={"favicon": "favicon.svg"}, after=("repair_html",),
+         doc='<link rel="icon" href="favicon.svg">'),
+    Rule("assets_roots", "asef_fix_assets", "fix_asset_roots",
+         owns={"urls": "relative"}, after=("repair_html", "hardfix_paths"),
+         doc="/css/, /js/, /asefweb/css/, /asefweb/js/ -> css/, js/"),
+    Rule("assets_favicon", "asef_fix_assets", "fix_data_favicon",
+         owns={"favicon": "data-url-raw"}, after=("fix_html",),
+         doc="favicons data-URL dañados en el <head> -> data-URL con el emoji"),
+    Rule("autocomplete", "Py/fix_autocomplete", "fix_text",
+         owns={"autocomplete": "heuristic"}, after=("repair_html", "fix_html"),
+         doc="autocomplete en inputs de contraseña, email y nombre"),
+    Rule("assets_hints", "asef_fix_assets", "add_resource_hints", with_path=True, version="hints_version",
+         owns={"hints": "module-graph"},
+         after=("repair_html", "dynamic_base", "fix_html", "base_paths", "hardfix_paths", "assets_roots"),
+         doc="modulepreload de la clausura de módulos y preconnect/dns-prefetch de los CDN en el <head>"),
+    Rule("assets_dedup", "asef_fix_assets", "dedup_meta",
+         owns={"dedup": "first"},
+         after=("repair_html", "dynamic_base", "fix_html", "base_paths", "hardfix_favicon", "assets_favicon",
+                "assets_hints"),
+         doc="favicon, <base>, charset, viewport y <title> duplicados en el <head> (gana el primero)"),
+    Rule("assets_cleanup", "asef_fix_assets", "strip_redundant",
+         owns={"blank_lines": "collapse"},
+         after=("repair_html", "dynamic_base", "fix_html", "base_paths", "autocomplete", "assets_dedup"),
+         doc="comentarios redundantes y líneas en blanco del <head>"),
+]
+
+RULES_BY_NAME = {r.name: r for r in REGISTRY}
+
+# Lo que corre el deploy: reglas compatibles entre sí (URLs relativas). El base dinámico
+# no va: GitHub Pages recibe build/pages, con las URLs ya resueltas (asef_targets)
+DEFAULT_RULES = ("sanitize", "repair_html", "hardfix_paths", "assets_roots", "autocomplete",
+                 "assets_hints", "assets_dedup", "assets_cleanup")
+
+
+# -------------------------------------------------------------------
+# Resolución de reglas
+# -------------------------------------------------------------------
+def _load_module(module: str):
+    if not module.startswith("Py/"):
+        return importlib.import_module(module)
+    name = module[3:]
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, ROOT / f"{module}.py")
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        spec.loader.exec_module(mod)
+    return sys.modules[name]
+
+
+def _text_func(rule: Rule):
+    func = getattr(_load_module(rule.module), rule.func)
+    if rule.with_path:
+        return func
+    if rule.returns == "tuple":
+        return lambda text: func(text)[0]
+    if rule.returns == "optional":
+        return lambda text: func(text) or text
+    return func
+
+
+def find_conflicts(rules: list) -> list:
+    """[(aspecto, regla_a, valor_a, regla_b, valor_b), ...] entre las reglas dadas."""
+    owner = {}
+    conflicts = []
+    for r in rules:
+        for aspect, value in r.owns.items():
+            if aspect in owner and owner[aspect][1] != value:
+                other, other_value = owner[aspect]
+                conflicts.append((aspect, other, other_value, r.name, value))
+            else:
+                owner.setdefault(aspect, (r.name, value))
+    return conflicts
+
+
+def order_rules(names) -> list:
+    """Orden topológico de `after` entre las reglas habilitadas (estable según REGISTRY)."""
+    unknown = [n for n in names if n not in RULES_BY_NAME]
+    if unknown:
+        raise ValueError(f"Reglas desconocidas: {', '.join(unknown)}")
+    enabled = [r for r in REGISTRY if r.name in set(names)]
+    pending = {r.name: {a for a in r.after if a in set(names)} for r in enabled}
+    ordered = []
+    while pending:
+        # La primera regla lista según el orden del registro
+        ready = next((r for r in enabled if r.name in pending and not pending[r.name]), None)
+        if ready is None:
+            raise ValueError(f"Ciclo en 'after' entre: {', '.join(sorted(pending))}")
+        del pending[ready.name]
+        for deps in pending.values():
+            deps.discard(ready.name)
+        ordered.append(ready)
+    return ordered
+
+
+@lru_cache(maxsize=None)
+def _resolved(names: tuple) -> list:
+    return [(r, _text_func(r)) for r in order_rules(names)]
+
+
+def pipeline_hash(rules: list) -> str:
+    """Versión del pipeline: nombres y orden de las reglas + fuente de sus módulos."""
+    sources = []
+    for module in sorted({r.module for r in rules}):
+        path = Path(_load_module(module).__file__)
+        sources.append(path.read_bytes())
+    external = [getattr(_load_module(r.module), r.version)() for r in rules if r.version]
+    return rules_hash([r.name for r in rules], *sources, *external)
+
+
+# -------------------------------------------------------------------
+# Ejecución
+# -------------------------------------------------------------------
+def apply_rules(text: str, path: str, names: tuple) -> tuple[str, list]:
+    """Pasa el texto por las reglas habilitadas que aplican a `path`; devuelve (texto, reglas que cambiaron algo)."""
+    touched = []
+    for rule, func in _resolved(names):
+        if not path.endswith(rule.exts):
+            continue
+        with PROFILER.rule(f"pipeline.{rule.name}", text):
+            new = func(text, path) if rule.with_path else func(text)
+        if new != text:
+            touched.append(rule.name)
+            text = new
+    return text, touched
+
+
+def process_file(path: Path, names: tuple, root: Path = ROOT) -> dict:
+    rel = path.relative_to(root).as_posix()
+    with PROFILER.file(rel):
+        with PROFILER.rule("io.read") as r:
+            data = path.read_bytes()
+            r.bytes = len(data)
+        try:
+            original = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # Bytes que no son UTF-8: no se toca (reescribir el texto decodificado a medias los perdería)
+            return {"file": rel, "changed": False, "rules": [], "invalid_utf8": e.start}
+        text, touched = apply_rules(original, rel, names)
+        changed = False
+        if text != original:
+            with PROFILER.rule("io.write", text):
+                changed = OUTPUT.write_bytes(path, text.encode("utf-8"), original=data)
+    return {"file": rel, "changed": changed, "rules": touched if changed else []}
+
+
+def watch_handler(names: tuple, root: Path = ROOT):
+    """
+    handle(path) para --watch. Con assets_hints, guardar un módulo descarta el
+    grafo memoizado; si cambiaron sus imports se vuelven a pasar las páginas
+    (sus hints dependen de la cascada) y las reescritas van en "also".
+    """
+    hints = any(r.name == "assets_hints" for r in order_rules(names))
+
+    def handle(path: Path) -> dict:
+        res = process_file(path, names, root)
+        if not hints or not path.name.endswith(JS_EXTS) or "invalid_utf8" in res:
+            return res
+        before = site_graph(root).imports(res["file"])
+        forget_graph(root)
+        if site_graph(root).imports(res["file"]) != before:
+            pages = walk_files(root, (".html",))
+            res["also"] = [p for p in pages if process_file(p, names, root)["changed"]]
+        return res
+
+    return handle
+
+
+def rule_exts(rules: list) -> tuple:
+    return tuple(sorted({e for r in rules for e in r.exts}))
+
+
+def run(root: Path, names: tuple, use_cache: bool = True, jobs: int = 1, include_dist: bool = False) -> tuple[list, int]:
+    rules = order_rules(names)
+    for r in rules:
+        if r.setup:
+            getattr(_load_module(r.module), r.setup)(root)
+
+    exts = rule_exts(rules)
+    files = walk_files(root, exts, allow=("dist",) if include_dist else ())
+    manifest = Manifest(root, enabled=use_cache)
+    version = pipeline_hash(rules)
+
+    cached = [manifest.lookup(f, TOOL, version) for f in files]
+    computed = imap_files(partial(process_file, names=tuple(names), root=root),
+                          [f for f, c in zip(files, cached) if c is None], jobs)
+    results = []
+    for f, hit in zip(files, cached):
+        if hit is not None:
+            results.append({"file": f.relative_to(root).as_posix(), **hit})
+            continue
+        res = next(computed)
+        results.append(res)
+        if not res["changed"] and "invalid_utf8" not in res:
+            manifest.store(f, TOOL, version, {"changed": False, "rules": []})
+    manifest.save()
+    return results, manifest.hits
+
+
+def print_registry():
+    print("Reglas registradas (* = por defecto):\n")
+    for r in REGISTRY:
+        mark = "*" if r.name in DEFAULT_RULES else " "
+        owns = ", ".join(f"{k}={v}" for k, v in r.owns.items())
+        print(f" {mark} {r.name:<16} {r.module}.{r.func}")
+        print(f"     {r.doc}")
+        print(f"     define: {owns}  |  extensiones: {' '.join(r.exts)}")
+        if r.after:
+            print(f"     después de: {', '.join(r.after)}")
+    print(f"\nOrden por defecto: {' → '.join(r.name for r in order_rules(DEFAULT_RULES))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline único de reparación ASEF (una lectura y una escritura por archivo).")
+    parser.add_argument("--rules", help="Reglas separadas por comas (por defecto: " + ",".join(DEFAULT_RULES) + ").")
+    parser.add_argument("--dev", action="store_true",
+                        help="Agrega la regla dynamic_base (script de <base> para servir las fuentes con `npm run dev`).")
+    parser.add_argument("--list", action="store_true", help="Muestra las reglas registradas y sale.")
+    parser.add_argument("--include-dist", action="store_true", help="Procesa también dist/.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora el manifiesto incremental y procesa todo.")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Procesos en paralelo (1 = serial).")
+    parser.add_argument("--watch", action="store_true",
+                        help="Después de la pasada inicial, repara cada archivo apenas se guarda (Ctrl+C para salir).")
+    parser.add_argument("--polling", action="store_true", help="Con --watch: fuerza polling en vez de inotify.")
+    asef_profile.add_arguments(parser)
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    if args.watch and args.check:
+        parser.error("--watch no se combina con --check")
+
+    if args.list:
+        print_registry()
+        return
+
+    names = tuple(n.strip() for n in args.rules.split(",")) if args.rules else DEFAULT_RULES
+    if args.dev and "dynamic_base" not in names:
+        names += ("dynamic_base",)
+    try:
+        rules = order_rules(names)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    conflicts = find_conflicts(rules)
+    if conflicts:
+        print("❌ Reglas incompatibles (se deshacen entre sí):")
+        for aspect, a, va, b, vb in conflicts:
+            print(f"  - {aspect}: {a} ({va}) vs {b} ({vb})")
+        sys.exit(2)
+
+    asef_profile.start(args)
+    asef_output.start(args, ROOT)
+    print(f"🔧 ASEF | Pipeline de reparación: {' → '.join(r.name for r in rules)}\n")
+    results, hits = run(ROOT, names, use_cache=not args.no_cache, jobs=args.jobs, include_dist=args.include_dist)
+
+    per_rule = {r.name: 0 for r in rules}
+    changed = 0
+    invalid = 0
+    for res in results:
+        if "invalid_utf8" in res:
+            invalid += 1
+            print(f"⚠️  {res['file']}: no es UTF-8 válido (byte {res['invalid_utf8']}), no se modificó")
+        elif res["changed"]:
+            changed += 1
+            for name in res["rules"]:
+                per_rule[name] += 1
+            print(f"✅ {res['file']}  ({', '.join(res['rules'])})")
+
+    print("\n===== RESUMEN ASEF PIPELINE =====")
+    print(f"Analizados : {len(results)}")
+    print(f"Modificados: {changed}")
+    print(f"En caché   : {hits}")
+    print(f"No UTF-8   : {invalid}")
+    for name, count in per_rule.items():
+        print(f"  {name:<16} {count}")
+
+    if args.watch:
+        print()
+        watch(ROOT, rule_exts(rules), watch_handler(names, ROOT),
+              allow=("dist",) if args.include_dist else (), polling=args.polling)
+    asef_profile.finish(args)
+    asef_output.finish(args, changed)
+
+
+if __name__ == "__main__":
+    main()
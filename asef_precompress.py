@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+asef_precompress.py — Etapa de build: variantes .gz y .br de los assets de texto.
+
+Para cada archivo de texto (HTML, CSS, JS, JSON, SVG, ...) de un árbol de salida
+(por defecto build/, o dist/ con --dir) que supere --min-bytes:
+  - X.gz con gzip nivel 9 (mtime=0: mismo contenido -> mismos bytes)
+  - X.br con brotli calidad 11, si el módulo `brotli` está instalado
+Una variante que no baja de --min-ratio del original no vale el costo de
+negociarla: no se escribe (y se borra si había quedado de antes).
+
+Es incremental: el manifiesto (asef_manifest, guardado en .asef_cache del
+proyecto, no en la salida) recuerda el hash de cada fuente y el resultado; si
+la fuente no cambió y las variantes siguen ahí, no se recomprime nada. Lo que
+falta se reparte en un pool de procesos (asef_parallel).
+
+asef_serve ya sirve estas variantes cuando el cliente las acepta.
+
+Uso:
+    python asef_precompress.py
+    python asef_precompress.py --dir dist --min-bytes 512 --min-ratio 0.85 -j 8
+"""
+
+import argparse
+import gzip
+import os
+import time
+from functools import partial
+from pathlib import Path
+
+from asef_manifest import MANIFEST_DIR, Manifest, hash_bytes, rules_hash
+from asef_output import atomic_write
+from asef_parallel import default_jobs, imap_files
+from asef_walk import walk_files
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).parent
+OUT_DIR = "build"
+
+TEXT_EXTS = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map", ".webmanifest")
+MIN_BYTES = 1024
+MIN_RATIO = 0.9
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+# (codificación, sufijo, compresor)
+VARIANTS = [("gzip", ".gz", _gzip)] + ([("br", ".br", _brotli)] if brotli is not None else [])
+ALL_SUFFIXES = (".gz", ".br")
+
+
+def compress_file(path: Path, min_bytes: int = MIN_BYTES, min_ratio: float = MIN_RATIO) -> dict:
+    """Escribe (si cambian) las variantes que valen la pena. Devuelve los tamaños."""
+    data = path.read_bytes()
+    res = {"raw": len(data), "gzip": None, "br": None}
+    for coding, suffix, compress in VARIANTS:
+        sibling = path.with_name(path.name + suffix)
+        packed = compress(data) if len(data) >= min_bytes else None
+        if packed is not None and len(packed) <= len(data) * min_ratio:
+            try:
+                same = sibling.read_bytes() == packed
+            except OSError:
+                same = False
+            if not same:
+                atomic_write(sibling, packed)
+            res[coding] = len(packed)
+        elif sibling.exists():
+            os.remove(sibling)
+    return res
+
+
+RULES = rules_hash(compress_file, _gzip, _brotli, GZIP_LEVEL, BROTLI_QUALITY, [v[0] for v in VARIANTS])
+TOOL = "precompress"
+
+
+def _variants_present(path: Path, res: dict) -> bool:
+    return all(path.with_name(path.name + suffix).exists() for coding, suffix, _ in VARIANTS if res.get(coding))
+
+
+def precompress(out: Path, min_bytes: int = MIN_BYTES, min_ratio: float = MIN_RATIO,
+                jobs: int = 1, use_cache: bool = True) -> dict:
+    t0 = time.perf_counter()
+    manifest = Manifest(out, enabled=use_cache,
+                        path=ROOT / MANIFEST_DIR / f"precompress-{hash_bytes(str(out.resolve()).encode('utf-8'))[:8]}.json")
+    version = f"{RULES}:{min_bytes}:{min_ratio}"
+    files = walk_files(out, TEXT_EXTS, gitignore=False)
+
+    cached = []
+    for f in files:
+        hit = manifest.lookup(f, TOOL, version)
+        cached.append(hit if hit is not None and _variants_present(f, hit) else None)
+    todo = [f for f, c in zip(files, cached) if c is None]
+    computed = imap_files(partial(compress_file, min_bytes=min_bytes, min_ratio=min_ratio), todo, jobs)
+
+    per_type = {}
+    for f, hit in zip(files, cached):
+        res = hit
+        if res is None:
+            res = next(computed)
+            manifest.store(f, TOOL, version, res)
+        ext = f.suffix.lower()
+        t = per_type.setdefault(ext, {"files": 0, "raw": 0, "gzip": 0, "br": 0})
+        t["files"] += 1
+        t["raw"] += res["raw"]
+        for coding in ("gzip", "br"):
+            if res.get(coding):
+                t[coding] += res["raw"] - res[coding]
+    manifest.save()
+
+    # Variantes huérfanas (su fuente ya no está)
+    removed = 0
+    for p in walk_files(out, ALL_SUFFIXES, gitignore=False):
+        if not p.with_name(p.name[:-3]).exists():
+            os.remove(p)
+            removed += 1
+
+    return {
+        "files": len(files),
+        "compressed": len(todo),
+        "cached": manifest.hits,
+        "removed": removed,
+        "per_type": per_type,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompresión .gz/.br de los assets de texto de un build ASEF.")
+    parser.add_argument("--dir", default=str(ROOT / OUT_DIR), help="Árbol de salida a comprimir (build/ o dist/).")
+    parser.add_argument("--min-bytes", type=int, default=MIN_BYTES, help="No comprime archivos más chicos que esto.")
+    parser.add_argument("--min-ratio", type=float, default=MIN_RATIO,
+                        help="La variante debe pesar como mucho esta fracción del original (0.9 = ahorra 10%%+).")
+    parser.add_argument("--jobs", "-j", type=int, default=default_jobs(), help="Procesos en paralelo.")
+    parser.add_argument("--no-cache", action="store_true", help="Recomprime todo (ignora el manifiesto).")
+    args = parser.parse_args()
+
+    out = Path(args.dir)
+    codings = " + ".join(v[0] for v in VARIANTS)
+    print(f"🗜  ASEF | Precompresión ({codings}) → {out}")
+    if brotli is None:
+        print("ℹ️  Módulo 'brotli' no instalado: sólo gzip (pip install brotli).")
+    stats = precompress(out, args.min_bytes, args.min_ratio, jobs=args.jobs, use_cache=not args.no_cache)
+
+    print(f"\n{'tipo':<8} {'archivos':>8} {'KB':>10} {'-gzip KB':>10} {'-br KB':>10}")
+    total = {"raw": 0, "gzip": 0, "br": 0}
+    for ext, t in sorted(stats["per_type"].items()):
+        print(f"{ext:<8} {t['files']:>8} {t['raw'] / 1024:>10.1f} {t['gzip'] / 1024:>10.1f} {t['br'] / 1024:>10.1f}")
+        for k in total:
+            total[k] += t[k]
+
+    print("\n===== RESUMEN ASEF PRECOMPRESS =====")
+    print(f"Archivos de texto : {stats['files']}")
+    print(f"Comprimidos ahora : {stats['compressed']}")
+    print(f"Sin cambios       : {stats['cached']}")
+    print(f"Huérfanos borrados: {stats['removed']}")
+    print(f"Ahorro gzip       : {total['gzip'] / 1024:.1f} KB de {total['raw'] / 1024:.1f} KB")
+    if brotli is not None:
+        print(f"Ahorro brotli     : {total['br'] / 1024:.1f} KB")
+    print(f"Tiempo            : {stats['elapsed_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+asef_profile.py — Instrumentación por regla para los scripts de reparación.
+
+Todas las reglas reportan a través de PROFILER:
+  - PROFILER.sub(nombre, patrón, repl, texto)  -> re.sub medido
+  - with PROFILER.rule(nombre, texto) as r:    -> bloque medido (r.matches / r.replacements)
+  - PROFILER.count(nombre, matches, replacements) -> sólo contadores (sub-reglas de una pasada)
+  - with PROFILER.file(ruta):                  -> atribuye lo medido a ese archivo
+
+Por regla y por archivo se acumula: llamadas, tiempo de pared, bytes escaneados,
+coincidencias y reemplazos efectivos. Deshabilitado (lo normal) el costo es un if.
+
+Con --profile out.json los scripts escriben un reporte agregado que indica qué
+regla domina la corrida; --profile-mode cprofile|memory agrega además las
+funciones más costosas (cProfile) o las líneas que más memoria reservan (tracemalloc).
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILE_MODES = ("basic", "cprofile", "memory")
+
+
+def _compile(pattern, flags=0):
+    return pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, flags)
+
+
+class _Counter:
+    __slots__ = ("matches", "replacements", "bytes")
+
+    def __init__(self):
+        self.matches = 0
+        self.replacements = 0
+        self.bytes = None         # si se asigna, reemplaza len(texto) (p. ej. en lecturas)
+
+
+def _empty() -> dict:
+    return {"calls": 0, "wall_s": 0.0, "bytes": 0, "matches": 0, "replacements": 0}
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.mode = "basic"
+        self.rules = {}
+        self.files = {}
+        self.current_file = None
+        self._cprofile = None
+        self._started = None
+
+    # ---------------------------------------------------------------
+    # Activación
+    # ---------------------------------------------------------------
+    def enable(self, mode: str = "basic"):
+        self.enabled = True
+        self.mode = mode
+        self._started = time.perf_counter()
+        if mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif mode == "memory":
+            tracemalloc.start(10)
+
+    # ---------------------------------------------------------------
+    # Registro
+    # ---------------------------------------------------------------
+    def _record(self, name: str, wall: float, size: int, matches: int, replacements: int, calls: int = 1):
+        buckets = [self.rules.setdefault(name, _empty())]
+        if self.current_file is not None:
+            buckets.append(self.files.setdefault(self.current_file, {}).setdefault(name, _empty()))
+        for b in buckets:
+            b["calls"] += calls
+            b["wall_s"] += wall
+            b["bytes"] += size
+            b["matches"] += matches
+            b["replacements"] += replacements
+
+    @contextlib.contextmanager
+    def file(self, path):
+        previous = self.current_file
+        self.current_file = str(path) if self.enabled else None
+        try:
+            yield
+        finally:
+            self.current_file = previous
+
+    @contextlib.contextmanager
+    def rule(self, name: str, text=""):
+        counter = _Counter()
+        if not self.enabled:
+            yield counter
+            return
+        t0 = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            size = len(text) if counter.bytes is None else counter.bytes
+            self._record(name, time.perf_counter() - t0, size, counter.matches, counter.replacements)
+
+    def count(self, name: str, matches: int, replacements: int = 0):
+        if self.enabled:
+            self._record(name, 0.0, 0, matches, replacements, calls=0)
+
+    def sub(self, name: str, pattern, repl, text: str, count: int = 0, flags: int = 0) -> str:
+        """re.sub medido: cuenta coincidencias y reemplazos que cambian el texto."""
+        rx = _compile(pattern, flags)
+        if not self.enabled:
+            return rx.sub(repl, text, count)
+
+        counter = _Counter()
+
+        def _repl(m):
+            counter.matches += 1
+            out = repl(m) if callable(repl) else m.expand(repl)
+            if out != m.group(0):
+                counter.replacements += 1
+            return out
+
+        t0 = time.perf_counter()
+        result = rx.sub(_repl, text, count)
+        self._record(name, time.perf_counter() - t0, len(text), counter.matches, counter.replacements)
+        return result
+
+    # ---------------------------------------------------------------
+    # Reporte
+    # ---------------------------------------------------------------
+    def report(self, top: int = 25) -> dict:
+        total_wall = sum(r["wall_s"] for r in self.rules.values()) or 1e-12
+        rules = {}
+        for name, r in sorted(self.rules.items(), key=lambda kv: -kv[1]["wall_s"]):
+            rules[name] = {
+                **r,
+                "wall_s": round(r["wall_s"], 6),
+                "share": round(r["wall_s"] / total_wall, 4),
+                "mb_per_s": round(r["bytes"] / (1024 * 1024) / r["wall_s"], 3) if r["wall_s"] else None,
+            }
+        report = {
+            "mode": self.mode,
+            "elapsed_s": round(time.perf_counter() - self._started, 6) if self._started else None,
+            "dominant_rule": next(iter(rules), None),
+            "rules": rules,
+            "files": {
+                f: {n: {**r, "wall_s": round(r["wall_s"], 6)} for n, r in per.items()}
+                for f, per in sorted(self.files.items())
+            },
+        }
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            buf = io.StringIO()
+            stats = pstats.Stats(self._cprofile, stream=buf).sort_stats("cumulative")
+            report["cprofile"] = [
+                {"function": f"{fn[0]}:{fn[1]}({fn[2]})", "calls": st[1], "tottime_s": round(st[2], 6),
+                 "cumtime_s": round(st[3], 6)}
+                for fn, st in sorted(stats.stats.items(), key=lambda kv: -kv[1][3])[:top]
+            ]
+        if self.mode == "memory" and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report["memory"] = {
+                "peak_kb": round(peak / 1024, 1),
+                "top": [
+                    {"where": str(s.traceback), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                    for s in snapshot.statistics("lineno")[:top]
+                ],
+            }
+        return report
+
+    def write(self, path) -> dict:
+        report = self.report()
+        Path(path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        return report
+
+
+PROFILER = Profiler()
+
+
+# -------------------------------------------------------------------
+# Integración con argparse (mismo flag en todos los scripts)
+# -------------------------------------------------------------------
+def add_arguments(parser):
+    parser.add_argument("--profile", metavar="OUT.json", help="Mide cada regla y escribe un reporte agregado.")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default="basic",
+                        help="basic (tiempos/contadores), cprofile o memory (tracemalloc).")
+
+
+def start(args):
+    if getattr(args, "profile", None):
+        PROFILER.enable(args.profile_mode)
+        # Los workers de un pool no reportan al proceso principal
+        if getattr(args, "jobs", 1) > 1:
+            print("ℹ️  --profile fuerza --jobs 1 para poder medir cada regla.")
+            args.jobs = 1
+
+
+def finish(args):
+    if not getattr(args, "profile", None):
+        return
+    report = PROFILER.write(args.profile)
+    print(f"\n📊 Perfil por regla (→ {args.profile})")
+    print(f"{'regla':<34} {'ms':>9} {'%':>6} {'KB':>9} {'match':>7} {'repl':>7}")
+    for name, r in list(report["rules"].items())[:15]:
+        print(f"{name:<34} {r['wall_s'] * 1000:>9.2f} {r['share'] * 100:>5.1f}% "
+              f"{r['bytes'] / 1024:>9.1f} {r['matches']:>7} {r['replacements']:>7}")
+    if report["dominant_rule"]:
+        print(f"Regla dominante: {report['dominant_rule']}")
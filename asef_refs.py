@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+asef_refs.py — Índice de referencias del sitio, con posiciones y caché por hash.
+
+Para cada HTML, CSS y JS publicable guarda qué URLs locales aparecen y DÓNDE
+(inicio/fin exacto de la URL en el texto), ya resueltas a una ruta del sitio:
+  - HTML: href/src/poster/srcset, onclick(location.href), url() en <style> y style="..."
+  - CSS : url() y @import
+  - JS  : especificadores de import/export ... from '...', import '...', import('...')
+          (sólo relativos o absolutos: los especificadores "pelados" no son archivos)
+
+Con las posiciones, cualquier etapa (fingerprint, budgets, grafo de módulos)
+puede reescribir o medir sin volver a parsear. El índice se guarda en
+.asef_cache/refs.json y cada archivo se re-extrae sólo si cambió su contenido
+(size/mtime y, si hace falta, hash) o la versión de los extractores.
+
+    from asef_refs import RefIndex
+    index = RefIndex(ROOT).update()
+    for ref in index.refs("index.html"):
+        print(ref.url, "->", ref.target)
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from asef_html import iter_tags
+from asef_link_graph import (PUBLIC_DIRS, RE_CSS_IMPORT, RE_CSS_URL, RE_ONCLICK_LOC,
+                             is_external, resolve)
+from asef_manifest import MANIFEST_DIR, hash_bytes, rules_hash
+from asef_targets import is_dynamic_base
+from asef_walk import site_files
+
+REFS_NAME = "refs.json"
+SOURCE_EXTS = (".html", ".css", ".js", ".mjs")
+
+# import x from './a.js' · export * from "./b.js" · import './c.js' · import('./d.js')
+# (un literal seguido de 'from' o 'import', sin retroceso: lineal)
+RE_JS_IMPORT = re.compile(r"""\b(?:from|import)\s*\(?\s*(['"])([^'"\n]*)\1""")
+RE_REF_HINT = re.compile(r"(?:href|src|poster|srcset|onclick|style)\s*=", re.IGNORECASE)
+
+
+class Ref(NamedTuple):
+    kind: str        # href, src, srcset, onclick, url, import, module, dynamic (import())
+    url: str         # URL tal como está escrita
+    start: int       # posición de la URL en el texto (str)
+    end: int
+    target: str      # ruta del sitio resuelta (posix) o None si es externa/plantilla
+
+
+# -------------------------------------------------------------------
+# Extracción
+# -------------------------------------------------------------------
+def _css_refs(css: str, offset: int = 0, end: int = None) -> list:
+    end = len(css) if end is None else end
+    refs = []
+    for rx, kind in ((RE_CSS_URL, "url"), (RE_CSS_IMPORT, "import")):
+        for m in rx.finditer(css, offset, end):
+            start, stop = m.span(2)
+            # url( a.png ) -> sin espacios alrededor
+            raw = m.group(2)
+            start += len(raw) - len(raw.lstrip())
+            stop -= len(raw) - len(raw.rstrip())
+            refs.append((kind, css[start:stop], start, stop))
+    return refs
+
+
+def _srcset_refs(value: str, base: int) -> list:
+    """Cada candidato de srcset ('a.webp 480w, b.webp 960w') con su posición."""
+    refs = []
+    pos = 0
+    for part in value.split(","):
+        stripped = part.lstrip()
+        url = stripped.split(None, 1)[0] if stripped.strip() else ""
+        if url:
+            start = base + pos + (len(part) - len(stripped))
+            refs.append(("srcset", url, start, start + len(url)))
+        pos += len(part) + 1
+    return refs
+
+
+def extract_html(html: str) -> tuple[list, bool]:
+    """([(tipo, url, inicio, fin), ...], usa_base) de un documento HTML."""
+    refs = []
+    has_base = False
+    for tag in iter_tags(html, names=("base", "script", "style"), hint=RE_REF_HINT):
+        if tag.name == "base":
+            has_base = True
+            continue
+        if tag.name == "script" and is_dynamic_base(tag):
+            has_base = True
+        if tag.name == "style":
+            refs += _css_refs(html, tag.end, tag.raw_end)
+        for a in tag.attrs:
+            if a.name in ("href", "src", "poster"):
+                raw = a.value
+                lead = len(raw) - len(raw.lstrip())
+                refs.append((a.name, raw.strip(), a.start + lead, a.start + lead + len(raw.strip())))
+            elif a.name == "srcset":
+                refs += _srcset_refs(a.value, a.start)
+            elif a.name == "onclick":
+                refs += [("onclick", m.group(2), a.start + m.start(2), a.start + m.end(2))
+                         for m in RE_ONCLICK_LOC.finditer(a.value)]
+            elif a.name == "style" and "url(" in a.value:
+                refs += [(k, u, a.start + s, a.start + e) for k, u, s, e in _css_refs(a.value)]
+    return refs, has_base
+
+
+def extract_js(js: str) -> list:
+    refs = []
+    for m in RE_JS_IMPORT.finditer(js):
+        spec = m.group(2)
+        # Especificador "pelado" (firebase/app): lo resuelve el bundler o un import map
+        if spec.startswith(("./", "../", "/")):
+            kind = "dynamic" if "(" in m.group(0) else "module"
+            refs.append((kind, spec, m.start(2), m.end(2)))
+    return refs
+
+
+def extract(rel: str, text: str) -> tuple[list, bool]:
+    """Referencias de un archivo del sitio, resueltas. Devuelve ([Ref, ...], usa_base)."""
+    if rel.endswith(".html"):
+        raw, has_base = extract_html(text)
+    elif rel.endswith(".css"):
+        raw, has_base = _css_refs(text), False
+    else:
+        raw, has_base = extract_js(text), False
+    refs = []
+    for kind, url, start, end in raw:
+        target = None if is_external(url) else resolve(url, rel, has_base and kind not in ("module", "dynamic"))
+        refs.append(Ref(kind, url, start, end, target))
+    return refs, has_base
+
+
+EXTRACTORS = rules_hash(extract, extract_html, is_dynamic_base, extract_js, _css_refs, _srcset_refs, resolve,
+                        RE_JS_IMPORT, RE_CSS_URL, RE_CSS_IMPORT, RE_ONCLICK_LOC, RE_REF_HINT)
+
+
+# -------------------------------------------------------------------
+# Índice con caché
+# -------------------------------------------------------------------
+class RefIndex:
+    """
+    files: ruta del sitio -> ruta en disco (public/ se publica en la raíz).
+    entries: ruta del sitio -> {"hash", "size", "mtime_ns", "base", "refs"} (sólo HTML/CSS/JS).
+    """
+
+    def __init__(self, root, use_cache: bool = True):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_DIR / REFS_NAME
+        self.use_cache = use_cache
+        self.files = {}
+        self.entries = {}
+        self.hits = 0
+        self.dirty = False
+
+    def _load(self) -> dict:
+        if not self.use_cache:
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if data.get("extractors") == EXTRACTORS else {}
+
+    def update(self):
+        """Re-indexa el árbol; sólo se re-leen los archivos que cambiaron."""
+        cached = self._load()
+        self.files = {}
+        for p in site_files(self.root):
+            rel = p.relative_to(self.root).as_posix()
+            top, _, rest = rel.partition("/")
+            self.files[rest if top in PUBLIC_DIRS and rest else rel] = p
+        self.entries = {}
+        for rel, p in self.files.items():
+            if not rel.endswith(SOURCE_EXTS):
+                continue
+            st = os.stat(p)
+            e = cached.get(rel)
+            if e and e["size"] == st.st_size and e["mtime_ns"] == st.st_mtime_ns:
+                self.hits += 1
+                self.entries[rel] = e
+                continue
+            data = p.read_bytes()
+            digest = hash_bytes(data)
+            if e and e["hash"] == digest:
+                self.hits += 1
+            else:
+                refs, has_base = extract(rel, data.decode("utf-8", errors="replace"))
+                e = {"hash": digest, "base": has_base, "refs": [list(r) for r in refs]}
+            e = {**e, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            self.entries[rel] = e
+            self.dirty = True
+        if len(self.entries) != len(cached):
+            self.dirty = True
+        self.save()
+        return self
+
+    def save(self):
+        if not (self.use_cache and self.dirty):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"extractors": EXTRACTORS, "files": self.entries}, ensure_ascii=False),
+                       encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def refs(self, rel: str) -> list:
+        e = self.entries.get(rel)
+        return [Ref(*r) for r in e["refs"]] if e else []
+
+    def local_refs(self, rel: str) -> list:
+        """Referencias de `rel` a archivos que existen en el sitio."""
+        return [r for r in self.refs(rel) if r.target in self.files]
+
+    def hash(self, rel: str) -> str:
+        """Hash del contenido (HTML/CSS/JS desde el índice; el resto se lee)."""
+        e = self.entries.get(rel)
+        return e["hash"] if e else hash_bytes(self.files[rel].read_bytes())
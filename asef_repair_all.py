@@ -1,18 +1,26 @@
 import re
 import os
+import argparse
+from functools import partial
 from pathlib import Path
 
+from asef_html import iter_tags, line_ending, parse_attrs, RE_TOKEN
+from asef_manifest import Manifest, rules_hash
+from asef_output import OUTPUT
+import asef_output
+from asef_parallel import imap_files
+from asef_profile import PROFILER
+import asef_profile
+from asef_walk import walk_files
+
 ROOT = Path(r"C:\asefweb")
 
-# Archivos HTML a procesar
-HTML_GLOBS = [
-    "*.html",
-    "dist/*.html",
-    "pages/*.html",
-    "pages/**/*.html",
-]
+# Archivos HTML a procesar: todo el árbol propio (ver asef_walk) más el bundle de dist/
+HTML_EXTS = (".html",)
+HTML_ALLOW = ("dist",)
 
-# Inserta <base> dinámico solo una vez
+# <base> dinámico para desarrollo local (npm run dev): el deploy publica build/pages,
+# donde asef_targets resuelve las URLs y quita este script (ver repair_html_dev)
 DYNAMIC_BASE_SNIPPET = r"""<script id="asef-dynamic-base">
 (function () {
   try {
@@ -36,13 +44,17 @@ EXTERNAL_PREFIXES = ("http://", "https://", "mailto:", "tel:", "whatsapp:", "fax
 RE_BASE_TAG = re.compile(r"<base\b[^>]*>", re.IGNORECASE)
 RE_HEAD_OPEN = re.compile(r"<head[^>]*>", re.IGNORECASE)
 
-# src/href con comillas simples o dobles
+# Cota de tiempo (ver asef_fuzz.py): todas las regex de este bloque son O(n).
+# Cada valor entre comillas es una clase negada que no retrocede y, si la comilla
+# no cierra, la coincidencia se extiende hasta el fin del documento en lugar de
+# fallar (igual que asef_html y el navegador), así ningún tramo se re-escanea.
+
+# src/href con comillas simples o dobles (close vacío = comilla sin cerrar)
 RE_ATTR = re.compile(
     r"""(?P<attr>\b(?:href|src)\s*=\s*)
-        (?P<quote>['"])
-        (?P<url>.*?)
-        (?P=quote)""",
-    re.IGNORECASE | re.VERBOSE | re.DOTALL
+        (?:"(?P<dq>[^"]*)|'(?P<sq>[^']*))
+        (?P<close>['"]?)""",
+    re.IGNORECASE | re.VERBOSE
 )
 
 # onclick="location.href='...'"
@@ -57,11 +69,8 @@ RE_ONCLICK_LOC = re.compile(
 # <link rel="icon" ...> (data-urls, duplicados)
 RE_FAVICON = re.compile(r"""<link[^>]+rel\s*=\s*["']icon["'][^>]*>""", re.IGNORECASE)
 
-# <script ... src="*.js"> sin type=module para locales
-RE_SCRIPT_TAG = re.compile(
-    r"""<script\b(?![^>]*type=)["'\s\w=/-]*\bsrc\s*=\s*(['"])(?P<src>[^'"]+\.js)\1[^>]*>""",
-    re.IGNORECASE
-)
+# <script ...> completo (o hasta el fin si no cierra); src/type se leen con parse_attrs
+RE_SCRIPT_TAG = re.compile(r"""<script\b(?P<attrs>[^>]*)(?P<close>>?)""", re.IGNORECASE)
 
 def is_external(url: str) -> bool:
     return url.startswith(EXTERNAL_PREFIXES)
@@ -107,7 +116,10 @@ def fix_attrs(html: str) -> tuple[str, dict]:
 
     # Corrige href/src
     def _attr_repl(m: re.Match) -> str:
-        attr, quote, url = m.group("attr"), m.group("quote"), m.group("url").strip()
+        if not m.group("close"):
+            return m.group(0)
+        quote = m.group("close")
+        attr, url = m.group("attr"), (m.group("dq") if quote == '"' else m.group("sq")).strip()
         low = attr.lower()
         orig = url
 
@@ -122,7 +134,7 @@ def fix_attrs(html: str) -> tuple[str, dict]:
                 stats["src_fixed"] += 1
         return f"{attr}{quote}{new}{quote}"
 
-    html = RE_ATTR.sub(_attr_repl, html)
+    html = PROFILER.sub("fix_attrs.href_src", RE_ATTR, _attr_repl, html)
 
     # Corrige location.href en onclick
     def _onclick_repl(m: re.Match) -> str:
@@ -134,28 +146,31 @@ def fix_attrs(html: str) -> tuple[str, dict]:
             stats["onclick_loc_fixed"] += 1
         return f"{prefix}{quote}{new}{quote}"
 
-    html = RE_ONCLICK_LOC.sub(_onclick_repl, html)
+    html = PROFILER.sub("fix_attrs.onclick", RE_ONCLICK_LOC, _onclick_repl, html)
 
     # Asegura type="module" en scripts locales .js
     def _script_repl(s: re.Match) -> str:
         full = s.group(0)
-        src = s.group("src")
-        if is_external(src):
+        if not s.group("close"):
+            return full
+        attrs = {a.name: a for a in parse_attrs(s.string, s.start("attrs"), s.end("attrs"))}
+        src = attrs.get("src")
+        if src is None or src.quote == "" or not src.value.endswith(".js") or is_external(src.value):
             return full
         # Ya tiene type?
-        if re.search(r'\btype\s*=\s*["\']module["\']', full, re.IGNORECASE):
+        if "type" in attrs:
             return full
         stats["type_module_added"] += 1
         return full.replace("<script", '<script type="module"', 1)
 
-    html = RE_SCRIPT_TAG.sub(_script_repl, html)
+    html = PROFILER.sub("fix_attrs.type_module", RE_SCRIPT_TAG, _script_repl, html)
 
     return html, stats
 
 def ensure_dynamic_base(html: str) -> tuple[str, bool]:
     # Elimina cualquier <base> existente
     before = html
-    html = RE_BASE_TAG.sub("", html)
+    html = PROFILER.sub("dynamic_base.remove", RE_BASE_TAG, "", html)
     removed = before != html
 
     # Inserta nuestro snippet tras <head>
@@ -171,7 +186,7 @@ def ensure_dynamic_base(html: str) -> tuple[str, bool]:
 def ensure_favicon(html: str) -> tuple[str, bool]:
     # Borra favicons previos y deja un único link limpio
     before = html
-    html = RE_FAVICON.sub("", html)
+    html = PROFILER.sub("favicon.remove", RE_FAVICON, "", html)
     # Inserta nuestro favicon justo antes del primer <link rel="stylesheet"> o luego de <meta charset> si no hay CSS
     insert_after = re.search(r'<link[^>]+rel=["\']stylesheet["\']', html, re.IGNORECASE)
     if insert_after:
@@ -192,70 +207,241 @@ def ensure_favicon(html: str) -> tuple[str, bool]:
         html = html[:pos] + "\n" + FAVICON_LINK + "\n" + html[pos:]
     return html, True
 
-def process_html_file(path: Path) -> dict:
-    s = path.read_text(encoding="utf-8", errors="ignore")
-    original = s
-
-    # 1) base dinámico
-    s, removed_any = ensure_dynamic_base(s)
-
-    # 2) normalizar href/src/onclick
-    s, stats = fix_attrs(s)
+# Etiquetas que pueden necesitar cambios en atributos (búsqueda acotada a la etiqueta,
+# antes de parsear): un valor que empieza con '/', './', 'asefweb/' o con espacios, o
+# uno entre comillas que termina con espacios. Cubre también los location.href='...'
+# de los onclick (su URL va justo después de un '='). Es un superconjunto de lo que
+# repair_html edita: las etiquetas con URLs ya normalizadas (casi todas, después de
+# la primera corrida) no se parsean nunca. Todas las ramas empiezan con '=': el motor
+# de re salta directo entre los '=' del documento en vez de probar cada posición.
+RE_URL_ATTR_HINT = re.compile(r"""=\s*(?:["']?(?:\.?/|asefweb/)|["'](?:\s|[^"']*\s["']))""", re.IGNORECASE)
+RE_ICON_HINT = re.compile(r"icon", re.IGNORECASE)
+
+# location.href='...' dentro del valor de un onclick
+RE_ONCLICK_VALUE = re.compile(r"""(?P<prefix>\blocation\.href\s*=\s*)(?P<quote>['"])(?P<url>[^'"]*)(?P=quote)""", re.IGNORECASE)
+
+def _fix_onclick_value(value: str, stats: dict) -> str:
+    def _repl(m: re.Match) -> str:
+        url = m.group("url")
+        if is_external(url) or url.startswith("#"):
+            return m.group(0)
+        new = normalize_internal(url)
+        if new != url:
+            stats["onclick_loc_fixed"] += 1
+        return f"{m.group('prefix')}{m.group('quote')}{new}{m.group('quote')}"
+    return RE_ONCLICK_VALUE.sub(_repl, value)
 
-    # 3) favicon limpio
-    s, _ = ensure_favicon(s)
+def repair_html(html: str, dynamic_base: bool = False) -> tuple[str, dict]:
+    """
+    Motor de una sola pasada: equivale a ensure_dynamic_base + fix_attrs + ensure_favicon
+    pero visita cada etiqueta una única vez y arma la salida en un solo buffer.
+      - <base> existentes se eliminan
+      - href/src/onclick(location.href) se normalizan con normalize_internal
+      - <script src="*.js"> locales sin type reciben type="module"
+      - <link rel="icon"> se eliminan (con su línea si estaba sola) y se deja uno solo tras <head>
+      - con dynamic_base, el snippet de base dinámico se inserta tras <head> si no
+        existe (sólo para desarrollo local; uno que ya esté no se toca)
+    A diferencia de la versión multi-pasada, no toca texto dentro de <script>/<style>
+    y es idempotente (una segunda corrida no agrega líneas en blanco).
+    """
+    stats = {
+        "href_fixed": 0,
+        "src_fixed": 0,
+        "onclick_loc_fixed": 0,
+        "type_module_added": 0,
+        "base_removed": False,
+    }
+    out = []
+    last = 0
+    head_slot = -1
+    has_base_snippet = False
+
+    for tag in iter_tags(html, names=("base", "head", "link", "script"), hint=RE_URL_ATTR_HINT):
+        name = tag.name
+
+        if name == "base":
+            out.append(html[last:tag.start])
+            last = tag.end
+            stats["base_removed"] = True
+            continue
+
+        if name == "link" and tag.mentions(RE_ICON_HINT) and (tag.get("rel") or "").strip().lower() == "icon":
+            # Quita la línea entera si la etiqueta estaba sola en ella
+            line_start = html.rfind("\n", 0, tag.start) + 1
+            cut_end = tag.end
+            if line_start >= last and not html[line_start:tag.start].strip():
+                cut_start = line_start
+                if html.startswith("\r\n", cut_end):
+                    cut_end += 2
+                elif html.startswith("\n", cut_end):
+                    cut_end += 1
+            else:
+                cut_start = tag.start
+            out.append(html[last:cut_start])
+            last = cut_end
+            continue
+
+        if name == "script" and not has_base_snippet:
+            if (tag.get("id") or "").startswith("asef-dynamic-base") or \
+                    html.find("asef-dynamic-base", tag.end, tag.raw_end) >= 0:
+                has_base_snippet = True
+
+        edits = []
+        for a in tag.attrs if tag.mentions(RE_URL_ATTR_HINT) else ():
+            if a.name in ("href", "src"):
+                url = a.value.strip()
+                if is_external(url) or url.startswith("#"):
+                    continue
+                new = normalize_internal(url)
+                if new != url:
+                    stats["href_fixed" if a.name == "href" else "src_fixed"] += 1
+                if new != a.value:
+                    edits.append((a.start, a.end, new))
+            elif a.name == "onclick" and "location" in a.value:
+                new = _fix_onclick_value(a.value, stats)
+                if new != a.value:
+                    edits.append((a.start, a.end, new))
+
+        if name == "script" and not tag.has("type"):
+            src = normalize_internal((tag.get("src") or "").strip())
+            if src.endswith(".js") and not is_external(src):
+                stats["type_module_added"] += 1
+                edits.insert(0, (tag.start + 7, tag.start + 7, ' type="module"'))
+
+        for start, end, new in edits:
+            out.append(html[last:start])
+            out.append(new)
+            last = end
+
+        if name == "head" and head_slot < 0:
+            out.append(html[last:tag.end])
+            last = tag.end
+            head_slot = len(out)
+            out.append("")
+
+    if head_slot >= 0:
+        inject = "\n" + FAVICON_LINK
+        if dynamic_base and not has_base_snippet:
+            inject += "\n\n" + DYNAMIC_BASE_SNIPPET
+        out[head_slot] = inject.replace("\n", line_ending(html))
+    elif not out:
+        return html, stats
+
+    out.append(html[last:])
+    return "".join(out), stats
+
+def repair_html_dev(html: str) -> tuple[str, dict]:
+    """repair_html + snippet de base dinámico: para servir las fuentes con `npm run dev`."""
+    return repair_html(html, dynamic_base=True)
+
+# Versión de las reglas para el manifiesto incremental: cambia si cambia cualquiera de ellas
+TOOL = "repair_all"
+RULES = rules_hash(
+    repair_html, repair_html_dev, _fix_onclick_value, normalize_internal, is_external,
+    iter_tags, line_ending, parse_attrs, RE_TOKEN, RE_ONCLICK_VALUE, RE_URL_ATTR_HINT, RE_ICON_HINT,
+    DYNAMIC_BASE_SNIPPET, FAVICON_LINK, EXTERNAL_PREFIXES,
+)
 
-    changed = s != original
-    if changed:
-        path.write_text(s, encoding="utf-8")
+# Resultado de volver a procesar un archivo ya reparado (repair_html es idempotente)
+CLEAN_RESULT = {
+    "changed": False,
+    "href_fixed": 0,
+    "src_fixed": 0,
+    "onclick_loc_fixed": 0,
+    "type_module_added": 0,
+    "base_removed": False,
+}
+
+def process_html_file(path: Path, dynamic_base: bool = False) -> dict:
+    with PROFILER.file(path.relative_to(ROOT)):
+        with PROFILER.rule("io.read") as r:
+            s = OUTPUT.read_text(path, errors="ignore")
+            r.bytes = len(s)
+        original = s
+
+        # href/src/onclick + type=module + favicon (+ base dinámico) en una sola pasada
+        with PROFILER.rule("repair_html", s) as r:
+            s, stats = repair_html(s, dynamic_base)
+            r.replacements = (stats["href_fixed"] + stats["src_fixed"] + stats["onclick_loc_fixed"]
+                              + stats["type_module_added"] + int(stats["base_removed"]))
+        PROFILER.count("repair_html.href", stats["href_fixed"], stats["href_fixed"])
+        PROFILER.count("repair_html.src", stats["src_fixed"], stats["src_fixed"])
+        PROFILER.count("repair_html.onclick", stats["onclick_loc_fixed"], stats["onclick_loc_fixed"])
+        PROFILER.count("repair_html.type_module", stats["type_module_added"], stats["type_module_added"])
+        PROFILER.count("repair_html.base_removed", int(stats["base_removed"]), int(stats["base_removed"]))
+
+        changed = False
+        if s != original:
+            with PROFILER.rule("io.write", s):
+                changed = OUTPUT.write_text(path, s, original)
 
     return {
         "file": str(path.relative_to(ROOT)),
         "changed": changed,
         **stats,
-        "base_removed": removed_any
     }
 
+def stray_baks() -> list:
+    # Copias .bak heredadas (p. ej. js/admin-users.js.bak)
+    return walk_files(ROOT, (".bak",), allow=HTML_ALLOW)
+
 def remove_baks():
+    # Pasan al almacén de snapshots (sólo en una corrida normal: no son parte de la reparación)
     removed = 0
-    for p in ROOT.rglob("*.html.bak"):
+    for p in stray_baks():
         try:
-            p.unlink()
-            removed += 1
+            if OUTPUT.remove(p):
+                removed += 1
         except Exception:
             pass
     return removed
 
-def ensure_favicon_file():
-    public = ROOT / "public"
-    public.mkdir(exist_ok=True)
-    fav = public / "favicon.svg"
+def ensure_favicon_file(root=None):
+    fav = Path(root or ROOT) / "public" / "favicon.svg"
     if not fav.exists():
-        fav.write_text(
+        return OUTPUT.write_text(
+            fav,
             """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">
   <text y=".9em" font-size="90">🏛️</text>
 </svg>""",
-            encoding="utf-8",
         )
+    return False
 
 def main():
-    print("🔧 ASEF | Reparación integral de HTML (base dinámico, rutas, favicon, scripts)")
-    ensure_favicon_file()
+    parser = argparse.ArgumentParser(description="Reparación integral de HTML del proyecto ASEF.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora el manifiesto incremental y procesa todo.")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Procesos en paralelo (1 = serial).")
+    parser.add_argument("--dynamic-base", action="store_true",
+                        help="Inserta el script de base dinámico (sólo para `npm run dev`; el deploy publica build/pages sin él).")
+    asef_profile.add_arguments(parser)
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_profile.start(args)
+    asef_output.start(args, ROOT)
+
+    print("🔧 ASEF | Reparación integral de HTML (rutas, favicon, scripts" + (", base dinámico)" if args.dynamic_base else ")"))
+    favicon_created = ensure_favicon_file()
+    manifest = Manifest(ROOT, enabled=not args.no_cache)
     total = 0
     changed = 0
     href_fixed = src_fixed = onclick_fixed = type_mod = base_removed = 0
 
-    files = []
-    for pattern in HTML_GLOBS:
-        files.extend(ROOT.glob(pattern))
+    files = walk_files(ROOT, HTML_EXTS, allow=HTML_ALLOW)
 
-    # Elimina duplicados
-    seen = set()
-    files = [f for f in files if f.is_file() and not (f in seen or seen.add(f))]
+    version = RULES + (":dynamic-base" if args.dynamic_base else "")
+    cached = [manifest.lookup(f, TOOL, version) for f in files]
+    computed = imap_files(partial(process_html_file, dynamic_base=args.dynamic_base),
+                          [f for f, c in zip(files, cached) if c is None], args.jobs)
 
-    for f in files:
+    for f, hit in zip(files, cached):
         total += 1
-        res = process_html_file(f)
+        if hit is not None:
+            res = {"file": str(f.relative_to(ROOT)), **hit}
+        else:
+            res = next(computed)
+            # Sin --dry-run/--check lo que quedó en disco ya está reparado
+            if OUTPUT.writes or not res["changed"]:
+                manifest.store(f, TOOL, version, CLEAN_RESULT)
         if res["changed"]:
             changed += 1
         href_fixed += res["href_fixed"]
@@ -265,7 +451,14 @@ def main():
         base_removed += 1 if res["base_removed"] else 0
         print(f"✅ {res['file']}  (href:{res['href_fixed']} src:{res['src_fixed']} onclick:{res['onclick_loc_fixed']} module+:{res['type_module_added']}{' base-removed' if res['base_removed'] else ''})")
 
-    baks = remove_baks()
+    if OUTPUT.writes:
+        baks = remove_baks()
+    else:
+        # --dry-run/--check: se informan aparte y no cuentan como cambio pendiente
+        baks = 0
+        for p in stray_baks():
+            print(f"ℹ️  .bak suelto (una corrida normal lo pasa al almacén de snapshots): {p.relative_to(ROOT).as_posix()}")
+    manifest.save()
 
     print("\n===== RESUMEN ASEF REPAIR =====")
     print(f"Analizados     : {total}")
@@ -276,7 +469,10 @@ def main():
     print(f"type=module +  : {type_mod}")
     print(f"<base> removidos: {base_removed}")
     print(f".bak eliminados: {baks}")
-    print("✔ Listo. Las rutas ahora son relativas al <base> dinámico (localhost y GitHub Pages).")
+    print(f"En caché       : {manifest.hits}")
+    print("✔ Listo. Para GitHub Pages: python asef_fingerprint.py --targets pages (URLs resueltas, sin base dinámico).")
+    asef_profile.finish(args)
+    asef_output.finish(args, changed + baks + int(favicon_created))
 
 if __name__ == "__main__":
     main()
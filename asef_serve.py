@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""
+asef_serve.py — Servidor local de vista previa que reescribe el HTML al vuelo.
+
+En vez de mutar las fuentes (y de inyectar el snippet de base dinámico, que
+bloquea el render), sirve el árbol del proyecto bajo un prefijo de montaje
+('/' como en localhost o '/asefweb/' como en GitHub Pages) y, sólo en la
+respuesta, aplica a cada HTML:
+  - fix_attrs (normalize_internal en href/src/onclick, type="module")
+  - un <base href="{prefijo}"> estático en lugar de <base>/snippet dinámico
+Las fuentes quedan intactas y se puede medir la carga con ambos prefijos.
+
+Respuestas:
+  - caché LRU de HTML reescrito, con clave (hash del archivo, prefijo, versión
+    del reescritor): después del primer pedido no hay costo de reescritura;
+    el hash de cada archivo se recuerda por (mtime_ns, size)
+  - ETag / If-None-Match -> 304, y Range (un solo rango) -> 206; cada
+    codificación tiene su propio ETag ("<hash>-br", "<hash>-gzip") y los
+    rangos se sirven sólo sobre el cuerpo sin comprimir
+  - cuerpos precomprimidos: para estáticos se usa X.br / X.gz si existe y está
+    al día; el HTML reescrito se comprime con gzip una sola vez y queda en caché
+  - se sirve sólo lo publicable según asef_walk.site_files (respeta .gitignore;
+    nunca scripts, backups ni credenciales)
+
+Uso:
+    python asef_serve.py                          # http://127.0.0.1:8080/asefweb/
+    python asef_serve.py --prefix / --port 8081   # como localhost
+"""
+
+import argparse
+import gzip
+import mimetypes
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from asef_html import iter_tags
+from asef_manifest import hash_bytes, rules_hash
+from asef_repair_all import fix_attrs, normalize_internal, is_external
+from asef_targets import element_end, is_dynamic_base
+from asef_walk import site_files
+
+ROOT = Path(__file__).parent
+
+# Carpetas cuyo contenido se publica en la raíz del sitio (como en Vite)
+PUBLIC_DIRS = ("public",)
+
+CACHE_MB = 64
+GZIP_MIN = 1024
+REINDEX_S = 1.0
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".mjs": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+    ".woff2": "font/woff2",
+}
+
+# Precomprimidos, en orden de preferencia: (Content-Encoding, sufijo)
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+# -------------------------------------------------------------------
+# Reescritura
+# -------------------------------------------------------------------
+def rewrite_html(html: str, prefix: str) -> str:
+    """HTML tal como lo vería el navegador bajo `prefix`, sin base dinámico."""
+    html, _ = fix_attrs(html)
+    edits = []
+    head_seen = False
+    for tag in iter_tags(html, names=("head", "base", "script")):
+        if tag.name == "head":
+            if not head_seen:
+                head_seen = True
+                edits.append((tag.end, tag.end, f'\n<base href="{prefix}">'))
+        elif tag.name == "base":
+            edits.append((tag.start, element_end(html, tag), ""))
+        elif is_dynamic_base(tag):
+            edits.append((tag.start, element_end(html, tag), ""))
+    if not edits:
+        return html
+    # Estable: a igual posición, la inserción del <base> va primero
+    edits.sort(key=lambda e: e[0])
+    out = []
+    last = 0
+    for start, end, text in edits:
+        if start < last:
+            continue
+        out.append(html[last:start])
+        out.append(text)
+        last = end
+    out.append(html[last:])
+    return "".join(out)
+
+
+# Versión del reescritor: entra en la clave de la caché
+REWRITER = rules_hash(rewrite_html, is_dynamic_base, element_end, fix_attrs, normalize_internal, is_external)
+
+
+# -------------------------------------------------------------------
+# Cachés
+# -------------------------------------------------------------------
+class LRUCache:
+    """LRU por bytes, segura entre hilos."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, item: dict):
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.size -= old["bytes"]
+            self.items[key] = item
+            self.size += item["bytes"]
+            while self.size > self.max_bytes and len(self.items) > 1:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= evicted["bytes"]
+
+    def add_bytes(self, key, extra: int):
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None:
+                item["bytes"] += extra
+                self.size += extra
+
+
+class FileHashes:
+    """Hash del contenido por (ruta, mtime_ns, size): un archivo se lee para hashear una vez por versión."""
+
+    def __init__(self):
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def get(self, path: Path, st) -> tuple:
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            hit = self.memo.get(path)
+        if hit is not None and hit[0] == key:
+            return hit[1], None
+        data = path.read_bytes()
+        digest = hash_bytes(data)
+        with self.lock:
+            self.memo[path] = (key, digest)
+        return digest, data
+
+
+class SiteIndex:
+    """Archivos servibles (asef_walk.site_files), re-indexado a pedido como mucho cada REINDEX_S."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.lock = threading.Lock()
+        self.files = set()
+        self.indexed = 0.0
+        self.refresh()
+
+    def refresh(self):
+        files = {p.relative_to(self.root).as_posix() for p in site_files(self.root)}
+        with self.lock:
+            self.files = files
+            self.indexed = time.monotonic()
+
+    def find(self, rel: str):
+        """Ruta en disco para `rel` (también bajo public/), o None."""
+        for _ in range(2):
+            candidates = [rel] + [f"{d}/{rel}" for d in PUBLIC_DIRS]
+            for c in candidates:
+                if c in self.files:
+                    return self.root / c
+            if time.monotonic() - self.indexed < REINDEX_S:
+                return None
+            self.refresh()
+        return None
+
+    def is_dir(self, rel: str) -> bool:
+        prefix = rel.rstrip("/") + "/"
+        return any(f.startswith(prefix) for f in self.files)
+
+
+# -------------------------------------------------------------------
+# HTTP
+# -------------------------------------------------------------------
+def parse_range(header: str, size: int):
+    """(inicio, fin_inclusivo) para un único rango 'bytes=...'; None = ignorar; 'invalid' = 416."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first == "":
+            n = int(last)
+            if n <= 0:
+                return "invalid"
+            return max(0, size - n), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return "invalid"
+    return start, min(end, size - 1)
+
+
+def content_type(path: Path) -> str:
+    ext = path.suffix.lower()
+    return CONTENT_TYPES.get(ext) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+def coded_etag(etag: str, encoding) -> str:
+    """ETag de la representación: '"<hash>"' -> '"<hash>-br"' si el cuerpo va comprimido."""
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+class AsefHandler(BaseHTTPRequestHandler):
+    server_version = "ASEFPreview/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # Los configura make_server
+    prefix = "/asefweb/"
+    index = None
+    cache = None
+    hashes = None
+    rewrite = True
+    quiet = False
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    # ---------------------------------------------------------------
+    def _serve(self, send_body: bool):
+        t0 = time.perf_counter()
+        path = unquote(urlsplit(self.path).path)
+        if not path.startswith(self.prefix):
+            if path in ("/", self.prefix.rstrip("/")):
+                return self._redirect(self.prefix)
+            return self._error(HTTPStatus.NOT_FOUND)
+
+        rel = path[len(self.prefix):]
+        if rel == "" or rel.endswith("/"):
+            rel += "index.html"
+        rel = posixpath.normpath(rel)
+        if rel.startswith(("../", "/")) or rel == ".." or any(part.startswith(".") for part in rel.split("/")):
+            return self._error(HTTPStatus.NOT_FOUND)
+
+        file = self.index.find(rel)
+        if file is None:
+            if self.index.is_dir(rel):
+                return self._redirect(path + "/")
+            return self._error(HTTPStatus.NOT_FOUND)
+
+        try:
+            st = file.stat()
+            digest, data = self.hashes.get(file, st)
+        except OSError:
+            return self._error(HTTPStatus.NOT_FOUND)
+
+        ctype = content_type(file)
+        status = "static"
+        if self.rewrite and file.suffix.lower() == ".html":
+            key = (digest, self.prefix, REWRITER)
+            entry = self.cache.get(key)
+            status = "hit"
+            if entry is None:
+                status = "miss"
+                text = (data if data is not None else file.read_bytes()).decode("utf-8", errors="replace")
+                body = rewrite_html(text, self.prefix).encode("utf-8")
+                entry = {"body": body, "gzip": None, "bytes": len(body),
+                         "etag": f'"{hash_bytes(body)}"'}
+                self.cache.put(key, entry)
+            self._send(entry["body"], ctype, entry["etag"], send_body, t0, status,
+                       gzip_entry=(key, entry))
+            return
+
+        etag = f'"{digest}"'
+        self._send_static(file, st, ctype, etag, send_body, t0, data)
+
+    def _not_modified(self, etag: str) -> bool:
+        inm = self.headers.get("If-None-Match")
+        if not inm:
+            return False
+        tags = [t.strip() for t in inm.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    def _accepts(self, coding: str) -> bool:
+        accept = self.headers.get("Accept-Encoding", "")
+        for part in accept.split(","):
+            name, _, params = part.partition(";")
+            if name.strip() != coding:
+                continue
+            q = params.replace(" ", "")
+            try:
+                return not q.startswith("q=") or float(q[2:]) > 0
+            except ValueError:
+                return True
+        return False
+
+    def _range(self, etag: str, size: int):
+        header = self.headers.get("Range")
+        if not header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range.strip() != etag:
+            return None
+        return parse_range(header, size)
+
+    def _send(self, body: bytes, ctype: str, etag: str, send_body: bool, t0: float, status: str,
+              gzip_entry=None):
+        encoding = None
+        if (not self.headers.get("Range") and gzip_entry is not None and len(body) >= GZIP_MIN
+                and self._accepts("gzip")):
+            encoding = "gzip"
+        etag = coded_etag(etag, encoding)
+        if self._not_modified(etag):
+            return self._send_304(etag, t0, status)
+        rng = None
+        if encoding:
+            key, entry = gzip_entry
+            if entry["gzip"] is None:
+                entry["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+                self.cache.add_bytes(key, len(entry["gzip"]))
+            body = entry["gzip"]
+        else:
+            rng = self._range(etag, len(body))
+            if rng == "invalid":
+                return self._send_416(len(body))
+        self._respond(body, ctype, etag, send_body, t0, status, rng, encoding)
+
+    def _send_static(self, file: Path, st, ctype: str, etag: str, send_body: bool, t0: float, data):
+        encoding = None
+        if not self.headers.get("Range"):
+            for coding, suffix in PRECOMPRESSED:
+                sibling = file.with_name(file.name + suffix)
+                try:
+                    sst = sibling.stat()
+                except OSError:
+                    continue
+                if sst.st_mtime_ns >= st.st_mtime_ns and self._accepts(coding):
+                    encoding = coding
+                    break
+        etag = coded_etag(etag, encoding)
+        if self._not_modified(etag):
+            return self._send_304(etag, t0, "static")
+        rng = None
+        if encoding:
+            try:
+                data = sibling.read_bytes()
+            except OSError:
+                return self._error(HTTPStatus.NOT_FOUND)
+        else:
+            if data is None:
+                data = file.read_bytes()
+            rng = self._range(etag, len(data))
+            if rng == "invalid":
+                return self._send_416(len(data))
+        self._respond(data, ctype, etag, send_body, t0, "static", rng, encoding)
+
+    def _respond(self, body: bytes, ctype: str, etag: str, send_body: bool, t0: float, status: str,
+                 rng=None, encoding=None):
+        if rng is not None:
+            start, end = rng
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            body = body[start:end + 1]
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self._timing_headers(t0, status)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _timing_headers(self, t0: float, status: str):
+        self.send_header("X-Asef-Cache", status)
+        self.send_header("Server-Timing", f"asef;desc={status};dur={(time.perf_counter() - t0) * 1000:.2f}")
+
+    def _send_304(self, etag: str, t0: float, status: str):
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self._timing_headers(t0, status)
+        self.end_headers()
+
+    def _send_416(self, size: int):
+        self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.send_header("Content-Range", f"bytes */{size}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _redirect(self, location: str):
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _error(self, code: HTTPStatus):
+        body = f"{code.value} {code.phrase}\n".encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+def normalize_prefix(prefix: str) -> str:
+    prefix = "/" + prefix.strip("/")
+    return prefix if prefix == "/" else prefix + "/"
+
+
+def make_server(root=ROOT, prefix="/asefweb/", host="127.0.0.1", port=8080, cache_mb=CACHE_MB,
+                rewrite=True, quiet=False) -> ThreadingHTTPServer:
+    handler = type("Handler", (AsefHandler,), {
+        "prefix": normalize_prefix(prefix),
+        "index": SiteIndex(Path(root)),
+        "cache": LRUCache(cache_mb * 1024 * 1024),
+        "hashes": FileHashes(),
+        "rewrite": rewrite,
+        "quiet": quiet,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de vista previa ASEF con reescritura al vuelo (fuentes intactas).")
+    parser.add_argument("--prefix", default="/asefweb/", help="Prefijo de montaje: '/' (localhost) o '/asefweb/' (GitHub Pages).")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz (por defecto sólo local).")
+    parser.add_argument("--port", type=int, default=8080, help="Puerto (Vite usa 5173).")
+    parser.add_argument("--root", default=str(ROOT), help="Carpeta a servir.")
+    parser.add_argument("--cache-mb", type=int, default=CACHE_MB, help="Tamaño máximo de la caché de HTML reescrito.")
+    parser.add_argument("--raw", action="store_true", help="Sirve el HTML sin reescribir (para comparar).")
+    parser.add_argument("--quiet", action="store_true", help="No imprime una línea por pedido.")
+    args = parser.parse_args()
+
+    server = make_server(args.root, args.prefix, args.host, args.port, args.cache_mb,
+                         rewrite=not args.raw, quiet=args.quiet)
+    prefix = server.RequestHandlerClass.prefix
+    mode = "sin reescritura" if args.raw else "reescritura al vuelo, fuentes intactas"
+    print(f"🌐 ASEF | Vista previa en http://{args.host}:{args.port}{prefix} ({mode}) — Ctrl+C para salir")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        cache = server.RequestHandlerClass.cache
+        print(f"\n👋 Fin. Caché HTML: {cache.hits} aciertos, {cache.misses} fallos, {cache.size / 1024:.0f} KB")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
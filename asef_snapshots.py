@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+asef_snapshots.py — Almacén de snapshots direccionado por contenido (reemplaza a los .bak).
+
+Cada escritura de las herramientas de reparación (todo lo que pasa por
+asef_output.OUTPUT en modo normal) guarda el antes y el después de cada archivo
+en un almacén FUERA del árbol del proyecto, así no quedan copias .bak que los
+walkers vuelvan a recorrer:
+
+    ~/.asef/snapshots/<proyecto>-<hash>/
+        objects/ab/cdef...        contenido (zlib) nombrado por su hash: deduplicado
+        runs/<run-id>.jsonl       un manifiesto por corrida: cabecera + una línea por escritura
+
+Un archivo que la corrida no toca no cuesta nada; uno que vuelve a un contenido
+ya visto tampoco suma bytes (el objeto ya existe). Los workers de un pool
+agregan líneas al mismo manifiesto (el run-id viaja por variables de entorno).
+
+Deshacer una corrida es, por archivo, traer el objeto "antes" y publicarlo con
+un os.replace. El rollback también pasa por OUTPUT: queda registrado como una
+corrida nueva (se puede deshacer) y acepta --dry-run/--check.
+
+Uso:
+    python asef_snapshots.py list
+    python asef_snapshots.py diff <run-id>
+    python asef_snapshots.py rollback <run-id> [--force] [--dry-run]
+    python asef_snapshots.py prune --older-than 30 --max-mb 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from asef_manifest import hash_bytes
+
+ENV_DIR = "ASEF_SNAPSHOT_DIR"
+ENV_RUN = "ASEF_SNAPSHOT_RUN"
+DEFAULT_HOME = Path.home() / ".asef" / "snapshots"
+RUNS_DIR = "runs"
+OBJECTS_DIR = "objects"
+RUN_EXT = ".jsonl"
+SNAPSHOT_VERSION = 1
+
+ROOT = Path(__file__).parent
+
+
+def store_dir(root) -> Path:
+    """Carpeta del almacén para el proyecto en `root` (ASEF_SNAPSHOT_DIR la reemplaza)."""
+    if os.environ.get(ENV_DIR):
+        return Path(os.environ[ENV_DIR])
+    root = Path(root).resolve()
+    return DEFAULT_HOME / f"{root.name}-{hash_bytes(str(root).encode('utf-8'))[:8]}"
+
+
+class Store:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.runs = self.path / RUNS_DIR
+        self.objects = self.path / OBJECTS_DIR
+
+    # ---------------------------------------------------------------
+    # Objetos
+    # ---------------------------------------------------------------
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def put(self, data: bytes) -> tuple:
+        """Guarda `data` si no existe. Devuelve (hash, bytes nuevos en disco)."""
+        digest = hash_bytes(data)
+        path = self.object_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        packed = zlib.compress(data, 6)
+        fd, tmp = tempfile.mkstemp(prefix=f".{digest}.", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(packed)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return digest, len(packed)
+
+    def get(self, digest: str) -> bytes:
+        return zlib.decompress(self.object_path(digest).read_bytes())
+
+    # ---------------------------------------------------------------
+    # Corridas
+    # ---------------------------------------------------------------
+    def run_path(self, run_id: str) -> Path:
+        return self.runs / f"{run_id}{RUN_EXT}"
+
+    def run_ids(self) -> list:
+        if not self.runs.is_dir():
+            return []
+        return sorted(p.name[:-len(RUN_EXT)] for p in self.runs.iterdir() if p.name.endswith(RUN_EXT))
+
+    def load(self, run_id: str) -> dict:
+        """
+        Lee el manifiesto de una corrida. Si un archivo se escribió varias veces
+        en la misma corrida, vale el primer "antes" y el último "después".
+        """
+        header = None
+        files = {}
+        added = 0
+        with open(self.run_path(run_id), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # línea cortada por una corrida interrumpida
+                if "run" in rec:
+                    header = header or rec
+                    continue
+                added += rec.get("bytes", 0)
+                prev = files.get(rec["path"])
+                files[rec["path"]] = {"before": prev["before"] if prev else rec["before"], "after": rec["after"]}
+        header = header or {"run": run_id, "tool": "?", "root": "", "created": 0}
+        return {**header, "files": files, "bytes": added}
+
+    def resolve(self, run_id: str) -> str:
+        """Acepta el id completo, un prefijo único o 'last'."""
+        ids = self.run_ids()
+        if run_id == "last" and ids:
+            return ids[-1]
+        matches = [r for r in ids if r.startswith(run_id)]
+        if len(matches) != 1:
+            raise SystemExit(f"❌ Corrida '{run_id}' {'ambigua' if matches else 'inexistente'} en {self.path}")
+        return matches[0]
+
+
+class SnapshotRun:
+    """Registra las escrituras de una corrida en su manifiesto (append-only, apto para varios procesos)."""
+
+    def __init__(self, store: Store, run_id: str, tool: str = "", root=None):
+        self.store = store
+        self.run_id = run_id
+        self.header = {"run": run_id, "tool": tool, "root": str(Path(root).resolve()) if root else "",
+                       "created": time.time(), "version": SNAPSHOT_VERSION}
+        self.files = 0
+        self.bytes = 0
+
+    @classmethod
+    def begin(cls, root, tool: str):
+        store = Store(store_dir(root))
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid():x}"
+        os.environ[ENV_DIR] = str(store.path)
+        os.environ[ENV_RUN] = run_id
+        return cls(store, run_id, tool, root)
+
+    @classmethod
+    def from_env(cls):
+        """Corrida del proceso principal, en un worker de un pool (o None)."""
+        if not (os.environ.get(ENV_DIR) and os.environ.get(ENV_RUN)):
+            return None
+        return cls(Store(os.environ[ENV_DIR]), os.environ[ENV_RUN])
+
+    def record(self, path, before: bytes, after: bytes):
+        """Guarda los objetos de antes/después de `path` y agrega la línea al manifiesto."""
+        rec = {"path": str(Path(path).resolve()), "before": None, "after": None, "bytes": 0}
+        for key, data in (("before", before), ("after", after)):
+            if data is not None:
+                rec[key], added = self.store.put(data)
+                rec["bytes"] += added
+        path = self.store.run_path(self.run_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            # La cabecera la escribe quien crea el archivo: una corrida sin cambios no deja nada
+            lines = [self.header] if f.tell() == 0 else []
+            lines.append(rec)
+            f.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+        self.files += 1
+        self.bytes += rec["bytes"]
+
+    def summary(self) -> str:
+        if not self.store.run_path(self.run_id).exists():
+            return ""
+        run = self.store.load(self.run_id)
+        return (f"📸 Snapshot {self.run_id}: {len(run['files'])} archivo(s), {run['bytes'] / 1024:.1f} KB nuevos"
+                f" — deshacer: python asef_snapshots.py rollback {self.run_id}")
+
+
+# -------------------------------------------------------------------
+# Comandos
+# -------------------------------------------------------------------
+def _label(run: dict, path: str) -> str:
+    try:
+        return Path(path).relative_to(run["root"]).as_posix() if run["root"] else path
+    except ValueError:
+        return path
+
+
+def cmd_list(store: Store, args):
+    ids = store.run_ids()
+    if not ids:
+        print(f"ℹ️  Sin snapshots en {store.path}")
+        return
+    print(f"{'corrida':<24} {'fecha':<19} {'herramienta':<22} {'archivos':>8} {'KB':>8}")
+    for run_id in ids:
+        run = store.load(run_id)
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["created"]))
+        print(f"{run_id:<24} {when:<19} {run['tool']:<22} {len(run['files']):>8} {run['bytes'] / 1024:>8.1f}")
+
+
+def cmd_diff(store: Store, args):
+    from asef_output import Output
+    run = store.load(store.resolve(args.run_id))
+    out = Output("dry-run")
+    out.root = Path(run["root"] or ".")
+    for path, rec in sorted(run["files"].items()):
+        before = store.get(rec["before"]) if rec["before"] else None
+        after = store.get(rec["after"]) if rec["after"] else None
+        out.diff(Path(path), before, after)
+
+
+def cmd_rollback(store: Store, args):
+    import asef_output
+    from asef_output import OUTPUT
+    run_id = store.resolve(args.run_id)
+    run = store.load(run_id)
+    asef_output.start(args, run["root"] or None)
+    restored = skipped = 0
+    for path, rec in sorted(run["files"].items()):
+        try:
+            current = Path(path).read_bytes()
+        except FileNotFoundError:
+            current = None
+        # Si el archivo cambió después de la corrida no se pisa (salvo --force)
+        if (hash_bytes(current) if current is not None else None) != rec["after"] and not args.force:
+            print(f"⚠️ Cambió después de {run_id}, se saltea: {_label(run, path)}")
+            skipped += 1
+            continue
+        if rec["before"] is None:
+            changed = OUTPUT.remove(path)
+        else:
+            changed = OUTPUT.write_bytes(path, store.get(rec["before"]), original=current)
+        if changed:
+            restored += 1
+            print(f"↩️  {_label(run, path)}")
+    print(f"\n✔ Rollback de {run_id}: {restored} restaurado(s), {skipped} salteado(s).")
+    asef_output.finish(args, restored)
+
+
+def cmd_prune(store: Store, args):
+    ids = store.run_ids()
+    runs = {run_id: store.load(run_id) for run_id in ids}
+    drop = set()
+    if args.older_than is not None:
+        limit = time.time() - args.older_than * 86400
+        drop |= {r for r in ids if runs[r]["created"] < limit}
+    keep = [r for r in ids if r not in drop]
+
+    def referenced(run_ids) -> set:
+        return {h for r in run_ids for rec in runs[r]["files"].values() for h in rec.values() if h}
+
+    def object_size(digests) -> int:
+        return sum(store.object_path(h).stat().st_size for h in digests if store.object_path(h).exists())
+
+    if args.max_mb is not None:
+        # Se eliminan las corridas más viejas hasta que los objetos vivos entren en el límite
+        while keep and object_size(referenced(keep)) > args.max_mb * 1024 * 1024:
+            drop.add(keep.pop(0))
+
+    live = referenced(keep)
+    freed = 0
+    for run_id in drop:
+        store.run_path(run_id).unlink()
+    if store.objects.is_dir():
+        for sub in store.objects.iterdir():
+            for obj in sub.iterdir():
+                if sub.name + obj.name not in live:
+                    freed += obj.stat().st_size
+                    obj.unlink()
+            if not any(sub.iterdir()):
+                sub.rmdir()
+    print(f"🧹 Prune: {len(drop)} corrida(s) eliminada(s), {freed / 1024:.1f} KB liberados, {len(keep)} conservada(s).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshots de las herramientas de reparación ASEF (reemplazan a los .bak).")
+    parser.add_argument("--root", default=str(ROOT), help="Proyecto cuyo almacén se usa.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Lista las corridas registradas.")
+    p = sub.add_parser("diff", help="Diff unificado de lo que cambió una corrida.")
+    p.add_argument("run_id", help="Id de la corrida (o prefijo único, o 'last').")
+    p = sub.add_parser("rollback", help="Devuelve los archivos al estado previo a la corrida.")
+    p.add_argument("run_id", help="Id de la corrida (o prefijo único, o 'last').")
+    p.add_argument("--force", action="store_true", help="Restaura aunque el archivo haya cambiado después.")
+    import asef_output
+    asef_output.add_arguments(p)
+    p = sub.add_parser("prune", help="Elimina corridas viejas y los objetos que ya nadie usa.")
+    p.add_argument("--older-than", type=float, metavar="DÍAS", help="Corridas con más de DÍAS días.")
+    p.add_argument("--max-mb", type=float, help="Tamaño máximo de los objetos (se eliminan las corridas más viejas).")
+    args = parser.parse_args()
+
+    store = Store(store_dir(args.root))
+    {"list": cmd_list, "diff": cmd_diff, "rollback": cmd_rollback, "prune": cmd_prune}[args.command](store, args)
+
+
+if __name__ == "__main__":
+    main()
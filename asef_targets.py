@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+asef_targets.py — Salida doble en el build: '/' (local) y '/asefweb/' (GitHub Pages).
+
+Las fuentes traen un <script id="asef-dynamic-base"> (asef_repair_all,
+fix_base_paths) que decide en tiempo de ejecución entre '/' y '/asefweb/' y
+agrega un <base>. Ese script bloquea el parser en cada visita y llega tarde
+para los <link> que el navegador ya descubrió. En el build no hace falta: cada
+página se genera una vez por destino, con las URLs ya resueltas.
+
+Cada archivo se parsea UNA vez (Page.parse) a una lista de tramos literales y
+"huecos" (URLs locales del índice de asef_refs, el <base>); generar otro
+destino es sólo unir los tramos con otro prefijo (Page.render):
+  - href/src/srcset/onclick locales -> prefijo + ruta del sitio (con el nombre
+    con hash si el asset lo tiene), conservando ?query y #ancla
+  - se quitan el script de base dinámico y los <base> existentes; si la página
+    dependía de un <base>, queda uno estático <base href="{prefijo}"> (sin JS),
+    así las URLs relativas que arma el JS de la página siguen resolviendo igual
+  - en CSS/JS sólo cambian las URLs absolutas ('/...'): las relativas valen
+    para cualquier prefijo
+
+check_runtime_base() revisa byte a byte lo generado: si queda algo de la
+lógica de base en tiempo de ejecución, el build falla.
+
+    page = Page.parse(text, index.refs(rel), has_base, names, html=True)
+    page.render("/asefweb/")
+"""
+
+from asef_html import iter_tags
+
+# Destinos por defecto: nombre de la carpeta de salida -> prefijo de montaje
+TARGETS = {"local": "/", "pages": "/asefweb/"}
+
+# Restos de la base dinámica que no pueden quedar en la salida
+RUNTIME_BASE_MARKERS = (
+    b"asef-dynamic-base",
+    b"document.head.prepend(base)",
+    b"createElement('base')",
+    b'createElement("base")',
+)
+
+CHECK_EXTS = (".html", ".js", ".mjs", ".css")
+
+_BASE = object()    # hueco del <base> estático
+
+
+def is_dynamic_base(tag) -> bool:
+    """<script> que arma el <base> en tiempo de ejecución (con id o el snippet viejo sin id)."""
+    if (tag.get("id") or "").startswith("asef-dynamic-base"):
+        return True
+    return tag.html.find("document.head.prepend(base)", tag.end, tag.raw_end) >= 0
+
+
+def element_end(html: str, tag) -> int:
+    """Fin del elemento (incluye </script> y el salto de línea que lo sigue)."""
+    end = tag.end
+    if tag.raw_end > tag.end or tag.name == "script":
+        close = html.find(">", tag.raw_end)
+        end = len(html) if close < 0 else close + 1
+    if html.startswith("\r\n", end):
+        return end + 2
+    if html.startswith("\n", end):
+        return end + 1
+    return end
+
+
+def base_spans(html: str) -> tuple[list, int]:
+    """([(inicio, fin) de cada <base> y script de base dinámico], fin del primer <head> o -1)."""
+    spans = []
+    head_end = -1
+    for tag in iter_tags(html, names=("head", "base", "script")):
+        if tag.name == "head":
+            if head_end < 0:
+                head_end = tag.end
+        elif tag.name == "base" or is_dynamic_base(tag):
+            spans.append((tag.start, element_end(html, tag)))
+    return spans, head_end
+
+
+def parse_targets(spec: str) -> dict:
+    """'local,pages' o 'local=/,demo=/demo/' -> {nombre: prefijo}."""
+    targets = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, prefix = item.partition("=")
+        if not prefix:
+            if name not in TARGETS:
+                raise SystemExit(f"❌ Destino desconocido '{name}' (conocidos: {', '.join(TARGETS)})")
+            prefix = TARGETS[name]
+        prefix = "/" + prefix.strip("/")
+        targets[name] = prefix if prefix == "/" else prefix + "/"
+    return targets
+
+
+def _split_suffix(url: str) -> tuple[str, str]:
+    cut = len(url)
+    for ch in "?#":
+        i = url.find(ch)
+        if i >= 0:
+            cut = min(cut, i)
+    return url[:cut], url[cut:]
+
+
+class Page:
+    """Texto partido en tramos literales y huecos que dependen del prefijo."""
+
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, parts: list, slots: int):
+        self.parts = parts
+        self.slots = slots
+
+    @classmethod
+    def parse(cls, text: str, refs: list, has_base: bool, names: dict, html: bool = True):
+        edits = []
+        if html:
+            spans, head_end = base_spans(text)
+            edits += [(start, end, None) for start, end in spans]
+            if has_base and head_end >= 0:
+                edits.append((head_end, head_end, _BASE))
+        for ref in refs:
+            if ref.target is None or ref.target.startswith("../"):
+                continue
+            if not html and not ref.url.startswith("/"):
+                continue
+            path, suffix = _split_suffix(ref.url)
+            target = names.get(ref.target, ref.target)
+            if (path.endswith("/") or path in ("", ".")) and target.endswith("index.html"):
+                # Enlace a carpeta: se conserva la forma 'carpeta/'
+                target = target[:-len("index.html")]
+            edits.append((ref.start, ref.end, (target, suffix)))
+
+        # A igual posición, la inserción del <base> va primero
+        edits.sort(key=lambda e: (e[0], e[2] is not _BASE))
+        parts = []
+        last = 0
+        slots = 0
+        for start, end, slot in edits:
+            if start < last:
+                continue
+            if start > last:
+                parts.append(text[last:start])
+            if slot is not None:
+                parts.append(slot)
+                slots += 1
+            last = end
+        parts.append(text[last:])
+        return cls(parts, slots)
+
+    def render(self, prefix: str) -> str:
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+            elif part is _BASE:
+                out.append(f'<base href="{prefix}">')
+            else:
+                out.append(prefix + part[0] + part[1])
+        return "".join(out)
+
+
+def check_runtime_base(files: dict) -> list:
+    """[(ruta, marcador)] de los archivos generados que todavía traen lógica de base dinámica."""
+    found = []
+    for rel, data in files.items():
+        if not rel.endswith(CHECK_EXTS):
+            continue
+        for marker in RUNTIME_BASE_MARKERS:
+            if marker in data:
+                found.append((rel, marker.decode("ascii")))
+                break
+    return found
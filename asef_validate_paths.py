@@ -1,6 +1,15 @@
 import os
 import re
 import argparse
+from functools import partial
+
+from asef_manifest import Manifest, rules_hash
+from asef_output import OUTPUT
+import asef_output
+from asef_parallel import imap_files
+from asef_walk import walk_files
+from asef_profile import PROFILER
+import asef_profile
 
 # ============================================================
 # ASEF · Validador y Corrector de Rutas en HTML/CSS
@@ -42,74 +51,123 @@ def fix_path(path: str) -> str:
     return f"{VALID_PREFIX}{path}"
 
 
-def process_file(path: str):
-    """Analiza y corrige rutas dentro de un archivo."""
+def find_links(content: str) -> list:
+    """
+    Spans (inicio, fin) del valor de cada href/src y url(...) del documento,
+    ordenados y sin solapamientos.
+    """
+    spans = [m.span(1) for m in HTML_LINK_RE.finditer(content)]
+    spans += [m.span(1) for m in CSS_URL_RE.finditer(content)]
+    spans.sort()
+    out = []
+    last_end = -1
+    for start, end in spans:
+        if start >= last_end:
+            out.append((start, end))
+            last_end = end
+    return out
+
+
+def process_file(path: str, fix: bool = False):
+    """
+    Analiza las rutas de un archivo y, si `fix`, corrige las incorrectas.
+    Sólo se reescriben los valores de atributo/url() encontrados, armando la
+    salida con un único join sobre los spans (costo lineal).
+    """
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
+        content = OUTPUT.read_text(path)
     except Exception as e:
         print(f"❌ No se pudo leer {path}: {e}")
         return 0, 0, 0, 0
 
-    links = HTML_LINK_RE.findall(content) + CSS_URL_RE.findall(content)
-    if not links:
+    with PROFILER.file(os.path.relpath(path, ROOT)), PROFILER.rule("validate.find_links", content) as r:
+        spans = find_links(content)
+        r.matches = len(spans)
+    if not spans:
         return 0, 0, 0, 0
 
     correct = incorrect = external = fixed = 0
+    parts = []
+    last = 0
 
-    for link in links:
+    for start, end in spans:
+        link = content[start:end]
         if is_external(link):
             external += 1
             continue
 
         if link.startswith(VALID_PREFIX):
             correct += 1
-        else:
-            incorrect += 1
-            fixed_link = fix_path(link)
-            if fixed_link != link:
-                # 🔒 No corregir data:image ni anclas internas
-                if not link.startswith("data:") and not link.startswith("#"):
-                    content = content.replace(link, fixed_link)
-                    fixed += 1
+            continue
 
+        incorrect += 1
+        if not fix:
+            continue
+        fixed_link = fix_path(link)
+        if fixed_link != link:
+            parts.append(content[last:start])
+            parts.append(fixed_link)
+            last = end
+            fixed += 1
+
+    PROFILER.count("validate.fix_path", incorrect, fixed)
     if fixed > 0:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+        parts.append(content[last:])
+        OUTPUT.write_text(path, "".join(parts), content)
         print(f"✅ Corregido: {os.path.relpath(path, ROOT)}")
 
     return correct, incorrect, external, fixed
 
 
-def scan_directory(root_dir: str):
-    """Escanea y valida rutas en todos los HTML y CSS."""
-    total_correct = total_incorrect = total_external = total_fixed = 0
+# Versión de las reglas para el manifiesto incremental
+TOOL = "validate_paths"
+RULES = rules_hash(process_file, find_links, fix_path, is_external, HTML_LINK_RE, CSS_URL_RE, VALID_PREFIX)
+
+
+def scan_directory(root_dir: str, use_cache: bool = True, jobs: int = 1, fix: bool = False):
+    """Escanea y valida rutas en todos los HTML y CSS (corrige sólo si `fix`)."""
+    total_correct = total_incorrect = total_external = total_fixed = fixed_files = 0
     files_with_errors = []
+    manifest = Manifest(root_dir, enabled=use_cache)
+    # Un resultado de solo-lectura no sirve para una corrida con --fix (y viceversa)
+    tool = f"{TOOL}:fix" if fix else TOOL
+
+    paths = walk_files(root_dir, (".html", ".css"))
 
-    for subdir, _, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith((".html", ".css")):
-                path = os.path.join(subdir, file)
-                correct, incorrect, external, fixed = process_file(path)
-                total_correct += correct
-                total_incorrect += incorrect
-                total_external += external
-                total_fixed += fixed
-                if incorrect > 0:
-                    files_with_errors.append(os.path.relpath(path, ROOT))
-
-    # --- Reporte resumen ---
-    with open(REPORT_FILE, "w", encoding="utf-8") as rpt:
-        rpt.write("===== RESUMEN ASEF VALIDACIÓN =====\n\n")
-        rpt.write(f"Correct   : {total_correct}\n")
-        rpt.write(f"Incorrect : {total_incorrect}\n")
-        rpt.write(f"External  : {total_external}\n")
-        rpt.write(f"Fixed     : {total_fixed}\n")
-        rpt.write(f"Total analizado: {total_correct + total_incorrect + total_external}\n\n")
-        if files_with_errors:
-            rpt.write("Archivos con rutas incorrectas:\n")
-            for f in files_with_errors:
-                rpt.write(f"  - {f}\n")
+    cached = [manifest.lookup(path, tool, RULES) for path in paths]
+    computed = imap_files(partial(process_file, fix=fix), [p for p, c in zip(paths, cached) if c is None], jobs)
+
+    for path, hit in zip(paths, cached):
+        if hit is not None:
+            correct, incorrect, external, fixed = hit
+        else:
+            correct, incorrect, external, fixed = next(computed)
+            # Sólo se recuerda el conteo si describe el contenido que quedó en disco
+            if fixed == 0:
+                manifest.store(path, tool, RULES, [correct, incorrect, external, fixed])
+        total_correct += correct
+        total_incorrect += incorrect
+        total_external += external
+        total_fixed += fixed
+        fixed_files += 1 if fixed else 0
+        if incorrect > 0:
+            files_with_errors.append(os.path.relpath(path, ROOT))
+
+    manifest.save()
+
+    # --- Reporte resumen (sólo en una corrida normal: --dry-run/--check no escriben nada) ---
+    if OUTPUT.writes:
+        with open(REPORT_FILE, "w", encoding="utf-8") as rpt:
+            rpt.write("===== RESUMEN ASEF VALIDACIÓN =====\n\n")
+            rpt.write(f"Correct   : {total_correct}\n")
+            rpt.write(f"Incorrect : {total_incorrect}\n")
+            rpt.write(f"External  : {total_external}\n")
+            rpt.write(f"Fixed     : {total_fixed}\n")
+            rpt.write(f"Total analizado: {total_correct + total_incorrect + total_external}\n\n")
+            if files_with_errors:
+                rpt.write("Archivos con rutas incorrectas:\n")
+                for f in files_with_errors:
+                    rpt.write(f"  - {f}\n")
 
     print("\n===== RESUMEN ASEF VALIDACIÓN =====\n")
     print(f"Correct   : {total_correct}")
@@ -123,14 +181,25 @@ def scan_directory(root_dir: str):
         for f in files_with_errors:
             print(f"  - {f}")
 
-    print(f"\nReporte completo guardado en: {REPORT_FILE}")
+    if OUTPUT.writes:
+        print(f"\nReporte completo guardado en: {REPORT_FILE}")
     print("\n✔ Finalizado.")
+    return fixed_files
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Valida y corrige rutas HTML/CSS del proyecto ASEF.")
     parser.add_argument("--fix", action="store_true", help="Corrige rutas incorrectas automáticamente.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora el manifiesto incremental y analiza todo.")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Procesos en paralelo (1 = serial).")
+    asef_profile.add_arguments(parser)
+    asef_output.add_arguments(parser)
     args = parser.parse_args()
+    asef_profile.start(args)
+    asef_output.start(args, ROOT)
 
     print("🔍 Validando rutas en HTML y CSS...\n")
-    scan_directory(ROOT)
+    # --dry-run / --check muestran o cuentan las correcciones sin escribirlas
+    fixed = scan_directory(ROOT, use_cache=not args.no_cache, jobs=args.jobs, fix=args.fix or not OUTPUT.writes)
+    asef_profile.finish(args)
+    asef_output.finish(args, fixed)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+asef_walk.py — Descubrimiento de archivos compartido por todos los scripts ASEF.
+
+Recorre el árbol con os.scandir y poda carpetas enteras ANTES de descender:
+  - lista fija de carpetas que nunca son nuestras (node_modules, dist, .git, ...)
+  - reglas de los .gitignore (raíz y anidados: comentarios, '!', '/', '**', 'dir/')
+El filtro por extensión usa el tipo de entrada que ya trae scandir (sin stat extra)
+y el resultado se devuelve ordenado, así todas las corridas ven el mismo orden.
+
+    from asef_walk import walk_files
+    for path in walk_files(ROOT, (".html", ".css")):
+        ...
+"""
+
+import os
+import re
+from pathlib import Path
+
+# Carpetas que jamás contienen fuentes propias del sitio
+DEFAULT_DENY = frozenset({
+    "node_modules",
+    "dist",
+    ".git",
+    ".vite",
+    ".firebase",
+    ".asef_cache",
+    "__pycache__",
+    ".venv",
+    "venv",
+    "build",        # salida de asef_fingerprint
+})
+
+# Lo que se publica: además de DEFAULT_DENY, sin scripts del repo ni el backend
+SITE_DENY = DEFAULT_DENY | {"Py", "functions"}
+# Nunca se publican ni se sirven, aunque estén en el árbol
+PRIVATE_EXTS = (".py", ".pyc", ".ps1", ".bak", ".jsonl", ".txt", ".rules", ".patch", ".asef-tmp")
+PRIVATE_FILES = frozenset({
+    "serviceAccountKey.json", "firebase.json", "firestore.indexes.json", "package.json", "package-lock.json",
+    "vite.config.js", "asef_budgets.json", ".firebaserc", ".gitignore",
+})
+# Salida generada que git ignora pero que el sitio publica: variantes de asef_images
+# (images/carrusel1-960w.webp); se regeneran desde la fuente en cada deploy
+RE_GENERATED = re.compile(r"-\d+w\.(?:webp|png|jpe?g)$", re.IGNORECASE)
+
+
+def _glob_to_regex(pat: str) -> str:
+    out, i, n = [], 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if pat.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pat.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif pat.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pat.find("]", i + 1)
+            if j < 0:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pat[i + 1:j].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pat[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def parse_gitignore(text: str, base: str = "") -> list:
+    """
+    Convierte el contenido de un .gitignore en reglas (base, regex, negada, solo_dir).
+    `base` es la carpeta (relativa a la raíz, con '/') donde vive el .gitignore.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            continue
+        rx = _glob_to_regex(line)
+        rx = f"^{rx}$" if anchored else f"^(?:.*/)?{rx}$"
+        rules.append((base, re.compile(rx), negate, dir_only))
+    return rules
+
+
+def is_ignored(rules: list, rel: str, is_dir: bool) -> bool:
+    """Aplica las reglas en orden (la última que coincide gana, como git)."""
+    ignored = False
+    for base, rx, negate, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel.startswith(base + "/"):
+                continue
+            sub = rel[len(base) + 1:]
+        else:
+            sub = rel
+        if rx.match(sub):
+            ignored = not negate
+    return ignored
+
+
+def _walk(root, deny, allow, gitignore):
+    """Genera (carpeta relativa, entradas de archivo, reglas) podando carpetas antes de descender."""
+    deny = frozenset(deny) - frozenset(allow)
+    stack = [("", [])]
+
+    while stack:
+        rel_dir, rules = stack.pop()
+        abs_dir = os.path.join(root, rel_dir) if rel_dir else str(root)
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        if gitignore and any(e.name == ".gitignore" for e in entries):
+            try:
+                with open(os.path.join(abs_dir, ".gitignore"), encoding="utf-8", errors="ignore") as f:
+                    rules = rules + parse_gitignore(f.read(), rel_dir)
+            except OSError:
+                pass
+
+        files = []
+        for e in entries:
+            name = e.name
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            try:
+                is_dir = e.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if name in deny or (rules and is_ignored(rules, rel, True)):
+                    continue
+                stack.append((rel, rules))
+            else:
+                files.append((name, rel))
+        yield rel_dir, files, rules
+
+
+def walk_files(root, exts=None, deny=DEFAULT_DENY, allow=(), gitignore=True, keep=None) -> list:
+    """
+    Devuelve (ordenada) la lista de archivos bajo `root` cuyo nombre termina en
+    alguna de `exts` (None = todos). `allow` re-habilita carpetas de `deny`
+    (p. ej. allow=("dist",) para revisar el bundle); `keep` (regex sobre el
+    nombre) re-habilita archivos que el .gitignore excluye.
+    """
+    root = Path(root)
+    exts = tuple(exts) if exts else None
+    found = []
+    for _, files, rules in _walk(root, deny, allow, gitignore):
+        for name, rel in files:
+            if exts is None or name.endswith(exts):
+                if rules and is_ignored(rules, rel, False) and not (keep and keep.search(name)):
+                    continue
+                found.append(rel)
+
+    found.sort()
+    return [root / rel for rel in found]
+
+
+def site_files(root) -> list:
+    """Archivos publicables del sitio (sin scripts, backups ni credenciales)."""
+    return [p for p in walk_files(root, deny=SITE_DENY, keep=RE_GENERATED)
+            if p.name not in PRIVATE_FILES and not p.name.endswith(PRIVATE_EXTS)]
+
+
+def walk_dirs(root, deny=DEFAULT_DENY, allow=(), gitignore=True) -> list:
+    """Carpetas (ordenadas, incluida la raíz) que walk_files recorrería."""
+    root = Path(root)
+    return [root / rel if rel else root for rel in sorted(d for d, _, _ in _walk(root, deny, allow, gitignore))]
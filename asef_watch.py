@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+asef_watch.py — Vigila el árbol y repara cada archivo apenas se guarda.
+
+Pensado para correr al lado de `npm run dev`: en vez de reprocesar todo el
+árbol a mano después de cada edición, sólo se vuelve a pasar el archivo que
+cambió, y Vite levanta la versión ya reparada.
+
+Backends:
+  - inotify (Linux, vía ctypes, sin dependencias): se vigilan las mismas
+    carpetas que recorre asef_walk (sin node_modules, dist, .gitignore, ...)
+  - polling (cualquier sistema): stat de los archivos conocidos cada POLL_S y
+    re-escaneo del árbol cada RESCAN_S para descubrir archivos nuevos
+
+Las ráfagas de guardado (editores que escriben en varios pasos, "guardar
+todo") se agrupan: se procesa cuando pasan DEBOUNCE_S sin eventos nuevos
+(o MAX_BATCH_S desde el primero, para no esperar para siempre).
+
+Las escrituras propias no vuelven a disparar: después de reparar un archivo
+se recuerda su (mtime_ns, size), y un evento que coincide se descarta.
+
+La latencia que se informa es guardado -> archivo reparado en disco
+(mtime del guardado hasta el fin de la escritura), incluido el debounce.
+
+    from asef_watch import watch
+    watch(ROOT, (".html", ".js"), lambda path: {"changed": ..., "rules": [...]})
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from asef_output import TMP_SUFFIX
+from asef_walk import walk_dirs, walk_files
+
+DEBOUNCE_S = 0.015
+MAX_BATCH_S = 0.2
+POLL_S = 0.02
+RESCAN_S = 1.0
+
+# Máscaras de inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Tree:
+    """Archivos vigilables bajo root (mismas reglas que walk_files), recalculados a pedido."""
+
+    def __init__(self, root: Path, exts: tuple, allow: tuple):
+        self.root = root
+        self.exts = exts
+        self.allow = allow
+        self.files = set()
+        self.rescan()
+
+    def rescan(self):
+        self.files = set(walk_files(self.root, self.exts, allow=self.allow))
+
+    def accepts(self, path: Path) -> bool:
+        if not path.name.endswith(self.exts) or path.name.endswith(TMP_SUFFIX):
+            return False
+        if path not in self.files:
+            # Archivo nuevo (o ignorado): se decide con el árbol actualizado
+            self.rescan()
+        return path in self.files
+
+
+class PollingWatcher:
+    name = "polling"
+
+    def __init__(self, root: Path, exts: tuple, allow: tuple = ()):
+        self.tree = _Tree(root, exts, allow)
+        self.stats = {p: _stat(p) for p in self.tree.files}
+        self.last_scan = time.monotonic()
+
+    def _poll(self) -> set:
+        if time.monotonic() - self.last_scan >= RESCAN_S:
+            self.tree.rescan()
+            self.last_scan = time.monotonic()
+        changed = set()
+        for p in self.tree.files:
+            st = _stat(p)
+            if st is not None and st != self.stats.get(p):
+                changed.add(p)
+            self.stats[p] = st
+        return changed
+
+    def wait(self) -> set:
+        """Bloquea hasta tener una ráfaga de cambios y la devuelve."""
+        changed = set()
+        first = None
+        while True:
+            found = self._poll()
+            now = time.monotonic()
+            if found:
+                changed |= found
+                first = first or now
+                last = now
+            elif changed and (now - last >= DEBOUNCE_S or now - first >= MAX_BATCH_S):
+                return changed
+            time.sleep(POLL_S if not changed else min(POLL_S, DEBOUNCE_S))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    name = "inotify"
+
+    def __init__(self, root: Path, exts: tuple, allow: tuple = ()):
+        self.root = root
+        self.allow = allow
+        self.tree = _Tree(root, exts, allow)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.dirs = {}
+        self._add_dirs()
+
+    def _add_dirs(self):
+        known = set(self.dirs.values())
+        for d in walk_dirs(self.root, allow=self.allow):
+            if d in known:
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = d
+
+    def _read(self) -> set:
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, pos)
+                pos += EVENT_HEADER.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                if mask & IN_Q_OVERFLOW:
+                    # Se perdieron eventos: se revisa todo lo conocido
+                    print("⚠️ inotify: cola desbordada, se revisa el árbol completo.")
+                    self.tree.rescan()
+                    changed |= self.tree.files
+                    continue
+                directory = self.dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Lo que se escribió antes de vigilar la carpeta nueva no genera eventos
+                        self._add_dirs()
+                        self.tree.rescan()
+                        changed |= {f for f in self.tree.files if path in f.parents}
+                    continue
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    changed.add(path)
+
+    def wait(self) -> set:
+        changed = set()
+        first = None
+        while True:
+            timeout = None
+            if changed:
+                timeout = max(0.0, min(DEBOUNCE_S, first + MAX_BATCH_S - time.monotonic()))
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if ready:
+                found = self._read()
+                if found:
+                    changed |= found
+                    first = first or time.monotonic()
+                if not changed or time.monotonic() - first < MAX_BATCH_S:
+                    continue
+            if changed:
+                return {p for p in changed if self.tree.accepts(p)}
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def make_watcher(root, exts, allow=(), polling: bool = False):
+    root = Path(root)
+    exts = tuple(exts)
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, exts, allow)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, exts, allow)
+
+
+def watch(root, exts, handle, allow=(), polling: bool = False):
+    """
+    Llama a handle(path) -> {"changed": bool, "rules": [...]} por cada archivo
+    guardado (más "invalid_utf8": offset si no era UTF-8 válido, y "also": otros
+    paths que reescribió por arrastre), hasta Ctrl+C.
+    Imprime la latencia guardado -> disco de cada cambio.
+    """
+    root = Path(root)
+    watcher = make_watcher(root, exts, allow, polling)
+    own = {}        # path -> (mtime_ns, size) de lo que escribimos nosotros
+    print(f"👀 Vigilando {root} ({watcher.name}, {' '.join(exts)}) — Ctrl+C para salir")
+    try:
+        while True:
+            for path in sorted(watcher.wait()):
+                st = _stat(path)
+                if st is None or own.pop(path, None) == st:
+                    continue
+                saved_ns = st[0]
+                t0 = time.perf_counter()
+                res = handle(path)
+                took = (time.perf_counter() - t0) * 1000
+                rel = path.relative_to(root).as_posix()
+                if res["changed"]:
+                    own[path] = _stat(path)
+                for other in res.get("also", ()):
+                    own[other] = _stat(other)
+                latency = (time.time_ns() - saved_ns) / 1e6
+                if "invalid_utf8" in res:
+                    print(f"⚠️  {rel}: no es UTF-8 válido (byte {res['invalid_utf8']}), no se modificó")
+                elif res["changed"]:
+                    print(f"✅ {rel}  ({', '.join(res['rules'])})  guardado→disco {latency:.1f} ms (reglas {took:.1f} ms)")
+                else:
+                    print(f"✔ {rel}  sin cambios ({took:.1f} ms)")
+                if res.get("also"):
+                    print(f"   ↳ también: {', '.join(p.relative_to(root).as_posix() for p in res['also'])}")
+    except KeyboardInterrupt:
+        print("\n👋 Fin del modo --watch.")
+    finally:
+        watcher.close()
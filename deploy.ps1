@@ -1,18 +1,40 @@
 # =========================================
 # ASEFWEB - Deploy Automático
-# Reparación integral + Build + Push
+# Reparación integral + Build + Push + GitHub Pages (build/pages)
 # =========================================
 
 Write-Host "🚀 Iniciando deploy automático ASEF..." -ForegroundColor Cyan
 
 # 0) Reparación integral
-Write-Host "`n🧹 Reparando HTML (base dinámico, rutas, favicon, scripts)..." -ForegroundColor Yellow
-python .\asef_repair_all.py
+Write-Host "`n🧹 Reparando HTML (rutas, favicon, scripts)..." -ForegroundColor Yellow
+python .\asef_pipeline.py
 if ($LASTEXITCODE -ne 0) {
   Write-Host "`n❌ Error en la reparación. Abortando." -ForegroundColor Red
   exit 1
 }
 
+# 0b) Compuerta: una segunda pasada no debe cambiar nada (rápida: todo sale del manifiesto)
+python .\asef_pipeline.py --check
+if ($LASTEXITCODE -ne 0) {
+  Write-Host "`n❌ La reparación no quedó estable (--check detectó cambios). Abortando." -ForegroundColor Red
+  exit 1
+}
+
+# 0c) Imágenes responsivas (variantes en caché: sólo se codifica lo que cambió)
+Write-Host "`n🖼 Generando variantes de imágenes..." -ForegroundColor Yellow
+python .\asef_images.py
+if ($LASTEXITCODE -ne 0) {
+  Write-Host "`n❌ Error en la etapa de imágenes. Abortando." -ForegroundColor Red
+  exit 1
+}
+
+# 0d) Compuerta: peso por página dentro de asef_budgets.json
+python .\asef_budget.py
+if ($LASTEXITCODE -ne 0) {
+  Write-Host "`n❌ Alguna página supera su presupuesto de peso (ver desglose). Abortando." -ForegroundColor Red
+  exit 1
+}
+
 # 1) Build con Vite
 Write-Host "`n🏗 Ejecutando build con Vite..." -ForegroundColor Yellow
 npm run build
@@ -21,19 +43,46 @@ if ($LASTEXITCODE -ne 0) {
   exit 1
 }
 
-# 2) Commit & Push
+# 2) Salida para GitHub Pages: URLs resueltas para /asefweb/, assets con hash y sin el
+#    script de base dinámico (el build falla si queda algo de él: ver asef_targets)
+Write-Host "`n🏷  Generando build/pages (destino /asefweb/)..." -ForegroundColor Yellow
+python .\asef_fingerprint.py --minify --targets pages
+if ($LASTEXITCODE -ne 0) {
+  Write-Host "`n❌ Error generando build/pages. Abortando." -ForegroundColor Red
+  exit 1
+}
+# Sin Jekyll: GitHub Pages publica los archivos tal cual
+New-Item -ItemType File -Force .\build\pages\.nojekyll | Out-Null
+
+# 3) Commit & Push de las fuentes
 Write-Host "`n📂 Preparando commit..." -ForegroundColor Yellow
 git add -A
 $fecha = Get-Date -Format "yyyy-MM-dd HH:mm:ss"
-$mensaje = "deploy automático ASEF (repair-all + build) - $fecha"
+$mensaje = "deploy automático ASEF (pipeline + build) - $fecha"
 git commit -m $mensaje
 
 Write-Host "`n⬆️  Subiendo cambios a GitHub..." -ForegroundColor Yellow
 git push
+if ($LASTEXITCODE -ne 0) {
+  Write-Host "`n⚠️  El push no se completó correctamente. Revisá el mensaje anterior." -ForegroundColor Red
+  exit 1
+}
+
+# 4) Publicación: build/pages va a la rama gh-pages (la que sirve GitHub Pages).
+#    Repo aparte en .asef_cache (fuera del árbol versionado) con build/pages como árbol de trabajo.
+Write-Host "`n🌐 Publicando build/pages en la rama gh-pages..." -ForegroundColor Yellow
+$pagesGit = ".\.asef_cache\pages.git"
+if (-not (Test-Path $pagesGit)) {
+  git init -q --bare $pagesGit
+}
+$remote = git remote get-url origin
+git --git-dir=$pagesGit --work-tree=.\build\pages add -A
+git --git-dir=$pagesGit --work-tree=.\build\pages commit -q -m $mensaje
+git --git-dir=$pagesGit push -f $remote HEAD:gh-pages
 
 if ($LASTEXITCODE -eq 0) {
   Write-Host "`n✅ Deploy completado con éxito." -ForegroundColor Green
-  Write-Host "🌐 Producción (GitHub Pages): https://robertzaa-creator.github.io/asefweb/" -ForegroundColor White
+  Write-Host "🌐 Producción (GitHub Pages, rama gh-pages): https://robertzaa-creator.github.io/asefweb/" -ForegroundColor White
 } else {
-  Write-Host "`n⚠️  El push no se completó correctamente. Revisá el mensaje anterior." -ForegroundColor Red
+  Write-Host "`n⚠️  La publicación de build/pages no se completó. Revisá el mensaje anterior." -ForegroundColor Red
 }
@@ -7,8 +7,14 @@
 # ============================================================
 
 import re, os
+import argparse
 from pathlib import Path
 
+from asef_html import line_ending
+from asef_walk import walk_files
+from asef_output import OUTPUT
+import asef_output
+
 PROJECT_ROOT = Path(__file__).parent
 TARGET_EXT = ".html"
 BASE_SNIPPET = """<script>
@@ -20,22 +26,32 @@ BASE_SNIPPET = """<script>
 })();
 </script>"""
 
-def inject_base_tag(file_path):
-    html = Path(file_path).read_text(encoding="utf-8")
-
+def strip_base(html):
     # Si ya tiene <base>, lo reemplazamos
     html = re.sub(r"<base[^>]*>", "", html, flags=re.IGNORECASE)
 
     # Si ya tiene el bloque viejo del script, lo limpiamos
-    html = re.sub(r"<script>[\s\S]*?document\.head\.prepend\(base\);[\s\S]*?</script>", "", html, flags=re.IGNORECASE)
+    return re.sub(r"<script>[\s\S]*?document\.head\.prepend\(base\);[\s\S]*?</script>", "", html, flags=re.IGNORECASE)
+
+def insert_base(html):
+    # Insertar justo después de <head> (html ya pasado por strip_base)
+    snippet = ("\n  " + BASE_SNIPPET).replace("\n", line_ending(html))
+    return re.sub(r"(<head[^>]*>)", lambda m: m.group(1) + snippet, html, count=1, flags=re.IGNORECASE)
 
-    # Insertar justo después de <head>
-    new_html = re.sub(r"(<head[^>]*>)", r"\1\n  " + BASE_SNIPPET, html, count=1, flags=re.IGNORECASE)
+def inject_base_text(html):
+    return insert_base(strip_base(html))
 
+def inject_base_tag(file_path):
+    original = OUTPUT.read_text(file_path)
+    html = strip_base(original)
+    new_html = insert_base(html)
+
+    if new_html == original:
+        print(f"✔ Sin cambios: {file_path}")
+        return False
     if new_html != html:
-        backup_path = Path(str(file_path) + ".bak")
-        backup_path.write_text(html, encoding="utf-8")
-        Path(file_path).write_text(new_html, encoding="utf-8")
+        # El original queda en el almacén de snapshots (asef_snapshots), no en un .bak
+        OUTPUT.write_text(file_path, new_html, original)
         print(f"✅ Base tag insertado: {file_path}")
         return True
     else:
@@ -43,14 +59,18 @@ def inject_base_tag(file_path):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Inserta el <base> dinámico en todos los HTML de ASEF.")
+    asef_output.add_arguments(parser)
+    args = parser.parse_args()
+    asef_output.start(args, PROJECT_ROOT)
+
     print("🔧 Iniciando inserción de base dinámica en HTMLs...")
     count = 0
-    for html_file in PROJECT_ROOT.rglob(f"*{TARGET_EXT}"):
-        if "node_modules" in str(html_file) or ".bak" in str(html_file):
-            continue
+    for html_file in walk_files(PROJECT_ROOT, (TARGET_EXT,)):
         if inject_base_tag(html_file):
             count += 1
     print(f"\n✔ Proceso finalizado. Archivos modificados: {count}")
+    asef_output.finish(args, count)
 
 if __name__ == "__main__":
     main()
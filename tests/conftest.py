@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Los scripts viven en la raíz del repo (y en Py/): se importan como módulos sueltos."""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+# Lo que el pipeline recorre del sitio (images/ no hace falta: ninguna regla lee los binarios)
+SITE = ("index.html", "favicon.svg", "pages", "js", "css", "public")
+
+
+@pytest.fixture
+def site(tmp_path) -> Path:
+    """Copia de las fuentes del sitio en un directorio temporal."""
+    for name in SITE:
+        src = REPO / name
+        if src.is_dir():
+            shutil.copytree(src, tmp_path / name)
+        elif src.exists():
+            shutil.copy2(src, tmp_path / name)
+    return tmp_path
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from asef_hints import HINT_MARK, insert_hints, plan_hints, strip_hints
+from asef_modgraph import ModuleGraph
+from asef_refs import RefIndex
+
+PAGE = "index.html"
+
+
+@pytest.fixture
+def graph(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("import { b } from './b.js';\n", encoding="utf-8")
+    (tmp_path / "js" / "b.js").write_text("export const b = 1;\n", encoding="utf-8")
+    (tmp_path / PAGE).write_text("<html></html>", encoding="utf-8")
+    return ModuleGraph(RefIndex(tmp_path, use_cache=False).update())
+
+
+def _head(extra=""):
+    return (f'\n  <meta charset="UTF-8">\n{extra}'
+            '  <link rel="stylesheet" href="css/main.css">\n'
+            '  <script type="module" src="js/app.js"></script>\n')
+
+
+def _apply(head, graph, max_hints=10):
+    return insert_hints(strip_hints(head), plan_hints(head, PAGE, graph, max_hints))
+
+
+def _hrefs(head):
+    return [line.split('href="')[1].split('"')[0] for line in head.splitlines() if HINT_MARK in line]
+
+
+def test_stale_hints_are_replaced(graph):
+    head = _head(f'  <link rel="modulepreload" href="js/old.js" {HINT_MARK}>\n')
+
+    assert _hrefs(_apply(head, graph)) == ["js/b.js", "js/app.js"]
+
+
+def test_stale_hints_do_not_use_the_budget(graph):
+    stale = "".join(f'  <link rel="modulepreload" href="js/old{i}.js" {HINT_MARK}>\n' for i in range(2))
+
+    assert _hrefs(_apply(_head(stale), graph, max_hints=2)) == ["js/b.js", "js/app.js"]
+
+
+def test_hand_written_hints_are_kept_and_counted(graph):
+    head = _head('  <link rel="modulepreload" href="js/b.js">\n')
+
+    new = _apply(head, graph, max_hints=2)
+
+    assert '<link rel="modulepreload" href="js/b.js">' in new
+    assert _hrefs(new) == ["js/app.js"]
+
+
+@pytest.mark.parametrize("head", [
+    _head(),
+    _head().replace("\n", "\r\n"),
+    _head().rstrip("\n"),
+    '<meta charset="UTF-8"><link rel="stylesheet" href="css/main.css"><script type="module" src="js/app.js"></script>',
+    '\n  <meta charset="UTF-8">\n  <script type="module" src="js/app.js" defer></script>',
+])
+def test_applying_twice_changes_nothing(graph, head):
+    once = _apply(head, graph)
+
+    assert once != head
+    assert _apply(once, graph) == once
+    assert strip_hints(once) == head
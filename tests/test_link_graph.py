@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from asef_html import iter_tags
+from asef_link_graph import extract_html_links, resolve
+from asef_refs import extract_html
+from asef_targets import is_dynamic_base
+
+WITH_ID = """<script id="asef-dynamic-base">
+(function () {
+  var base = document.createElement('base');
+  document.head.prepend(base);
+})();
+</script>"""
+
+# Snippet viejo (fix_base_paths): sin id
+WITHOUT_ID = """<script>
+(function(){
+  var base = document.createElement('base');
+  document.head.prepend(base);
+})();
+</script>"""
+
+PLAIN = '<script>console.log("base")</script>'
+
+
+def _script(html):
+    return next(iter_tags(html, names=("script",)))
+
+
+@pytest.mark.parametrize("snippet,expected", [(WITH_ID, True), (WITHOUT_ID, True), (PLAIN, False)])
+def test_is_dynamic_base(snippet, expected):
+    assert is_dynamic_base(_script(snippet)) is expected
+
+
+@pytest.mark.parametrize("snippet", [WITH_ID, WITHOUT_ID])
+def test_dynamic_base_makes_links_root_relative(snippet):
+    html = f'<head>{snippet}</head><body><a href="pages/contacto.html">c</a></body>'
+
+    links, has_base = extract_html_links(html)
+    _, refs_base = extract_html(html)
+
+    assert has_base and refs_base
+    assert resolve(links[0][1], "pages/planificacion.html", has_base) == "pages/contacto.html"
+
+
+def test_without_base_links_are_page_relative():
+    links, has_base = extract_html_links(f'<head>{PLAIN}</head><a href="contacto.html">c</a>')
+
+    assert not has_base
+    assert resolve(links[0][1], "pages/planificacion.html", has_base) == "pages/contacto.html"
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""El JS minificado (archivos y <script> en línea del sitio) tiene que seguir parseando en node."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from asef_html import iter_tags
+from asef_minify import JS_TYPES, minify_js
+from asef_walk import walk_files
+from conftest import REPO
+
+NODE = shutil.which("node")
+pytestmark = pytest.mark.skipif(NODE is None, reason="node no está instalado")
+
+
+def _sources():
+    for path in walk_files(REPO, (".js", ".mjs")):
+        yield path.relative_to(REPO).as_posix(), path.read_text(encoding="utf-8")
+    for path in walk_files(REPO, (".html",)):
+        html = path.read_text(encoding="utf-8")
+        rel = path.relative_to(REPO).as_posix()
+        for n, tag in enumerate(iter_tags(html, names=("script",))):
+            if tag.raw_end > tag.end and (tag.get("type") or "").strip().lower() in JS_TYPES:
+                yield f"{rel}#script{n}", html[tag.end:tag.raw_end]
+
+
+SOURCES = dict(_sources())
+
+
+def _parses(tmp_path, js: str, ext: str) -> bool:
+    f = tmp_path / f"check{ext}"
+    f.write_text(js, encoding="utf-8")
+    return subprocess.run([NODE, "--check", str(f)], capture_output=True).returncode == 0
+
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_minified_js_still_parses(tmp_path, name):
+    js = SOURCES[name]
+    # Script clásico (.js) o módulo (.mjs): se exige lo mismo con lo que parseaba la fuente
+    ext = next((e for e in (".js", ".mjs") if _parses(tmp_path, js, e)), None)
+    if ext is None:
+        pytest.skip("la fuente tampoco parsea")
+
+    minified = minify_js(js)
+
+    assert _parses(tmp_path, minified, ext)
+    assert minify_js(minified) == minified
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import asef_hints
+from asef_pipeline import DEFAULT_RULES, process_file, run, watch_handler
+
+
+def test_invalid_utf8_is_left_untouched(tmp_path):
+    page = tmp_path / "page.html"
+    data = b'<a href="/pages/a.html">ok</a>\n<p>\xff\xfe</p>\n'
+    page.write_bytes(data)
+
+    res = process_file(page, DEFAULT_RULES, root=tmp_path)
+
+    assert res["changed"] is False
+    assert res["invalid_utf8"] == data.index(b"\xff")
+    assert page.read_bytes() == data
+
+
+def test_invalid_utf8_is_not_cached(tmp_path):
+    (tmp_path / "js").mkdir()
+    script = tmp_path / "js" / "zz.js"
+    data = b"let a = 1;   \n// \xff\xfe\n"
+    script.write_bytes(data)
+
+    for _ in range(2):
+        results, hits = run(tmp_path, ("sanitize",))
+        assert [r.get("invalid_utf8") for r in results] == [data.index(b"\xff")]
+        assert hits == 0
+    assert script.read_bytes() == data
+
+
+def test_second_run_changes_nothing(site):
+    run(site, DEFAULT_RULES, use_cache=False)
+    before = {p: p.read_bytes() for p in site.rglob("*") if p.is_file()}
+
+    results, _ = run(site, DEFAULT_RULES, use_cache=False)
+
+    assert [r["file"] for r in results if r["changed"]] == []
+    assert {p: p.read_bytes() for p in site.rglob("*") if p.is_file()} == before
+
+
+def test_watch_refreshes_hints_when_imports_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(asef_hints, "ROOT", tmp_path)
+    monkeypatch.setattr(asef_hints, "_GRAPHS", {})
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "b.js").write_text("export const b = 1;\n", encoding="utf-8")
+    app = tmp_path / "js" / "app.js"
+    app.write_text("export const a = 1;\n", encoding="utf-8")
+    page = tmp_path / "index.html"
+    page.write_text('<html>\n<head>\n  <script type="module" src="js/app.js"></script>\n</head>\n</html>\n',
+                    encoding="utf-8")
+    handle = watch_handler(("assets_hints",), tmp_path)
+    handle(page)
+
+    app.write_text("import { b } from './b.js';\nexport const a = b;\n", encoding="utf-8")
+    assert handle(app)["also"] == [page]
+    assert 'href="js/b.js"' in page.read_text(encoding="utf-8")
+
+    app.write_text("import { b } from './b.js';\nexport const a = b + 1;\n", encoding="utf-8")
+    assert "also" not in handle(app)
+
+    app.write_text("export const a = 1;\n", encoding="utf-8")
+    assert handle(app)["also"] == [page]
+    assert 'href="js/b.js"' not in page.read_text(encoding="utf-8")
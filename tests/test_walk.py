@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from asef_walk import PRIVATE_FILES, site_files
+
+
+def test_repo_config_is_not_published(tmp_path):
+    for name in ("index.html", *PRIVATE_FILES):
+        (tmp_path / name).write_text("{}", encoding="utf-8")
+
+    assert [p.name for p in site_files(tmp_path)] == ["index.html"]
+    assert "asef_budgets.json" in PRIVATE_FILES
+
+
+def test_generated_variants_are_published_though_ignored(tmp_path):
+    (tmp_path / ".gitignore").write_text("*-[0-9][0-9][0-9]w.webp\n*.log\n", encoding="utf-8")
+    (tmp_path / "images").mkdir()
+    for name in ("a.png", "a-480w.webp", "debug.log"):
+        (tmp_path / "images" / name).write_bytes(b"x")
+
+    assert [p.name for p in site_files(tmp_path)] == ["a-480w.webp", "a.png"]